@@ -2,25 +2,34 @@
 
 import maya.cmds as cmds
 import cStringIO
+try:
+    from jspl_selection import jspl_ordered_vertex_ends, jspl_selected_vertices, jspl_select_vertices
+except ImportError:
+    # jspl_selection.py is not on the script path: the flattened selection is read as before
+    jspl_selected_vertices = None
 
 def jspl_copy_weights_from_first_selected_vertex():
-    #_____________UI  Get ordered vertex selection
-    selection = cmds.ls(orderedSelection=True, flatten=True)
-
-    #_____________UI  Filter only vertices
-    verts = [v for v in selection if '.vtx[' in v]
-
-    if len(verts) < 2:
+    #_____________UI  Get ordered vertex selection (compact, no flatten)
+    if jspl_selected_vertices is not None:
+        source, _ = jspl_ordered_vertex_ends()
+        meshes = jspl_selected_vertices(convert=False, include_objects=False)
+    else:
+        verts = [v for v in cmds.ls(orderedSelection=True, flatten=True) or [] if '.vtx[' in v]
+        meshes = [(v.split('.')[0], None, [int(v.split('[')[-1][:-1])]) for v in verts]
+        source = (meshes[0][0], meshes[0][2][0]) if meshes else None
+
+    if source is None or sum(len(indices) for _, _, indices in meshes) < 2:
         cmds.error("Please select at least 2 vertices!")
 
     #_____________UI  Use FIRST selected vertex as source
-    source_vert = verts[0]
+    base_mesh, source_index = source
+    source_vert = "{}.vtx[{}]".format(base_mesh, source_index)
 
     #_____________UI  All others are targets
-    target_verts = verts[1:]
-
-    #_____________UI  Detect mesh
-    base_mesh = source_vert.split('.')[0]
+    for transform, _, indices in meshes:
+        if transform == base_mesh and source_index in indices:
+            indices.remove(source_index)
+    target_count = sum(len(indices) for _, _, indices in meshes)
 
     #_____________UI  Find skinCluster
     history = cmds.listHistory(base_mesh)
@@ -34,7 +43,10 @@ def jspl_copy_weights_from_first_selected_vertex():
     weights = cmds.skinPercent(skinClusterName, source_vert, query=True, value=True)
 
     #_____________UI  Build skinPercent command
-    cmds.select(target_verts)
+    if jspl_selected_vertices is not None:
+        jspl_select_vertices(meshes)
+    else:
+        cmds.select(["{}.vtx[{}]".format(mesh, i) for mesh, _, indices in meshes for i in indices])
     command = cStringIO.StringIO()
     command.write('cmds.skinPercent("{}", transformValue=['.format(skinClusterName))
 
@@ -52,7 +64,7 @@ def jspl_copy_weights_from_first_selected_vertex():
     finally:
         cmds.undoInfo(closeChunk=True)
 
-    print("Copied weights from {} to {} vertices.".format(source_vert, len(target_verts)))
+    print("Copied weights from {} to {} vertices.".format(source_vert, target_count))
 
 #_____________RUN
 jspl_copy_weights_from_first_selected_vertex()
@@ -2,6 +2,11 @@
 
 import maya.cmds as cmds
 import cStringIO
+try:
+    from jspl_selection import jspl_ordered_vertex_ends, jspl_selected_vertices, jspl_select_vertices
+except ImportError:
+    # jspl_selection.py is not on the script path: the flattened selection is read as before
+    jspl_selected_vertices = None
 
 #_____________FUNCTION
 def jspl_copy_weights_from_last_selected_vertex():
@@ -10,20 +15,26 @@ def jspl_copy_weights_from_last_selected_vertex():
     The last vertex is treated as the source; all others receive its weights.
     """
 
-    #_____________SELECTION
-    selection = cmds.ls(orderedSelection=True, flatten=True)
+    #_____________SELECTION (compact, no flatten)
+    if jspl_selected_vertices is not None:
+        _, source = jspl_ordered_vertex_ends()
+        meshes = jspl_selected_vertices(convert=False, include_objects=False)
+    else:
+        verts = [v for v in cmds.ls(orderedSelection=True, flatten=True) or [] if '.vtx[' in v]
+        meshes = [(v.split('.')[0], None, [int(v.split('[')[-1][:-1])]) for v in verts]
+        source = (meshes[-1][0], meshes[-1][2][0]) if meshes else None
 
     #_____________VERTEX_FILTER
-    verts = [v for v in selection if '.vtx[' in v]
-
-    if len(verts) < 2:
+    if source is None or sum(len(indices) for _, _, indices in meshes) < 2:
         cmds.error("Please select at least 2 vertices!")
 
     #_____________SOURCE_TARGET
-    source_vert = verts[-1]
-    target_verts = verts[:-1]
-
-    base_mesh = source_vert.split('.')[0]
+    base_mesh, source_index = source
+    source_vert = "{}.vtx[{}]".format(base_mesh, source_index)
+    for transform, _, indices in meshes:
+        if transform == base_mesh and source_index in indices:
+            indices.remove(source_index)
+    target_count = sum(len(indices) for _, _, indices in meshes)
 
     #_____________SKINCLUSTER_FIND
     history = cmds.listHistory(base_mesh)
@@ -37,7 +48,10 @@ def jspl_copy_weights_from_last_selected_vertex():
     weights = cmds.skinPercent(skinClusterName, source_vert, query=True, value=True)
 
     #_____________BUILD_COMMAND
-    cmds.select(target_verts)
+    if jspl_selected_vertices is not None:
+        jspl_select_vertices(meshes)
+    else:
+        cmds.select(["{}.vtx[{}]".format(mesh, i) for mesh, _, indices in meshes for i in indices])
     command = cStringIO.StringIO()
     command.write('cmds.skinPercent("{}", transformValue=['.format(skinClusterName))
 
@@ -55,7 +69,7 @@ def jspl_copy_weights_from_last_selected_vertex():
     finally:
         cmds.undoInfo(closeChunk=True)
 
-    print("Copied weights from {} to {} vertices.".format(source_vert, len(target_verts)))
+    print("Copied weights from {} to {} vertices.".format(source_vert, target_count))
 
 
 #_____________RUN
@@ -1,5 +1,10 @@
 #Hotkey Alt+3
 import maya.cmds as cmds
+try:
+    from jspl_selection import jspl_selected_vertices, jspl_select_vertices
+except ImportError:
+    # jspl_selection.py is not on the script path: the selection is converted by name as before
+    jspl_selected_vertices = None
 
 #_____________FUNCTION
 def jspl_faces_to_vertices():
@@ -8,20 +13,24 @@ def jspl_faces_to_vertices():
     """
 
     #_____________UI  Get current selection
-    sel = cmds.ls(sl=True, fl=True)
-    if not sel:
+    if not cmds.ls(sl=True):
         cmds.warning("Nothing is selected.")
         return
 
-    #_____________UI  Convert selected polygon faces to vertices
-    verts = cmds.polyListComponentConversion(sel, toVertex=True)
-    verts = cmds.filterExpand(verts, sm=31)  # sm=31 means vertices
-    if not verts:
+    #_____________UI  Convert selected polygon faces to vertices (on indices, no flatten)
+    if jspl_selected_vertices is not None:
+        meshes = jspl_selected_vertices()
+    else:
+        meshes = cmds.filterExpand(cmds.polyListComponentConversion(cmds.ls(sl=True, fl=True), toVertex=True), sm=31)  # sm=31 means vertices
+    if not meshes:
         cmds.warning("Failed to convert faces to vertices.")
         return
 
     #_____________UI  Select vertices
-    cmds.select(verts, r=True)
+    if jspl_selected_vertices is not None:
+        jspl_select_vertices(meshes)
+    else:
+        cmds.select(meshes, r=True)
 
     #_____________UI  Launch Paint Skin Weights Tool
     cmds.ArtPaintSkinWeightsTool()
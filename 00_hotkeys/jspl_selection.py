@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Shared component selection helpers for the hotkeys and the DQ tool.
+The selection is read through MSelectionList into one vertex index array per mesh,
+faces/edges are converted to vertices on indices, so selecting 500k vertices
+doesn't create 500k "mesh.vtx[i]" strings.
+"""
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+from array import array
+from itertools import chain, compress, repeat
+
+
+#_____________MESH_PATHS
+def _mesh_paths(dag):
+    """
+    Returns (shape, transform) MDagPaths for a mesh dag path, or (None, None) for anything else.
+    """
+    shape = om.MDagPath(dag)
+    if not shape.hasFn(om.MFn.kMesh):
+        try:
+            shape.extendToShape()
+        except RuntimeError:
+            return None, None
+        if not shape.hasFn(om.MFn.kMesh):
+            return None, None
+    transform = om.MDagPath(shape)
+    transform.pop()
+    return shape, transform
+
+
+#_____________COMPONENT_TO_VERTICES
+def _mark_component_vertices(fn_mesh, component, mask, convert):
+    """
+    Sets mask[i] = 1 for every vertex of the component.
+    Faces and edges are converted only if convert is True.
+    """
+    if component.isNull():
+        mask[:] = b"\x01" * len(mask)
+        return
+
+    api_type = component.apiType()
+    if api_type == om.MFn.kMeshVertComponent:
+        for i in om.MFnSingleIndexedComponent(component).getElements():
+            mask[i] = 1
+    elif not convert:
+        return
+    elif api_type == om.MFn.kMeshPolygonComponent:
+        faces = om.MFnSingleIndexedComponent(component).getElements()
+        if len(faces) * 8 < fn_mesh.numPolygons:
+            # a few faces: reading the whole mesh topology would cost more
+            for face in faces:
+                for i in fn_mesh.getPolygonVertices(face):
+                    mask[i] = 1
+            return
+        # one getVertices() call for the whole mesh, the face mask is stretched
+        # over the face-vertex list by the polygon counts
+        counts, poly_verts = fn_mesh.getVertices()
+        face_mask = bytearray(len(counts))
+        for face in faces:
+            face_mask[face] = 1
+        selected = compress(poly_verts, chain.from_iterable(map(repeat, face_mask, counts)))
+        for i in selected:
+            mask[i] = 1
+    elif api_type == om.MFn.kMeshEdgeComponent:
+        for edge in om.MFnSingleIndexedComponent(component).getElements():
+            a, b = fn_mesh.getEdgeVertices(edge)
+            mask[a] = 1
+            mask[b] = 1
+    elif api_type == om.MFn.kMeshVtxFaceComponent:
+        fn_comp = om.MFnDoubleIndexedComponent(component)
+        for i, _ in fn_comp.getElements():
+            mask[i] = 1
+
+
+#_____________SELECTED_VERTICES
+def jspl_selected_vertices(convert=True, include_objects=True):
+    """
+    Returns [(transform name, shape name, array('i') of sorted vertex ids)] per selected mesh.
+    convert: faces, edges and vertex-faces are converted to their vertices.
+    include_objects: a mesh selected as an object gives all of its vertices.
+    """
+    sel = om.MGlobal.getActiveSelectionList()
+    masks = {}
+    order = []
+
+    for i in range(sel.length()):
+        try:
+            dag, component = sel.getComponent(i)
+        except (RuntimeError, TypeError):
+            continue
+        if component.isNull() and not include_objects:
+            continue
+        shape, transform = _mesh_paths(dag)
+        if shape is None:
+            continue
+
+        key = shape.fullPathName()
+        if key not in masks:
+            fn_mesh = om.MFnMesh(shape)
+            masks[key] = (fn_mesh, bytearray(fn_mesh.numVertices))
+            order.append((key, transform.partialPathName(), shape.partialPathName()))
+        fn_mesh, mask = masks[key]
+        _mark_component_vertices(fn_mesh, component, mask, convert)
+
+    result = []
+    for key, transform_name, shape_name in order:
+        mask = masks[key][1]
+        indices = array("i", compress(range(len(mask)), mask))
+        if indices:
+            result.append((transform_name, shape_name, indices))
+    return result
+
+
+#_____________SELECT_VERTICES
+def jspl_select_vertices(meshes, replace=True):
+    """
+    Selects vertices from [(transform or shape name, ..., indices)] without building component strings.
+    """
+    sel = om.MSelectionList()
+    for item in meshes:
+        name, indices = item[0], item[-1]
+        shape, _ = _mesh_paths(om.MSelectionList().add(name).getDagPath(0))
+        if shape is None or not len(indices):
+            continue
+        fn_comp = om.MFnSingleIndexedComponent()
+        component = fn_comp.create(om.MFn.kMeshVertComponent)
+        fn_comp.addElements(indices)
+        sel.add((shape, component))
+
+    mode = om.MGlobal.kReplaceList if replace else om.MGlobal.kAddToList
+    om.MGlobal.setActiveSelectionList(sel, mode)
+
+
+#_____________VERTEX_RANGES
+def jspl_vertex_ranges(mesh, indices):
+    """
+    Compact component names for sorted indices: [0, 1, 2, 7] -> ["mesh.vtx[0:2]", "mesh.vtx[7]"].
+    """
+    names = []
+    count = len(indices)
+    i = 0
+    while i < count:
+        j = i
+        while j + 1 < count and indices[j + 1] == indices[j] + 1:
+            j += 1
+        if i == j:
+            names.append("%s.vtx[%d]" % (mesh, indices[i]))
+        else:
+            names.append("%s.vtx[%d:%d]" % (mesh, indices[i], indices[j]))
+        i = j + 1
+    return names
+
+
+#_____________ORDERED_ENDS
+def _vertex_range_bounds(name):
+    """
+    "mesh.vtx[3:7]" -> ("mesh", 3, 7), "mesh.vtx[5]" -> ("mesh", 5, 5)
+    """
+    mesh, _, ids = name.partition(".vtx[")
+    first, _, last = ids.rstrip("]").partition(":")
+    return mesh, int(first), int(last or first)
+
+
+def jspl_ordered_vertex_ends():
+    """
+    Returns ((mesh, index) of the first selected vertex, (mesh, index) of the last one),
+    or (None, None). The ordered selection is read without flatten, so ranges stay compact.
+    """
+    verts = [s for s in cmds.ls(orderedSelection=True) or [] if ".vtx[" in s]
+    if not verts:
+        return None, None
+    first_mesh, first, _ = _vertex_range_bounds(verts[0])
+    last_mesh, _, last = _vertex_range_bounds(verts[-1])
+    return (first_mesh, first), (last_mesh, last)
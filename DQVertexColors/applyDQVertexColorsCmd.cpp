@@ -12,16 +12,636 @@
 #include <algorithm>
 #include <maya/MDagPath.h>
 #include <maya/MObject.h>
+#include <maya/MComputation.h>
+#include <maya/MFnSkinCluster.h>
+#include <maya/MFnSingleIndexedComponent.h>
+#include <maya/MItDependencyGraph.h>
+#include <maya/MDoubleArray.h>
+#include <maya/MPxNode.h>
+#include <maya/MTypeId.h>
+#include <maya/MPlug.h>
+#include <maya/MPlugArray.h>
+#include <maya/MDataBlock.h>
+#include <maya/MFnNumericAttribute.h>
+#include <maya/MFnTypedAttribute.h>
+#include <maya/MFnMessageAttribute.h>
+#include <maya/MFnStringData.h>
+#include <climits>
+#include <set>
+#include <cmath>
+#include <cstdio>
+#include <chrono>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <locale>
+#include <sstream>
+#include <string>
+#include <thread>
+#include <tuple>
+#include <vector>
+
+// --- Weights file readers (JSON export or .dqw) ---
+// Only std types here, colors are built from the weights in doIt.
+struct DQWeightsData {
+    std::string mesh;
+    std::vector<int> verts;
+    std::vector<float> weights;
+};
+
+static bool readWholeFile(const MString& path, std::vector<char>& buf) {
+#ifdef _WIN32
+    // a narrow path goes through the ANSI code page, non-ASCII (Cyrillic) folders only open by wide name
+    std::ifstream f(path.asWChar(), std::ios::binary);
+#else
+    std::ifstream f(path.asChar(), std::ios::binary);
+#endif
+    if (!f) return false;
+    f.seekg(0, std::ios::end);
+    std::streamoff size = f.tellg();
+    if (size < 0) return false;
+    f.seekg(0, std::ios::beg);
+    buf.resize((size_t)size);
+    if (size > 0) f.read(&buf[0], size);
+    return (bool)f;
+}
+
+// .dqw layout (little-endian): "DQW1", uint16 version, uint16 flags,
+// uint32 count, decimalPlaces, meshLen, skinLen, modeLen, strings padded to 4,
+// uint32 vertices[count], then uint16 levels (flags & 1), uint32 levels (flags & 3, version 2)
+// or float32 weights (version 1 without flags)
+static bool readDQW(const std::vector<char>& buf, DQWeightsData& out, std::string& error) {
+    const size_t headerSize = 4 + 2 + 2 + 4 * 5;
+    if (buf.size() < headerSize) { error = "truncated .dqw header"; return false; }
+    const char* p = &buf[0];
+    uint16_t version, flags;
+    uint32_t count, decimalPlaces, meshLen, skinLen, modeLen;
+    std::memcpy(&version, p + 4, 2);
+    std::memcpy(&flags, p + 6, 2);
+    std::memcpy(&count, p + 8, 4);
+    std::memcpy(&decimalPlaces, p + 12, 4);
+    std::memcpy(&meshLen, p + 16, 4);
+    std::memcpy(&skinLen, p + 20, 4);
+    std::memcpy(&modeLen, p + 24, 4);
+    if (version > 2) { error = "unsupported .dqw version"; return false; }
+
+    uint64_t offset = headerSize;
+    uint64_t strings = (uint64_t)meshLen + skinLen + modeLen;
+    bool levels = (flags & 1) != 0;
+    bool wideLevels = levels && (flags & 2) != 0;
+    uint64_t valueSize = levels && !wideLevels ? 2 : 4;
+    if (offset + strings > buf.size()) { error = "truncated .dqw strings"; return false; }
+    out.mesh.assign(p + offset, meshLen);
+    offset += strings;
+    offset += (4 - offset % 4) % 4;
+    if (offset + (uint64_t)count * (4 + valueSize) > buf.size()) { error = "truncated .dqw data"; return false; }
+
+    out.verts.resize(count);
+    out.weights.resize(count);
+    if (count == 0) return true;
+    std::vector<uint32_t> indices(count);
+    std::memcpy(&indices[0], p + offset, 4 * (size_t)count);
+    for (uint32_t i = 0; i < count; ++i) out.verts[i] = (int)indices[i];
+    offset += 4 * (size_t)count;
+
+    if (levels) {
+        double scale = 1.0;
+        for (uint32_t i = 0; i < decimalPlaces; ++i) scale *= 10.0;
+        if (wideLevels) {
+            std::vector<uint32_t> values(count);
+            std::memcpy(&values[0], p + offset, 4 * (size_t)count);
+            for (uint32_t i = 0; i < count; ++i) out.weights[i] = (float)(values[i] / scale);
+        }
+        else {
+            std::vector<uint16_t> values(count);
+            std::memcpy(&values[0], p + offset, 2 * (size_t)count);
+            for (uint32_t i = 0; i < count; ++i) out.weights[i] = (float)(values[i] / scale);
+        }
+    }
+    else {
+        std::memcpy(&out.weights[0], p + offset, 4 * (size_t)count);
+    }
+    return true;
+}
+
+// Minimal JSON cursor, enough for the export layout:
+// {"mesh": str, ..., "blendWeights": [{"weight": str, "vertices": [int | [start, end], ...]}, ...]}
+struct JsonCursor {
+    const char* p;
+    const char* end;
+
+    void ws() { while (p < end && (*p == ' ' || *p == '\t' || *p == '\r' || *p == '\n')) ++p; }
+    bool peek(char c) { ws(); return p < end && *p == c; }
+    bool eat(char c) { if (!peek(c)) return false; ++p; return true; }
+
+    bool str(std::string& s) {
+        if (!eat('"')) return false;
+        s.clear();
+        while (p < end && *p != '"') {
+            if (*p == '\\' && p + 1 < end) {
+                ++p;
+                switch (*p) {
+                    case 'n': s += '\n'; break;
+                    case 't': s += '\t'; break;
+                    case 'u': s += '?'; if (end - p > 4) p += 4; break;
+                    default: s += *p; break;
+                }
+                ++p;
+            }
+            else s += *p++;
+        }
+        return eat('"');
+    }
+
+    bool integer(int& v) {
+        ws();
+        bool neg = (p < end && *p == '-');
+        if (neg) ++p;
+        if (p >= end || *p < '0' || *p > '9') return false;
+        long long n = 0;
+        while (p < end && *p >= '0' && *p <= '9') n = n * 10 + (*p++ - '0');
+        v = (int)(neg ? -n : n);
+        return true;
+    }
+
+    bool number(double& v) {
+        ws();
+        const char* start = p;
+        while (p < end && (std::strchr("+-.eE", *p) || (*p >= '0' && *p <= '9'))) ++p;
+        if (p == start) return false;
+        return parseDouble(std::string(start, p), v);
+    }
+
+    static bool parseDouble(const std::string& text, double& v) {
+        // classic locale, Maya may run with a decimal comma
+        std::istringstream in(text);
+        in.imbue(std::locale::classic());
+        in >> v;
+        return !in.fail();
+    }
+
+    bool skip() {
+        ws();
+        if (p >= end) return false;
+        if (*p == '"') { std::string s; return str(s); }
+        if (*p == '{' || *p == '[') {
+            int depth = 0;
+            while (p < end) {
+                if (*p == '"') { std::string s; if (!str(s)) return false; continue; }
+                if (*p == '{' || *p == '[') ++depth;
+                else if (*p == '}' || *p == ']') { if (--depth == 0) { ++p; return true; } }
+                ++p;
+            }
+            return false;
+        }
+        while (p < end && *p != ',' && *p != '}' && *p != ']') ++p;
+        return true;
+    }
+};
+
+static bool readJsonBlock(JsonCursor& c, DQWeightsData& out, std::string& error) {
+    if (!c.eat('{')) { error = "expected blendWeights object"; return false; }
+    double weight = 0.0;
+    std::vector<int> blockVerts;
+    std::string key;
+    while (!c.eat('}')) {
+        if (!c.str(key) || !c.eat(':')) { error = "bad blendWeights entry"; return false; }
+        if (key == "weight") {
+            if (c.peek('"')) {
+                std::string text;
+                if (!c.str(text) || !JsonCursor::parseDouble(text, weight)) { error = "bad weight value"; return false; }
+            }
+            else if (!c.number(weight)) { error = "bad weight value"; return false; }
+        }
+        else if (key == "vertices") {
+            if (!c.eat('[')) { error = "bad vertices list"; return false; }
+            while (!c.eat(']')) {
+                int a, b;
+                if (c.eat('[')) {
+                    // [start, end] run (range encoded exports)
+                    if (!c.integer(a) || !c.eat(',') || !c.integer(b) || !c.eat(']')) { error = "bad vertex range"; return false; }
+                    for (int v = a; v <= b; ++v) blockVerts.push_back(v);
+                }
+                else if (c.integer(a)) blockVerts.push_back(a);
+                else { error = "bad vertex index"; return false; }
+                c.eat(',');
+            }
+        }
+        else if (!c.skip()) { error = "bad JSON value"; return false; }
+        c.eat(',');
+    }
+    out.verts.insert(out.verts.end(), blockVerts.begin(), blockVerts.end());
+    out.weights.insert(out.weights.end(), blockVerts.size(), (float)weight);
+    return true;
+}
+
+static bool readDQJson(const std::vector<char>& buf, DQWeightsData& out, std::string& error) {
+    JsonCursor c = { buf.empty() ? 0 : &buf[0], buf.empty() ? 0 : &buf[0] + buf.size() };
+    if (!c.eat('{')) { error = "not a JSON object"; return false; }
+    std::string key;
+    while (!c.eat('}')) {
+        if (!c.str(key) || !c.eat(':')) { error = "bad JSON key"; return false; }
+        if (key == "mesh") {
+            if (!c.str(out.mesh)) { error = "bad mesh name"; return false; }
+        }
+        else if (key == "blendWeights") {
+            if (!c.eat('[')) { error = "bad blendWeights list"; return false; }
+            while (!c.eat(']')) {
+                if (!readJsonBlock(c, out, error)) return false;
+                c.eat(',');
+            }
+        }
+        else if (!c.skip()) { error = "bad JSON value"; return false; }
+        c.eat(',');
+    }
+    return true;
+}
+
+// --- Packed arguments: base64 of little-endian uint32 vertices / float32 weights ---
+static bool decodeBase64(const MString& text, std::vector<unsigned char>& out) {
+    static signed char table[256];
+    static bool ready = false;
+    if (!ready) {
+        const char* alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+        std::memset(table, -1, sizeof(table));
+        for (int i = 0; i < 64; ++i) table[(unsigned char)alphabet[i]] = (signed char)i;
+        ready = true;
+    }
+    const unsigned char* p = (const unsigned char*)text.asChar();
+    unsigned int length = text.length();
+    while (length > 0 && p[length - 1] == '=') --length;
+    if (length % 4 == 1) return false;
+
+    out.resize(length / 4 * 3 + (length % 4 ? length % 4 - 1 : 0));
+    size_t o = 0;
+    unsigned int acc = 0;
+    int bits = 0;
+    for (unsigned int i = 0; i < length; ++i) {
+        signed char v = table[p[i]];
+        if (v < 0) return false;
+        acc = (acc << 6) | (unsigned int)v;
+        bits += 6;
+        if (bits >= 8) {
+            bits -= 8;
+            out[o++] = (unsigned char)(acc >> bits);
+        }
+    }
+    return o == out.size();
+}
+
+template <typename T>
+static bool decodePacked(const MString& text, std::vector<T>& out) {
+    std::vector<unsigned char> bytes;
+    if (!decodeBase64(text, bytes) || bytes.size() % sizeof(T)) return false;
+    out.resize(bytes.size() / sizeof(T));
+    if (!out.empty()) std::memcpy(&out[0], &bytes[0], bytes.size());
+    return true;
+}
+
+// Level ids are uint16 or uint32, told apart by the decoded size
+static bool decodeLevelIds(const MString& text, size_t count, std::vector<uint32_t>& out) {
+    std::vector<unsigned char> bytes;
+    if (!decodeBase64(text, bytes)) return false;
+    out.resize(count);
+    if (bytes.size() == 2 * count) {
+        for (size_t i = 0; i < count; ++i) {
+            uint16_t id;
+            std::memcpy(&id, &bytes[2 * i], 2);
+            out[i] = id;
+        }
+        return true;
+    }
+    if (bytes.size() == 4 * count) {
+        if (count > 0) std::memcpy(&out[0], &bytes[0], bytes.size());
+        return true;
+    }
+    return false;
+}
+
+// Query results go back the same way: one base64 string of little-endian float32
+static MString encodeBase64(const unsigned char* data, size_t size) {
+    static const char* alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+    std::string out;
+    out.reserve((size + 2) / 3 * 4);
+    for (size_t i = 0; i < size; i += 3) {
+        unsigned int acc = (unsigned int)data[i] << 16;
+        if (i + 1 < size) acc |= (unsigned int)data[i + 1] << 8;
+        if (i + 2 < size) acc |= data[i + 2];
+        out += alphabet[(acc >> 18) & 63];
+        out += alphabet[(acc >> 12) & 63];
+        out += i + 1 < size ? alphabet[(acc >> 6) & 63] : '=';
+        out += i + 2 < size ? alphabet[acc & 63] : '=';
+    }
+    return MString(out.c_str());
+}
+
+template <typename T>
+static MString encodePacked(const std::vector<T>& values) {
+    if (values.empty()) return MString();
+    return encodeBase64((const unsigned char*)&values[0], values.size() * sizeof(T));
+}
+
+// --- Palette write: one color per level, face-vertices share color indices ---
+typedef std::tuple<float, float, float, float> ColorKey;
+
+static int paletteIndex(std::map<ColorKey, int>& lookup, MColorArray& palette, const MColor& c) {
+    ColorKey key(c.r, c.g, c.b, c.a);
+    std::map<ColorKey, int>::iterator it = lookup.find(key);
+    if (it != lookup.end()) return it->second;
+    int index = (int)palette.length();
+    palette.append(c);
+    lookup[key] = index;
+    return index;
+}
+
+// Unique colors of a per-vertex color list, ids[i] indexes palette
+static void buildPalette(const MColorArray& colors, MColorArray& palette, std::vector<int>& ids) {
+    std::map<ColorKey, int> lookup;
+    ids.resize(colors.length());
+    for (unsigned int i = 0; i < colors.length(); ++i) ids[i] = paletteIndex(lookup, palette, colors[i]);
+}
+
+// Rewrites the whole color set: setColors with the palette, assignColors with one id per face-vertex.
+// keepExisting: face-vertices of unlisted vertices keep their current color (added to the palette),
+// otherwise they are left without a color, like a freshly created set.
+static MStatus writePaletteColors(MFnMesh& fnMesh, const MString& colorSet, const MIntArray& verts,
+                                  const MColorArray& palette, const std::vector<int>& ids, bool keepExisting) {
+    MStatus status;
+    int numVerts = fnMesh.numVertices();
+    std::vector<int> vertexColorId(numVerts, -1);
+    for (unsigned int i = 0; i < verts.length(); ++i) {
+        if (verts[i] >= 0 && verts[i] < numVerts) vertexColorId[verts[i]] = ids[i];
+    }
+
+    MIntArray polyCounts, polyVerts;
+    fnMesh.getVertices(polyCounts, polyVerts);
+
+    MColorArray table = palette;
+    MColorArray existing;
+    std::map<ColorKey, int> lookup;
+    if (keepExisting) {
+        fnMesh.getFaceVertexColors(existing, &colorSet);
+        for (unsigned int i = 0; i < table.length(); ++i) lookup[ColorKey(table[i].r, table[i].g, table[i].b, table[i].a)] = (int)i;
+    }
+
+    MIntArray colorIds(polyVerts.length(), -1);
+    for (unsigned int fv = 0; fv < polyVerts.length(); ++fv) {
+        int id = vertexColorId[polyVerts[fv]];
+        if (id < 0 && keepExisting && fv < existing.length()) {
+            const MColor& c = existing[fv];
+            // unset face-vertex colors come back as -1
+            if (!(c.r == -1.0f && c.g == -1.0f && c.b == -1.0f)) id = paletteIndex(lookup, table, c);
+        }
+        colorIds[fv] = id;
+    }
+
+    status = fnMesh.setColors(table, &colorSet);
+    if (!status) return status;
+    return fnMesh.assignColors(colorIds, &colorSet);
+}
+
+// --- Color ramps: weight -> color through a lookup table ---
+// "gray" keeps (w, w, w) exactly, any other ramp is sampled once into kRampLutSize colors.
+static const unsigned int kRampLutSize = 4096;
+
+static const float kViridisStops[9][3] = {
+    {0.267f, 0.004f, 0.329f}, {0.278f, 0.176f, 0.482f}, {0.231f, 0.322f, 0.545f},
+    {0.173f, 0.447f, 0.557f}, {0.129f, 0.565f, 0.549f}, {0.153f, 0.678f, 0.506f},
+    {0.365f, 0.784f, 0.388f}, {0.667f, 0.863f, 0.196f}, {0.992f, 0.906f, 0.145f}
+};
+
+// spec: "gray", "viridis" or evenly spaced "r g b;r g b;..." stops in 0-1, e.g. "0 0 1;0 1 0;1 0 0"
+static bool buildRampLut(const MString& spec, std::vector<MColor>& lut, std::string& error) {
+    lut.clear();
+    std::string text = spec.asChar();
+    if (text.empty() || text == "gray") return true;
+
+    std::vector<MColor> stops;
+    if (text == "viridis") {
+        for (int i = 0; i < 9; ++i) stops.push_back(MColor(kViridisStops[i][0], kViridisStops[i][1], kViridisStops[i][2], 1.0f));
+    }
+    else {
+        std::istringstream in(text);
+        std::string item;
+        while (std::getline(in, item, ';')) {
+            std::istringstream stop(item);
+            stop.imbue(std::locale::classic());
+            float r, g, b;
+            if (!(stop >> r >> g >> b)) { error = "bad ramp stop '" + item + "'"; return false; }
+            stops.push_back(MColor(r, g, b, 1.0f));
+        }
+        if (stops.size() < 2) { error = "a ramp needs \"gray\", \"viridis\" or at least 2 \"r g b\" stops"; return false; }
+    }
+
+    lut.resize(kRampLutSize);
+    const size_t segments = stops.size() - 1;
+    for (unsigned int i = 0; i < kRampLutSize; ++i) {
+        double t = (double)i / (kRampLutSize - 1) * segments;
+        size_t k = std::min((size_t)t, segments - 1);
+        float f = (float)(t - k);
+        const MColor& a = stops[k];
+        const MColor& b = stops[k + 1];
+        lut[i] = MColor(a.r + (b.r - a.r) * f, a.g + (b.g - a.g) * f, a.b + (b.b - a.b) * f, 1.0f);
+    }
+    return true;
+}
+
+static inline MColor rampColor(const std::vector<MColor>& lut, float w) {
+    if (lut.empty()) return MColor(w, w, w, 1.0f);
+    // NaN and negative weights take the first color
+    float t = w > 0.0f ? (w < 1.0f ? w : 1.0f) : 0.0f;
+    return lut[(unsigned int)(t * (kRampLutSize - 1) + 0.5f)];
+}
+
+// Inverse of the LUT for queries: rgb -> first LUT index with that color, built once per query
+typedef std::map<ColorKey, unsigned int> RampIndex;
+
+static void buildRampIndex(const std::vector<MColor>& lut, RampIndex& index) {
+    index.clear();
+    for (unsigned int i = 0; i < lut.size(); ++i) index.insert(std::make_pair(ColorKey(lut[i].r, lut[i].g, lut[i].b, 1.0f), i));
+}
+
+// Inverse of rampColor for queries, gray is the red channel. Colors written through the ramp
+// are LUT entries and are found in the index; anything else (painted over) takes the nearest entry.
+static float rampWeight(const std::vector<MColor>& lut, const RampIndex& index, const MColor& c) {
+    if (lut.empty()) return c.r;
+    RampIndex::const_iterator it = index.find(ColorKey(c.r, c.g, c.b, 1.0f));
+    if (it != index.end()) return (float)it->second / (kRampLutSize - 1);
+    unsigned int best = 0;
+    float bestDistance = -1.0f;
+    for (unsigned int i = 0; i < lut.size(); ++i) {
+        float dr = lut[i].r - c.r, dg = lut[i].g - c.g, db = lut[i].b - c.b;
+        float distance = dr * dr + dg * dg + db * db;
+        if (bestDistance < 0.0f || distance < bestDistance) { best = i; bestDistance = distance; }
+    }
+    return (float)best / (kRampLutSize - 1);
+}
+
+// fn(begin, end) over [0, count) split between hardware threads, small counts stay on this thread.
+// fn must only touch its own range and must not call into Maya.
+template <typename Fn>
+static void parallelChunks(unsigned int count, Fn fn, unsigned int minChunk = 65536) {
+    unsigned int threads = std::max(1u, std::thread::hardware_concurrency());
+    threads = std::min(threads, (count + minChunk - 1) / minChunk);
+    if (threads <= 1) { fn(0u, count); return; }
+
+    unsigned int chunk = (count + threads - 1) / threads;
+    std::vector<std::thread> workers;
+    for (unsigned int t = 1; t < threads; ++t) {
+        workers.push_back(std::thread(fn, std::min(t * chunk, count), std::min((t + 1) * chunk, count)));
+    }
+    fn(0u, std::min(chunk, count));
+    for (size_t t = 0; t < workers.size(); ++t) workers[t].join();
+}
+
+// Per-vertex weights -> colors, built in a plain buffer so threads never write into an MColorArray
+static void mapWeightsToColors(const float* weights, unsigned int count, const std::vector<MColor>& lut, MColorArray& colors) {
+    std::vector<MColor> buffer(count);
+    parallelChunks(count, [&](unsigned int begin, unsigned int end) {
+        for (unsigned int i = begin; i < end; ++i) buffer[i] = rampColor(lut, weights[i]);
+    });
+    colors = count > 0 ? MColorArray(&buffer[0], count) : MColorArray();
+}
+
+// Delta exports are read as-is (only the changed blocks), the caller resolves the chain if needed
+static bool readDQWeightsFile(const MString& path, DQWeightsData& out, std::string& error) {
+    std::vector<char> buf;
+    if (!readWholeFile(path, buf)) { error = "can't read file"; return false; }
+    if (buf.size() >= 4 && std::memcmp(&buf[0], "DQW1", 4) == 0) return readDQW(buf, out, error);
+    return readDQJson(buf, out, error);
+}
+
+// Flags of one mesh. With several -mesh flags, each -mesh starts a new mesh that takes the
+// flags before the first -mesh as defaults, and the flags after it up to the next -mesh.
+struct ApplyArgs {
+    ApplyArgs() : colorSetName("dqColorSet"), ramp("gray"), channel("weight"),
+                  merge(true), noProgress(false), palette(false), query(false) {}
+    bool hasData() const {
+        return filePath.length() > 0 || packedVerts.length() > 0 || packedWeights.length() > 0
+            || packedLevels.length() > 0 || vertArray.length() > 0 || colors.length() > 0;
+    }
+
+    MString meshName, colorSetName, filePath;
+    MString packedVerts, packedWeights, packedLevels, packedLevelIds;
+    MString ramp, channel;
+    bool merge, noProgress, palette, query;
+    MIntArray vertArray;
+    MColorArray colors;
+};
+
+// Reads the flag token at args[i] (anything but -mesh), i is left on its last value
+static void parseApplyFlag(const MArgList& args, unsigned int& i, const MString& token, ApplyArgs& a) {
+    MStatus status;
+    if (token == "-set" || token == "-s") {
+        a.colorSetName = args.asString(++i, &status);
+    }
+    else if (token == "-merge" || token == "-M") {
+        a.merge = args.asBool(++i, &status);
+    }
+    else if (token == "-noProgress" || token == "-np") {
+        a.noProgress = args.asBool(++i, &status);
+    }
+    else if (token == "-palette" || token == "-p") {
+        a.palette = args.asBool(++i, &status);
+    }
+    else if (token == "-packedLevels" || token == "-pl") {
+        a.packedLevels = args.asString(++i, &status);
+    }
+    else if (token == "-packedLevelIds" || token == "-pli") {
+        a.packedLevelIds = args.asString(++i, &status);
+    }
+    else if (token == "-ramp" || token == "-r") {
+        a.ramp = args.asString(++i, &status);
+    }
+    else if (token == "-query" || token == "-q") {
+        a.query = true;
+    }
+    else if (token == "-channel" || token == "-ch") {
+        a.channel = args.asString(++i, &status);
+    }
+    else if (token == "-file" || token == "-f") {
+        a.filePath = args.asString(++i, &status);
+    }
+    else if (token == "-packedVerts" || token == "-pv") {
+        a.packedVerts = args.asString(++i, &status);
+    }
+    else if (token == "-packedWeights" || token == "-pw") {
+        a.packedWeights = args.asString(++i, &status);
+    }
+    else if (token == "-verts" || token == "-v") {
+        ++i;
+        while (i < args.length()) {
+            // a flag doesn't convert to a number, no string copy per token
+            int v = args.asInt(i, &status);
+            if (!status) { --i; break; }
+            a.vertArray.append(v);
+            ++i;
+        }
+    }
+    else if (token == "-colors" || token == "-c") {
+        ++i;
+        while (i + 2 < args.length()) {
+            double r = args.asDouble(i, &status);
+            if (!status) break;
+            double g = args.asDouble(i + 1, &status);
+            double b = args.asDouble(i + 2, &status);
+            a.colors.append(MColor((float)r, (float)g, (float)b, 1.0f));
+            i += 3;
+        }
+        --i;
+    }
+}
 
 class ApplyDQVertexColorsCmd : public MPxCommand {
 public:
-    ApplyDQVertexColorsCmd() {}
+    ApplyDQVertexColorsCmd() : merge_(true), noProgress_(false), palette_(false), query_(false), nothingDone_(false), hadSet_(false), prevDisplayColors_(false) {}
     virtual MStatus doIt(const MArgList& args) override;
+    virtual MStatus redoIt() override;
+    virtual MStatus undoIt() override;
+    virtual bool isUndoable() const override { return !query_ && !nothingDone_; }
     static void* creator() { return new ApplyDQVertexColorsCmd; }
     static MSyntax newSyntax();
     static const char* kName() { return "applyDQVertexColors"; }
+
+protected:
+    MStatus prepare(ApplyArgs& a);
+    MStatus redoBatch();
+    void takeSnapshot(MFnMesh& fnMesh);
+    MStatus queryColors(const MIntArray& subset, const MString& channel, const std::vector<MColor>& lut);
+
+    // What to write, kept as palette + ids so the undo queue holds 4 bytes per vertex
+    MDagPath meshDag_;
+    MString colorSetName_;
+    bool merge_, noProgress_, palette_, query_;
+    bool nothingDone_; // succeeded without touching the mesh: no snapshot, nothing to undo
+    MIntArray verts_;
+    MColorArray paletteColors_;
+    std::vector<int> paletteIds_;
+
+    // Undo snapshot: only the touched vertices (merge) or the colored vertices of the replaced set
+    bool hadSet_;
+    MString prevCurrentSet_;
+    bool prevDisplayColors_;
+    MIntArray prevVerts_;
+    MColorArray prevPalette_;
+    std::vector<int> prevIds_; // index into prevPalette_, -1 = vertex had no color
+
+    // Several meshes in one call: one prepared command per mesh, this one only drives them
+    std::vector<std::unique_ptr<ApplyDQVertexColorsCmd> > batch_;
+    std::vector<int> batchTargets_; // position of each batch_ command's -mesh flag, returned as the result
 };
 
+static bool hasColorSet(const MFnMesh& fnMesh, const MString& name) {
+    MStringArray existing;
+    fnMesh.getColorSetNames(existing);
+    for (unsigned int i = 0; i < existing.length(); ++i) {
+        if (existing[i] == name) return true;
+    }
+    return false;
+}
+
 MSyntax ApplyDQVertexColorsCmd::newSyntax() {
     MSyntax syn;
     syn.addFlag("-mesh", "-m", MSyntax::kString);
@@ -29,8 +649,20 @@ MSyntax ApplyDQVertexColorsCmd::newSyntax() {
     syn.addFlag("-verts", "-v", MSyntax::kLong); // repeated integers
     syn.addFlag("-set", "-s", MSyntax::kString);
     syn.addFlag("-merge", "-M", MSyntax::kBoolean); // The new flag
+    syn.addFlag("-file", "-f", MSyntax::kString); // JSON export or .dqw, replaces -verts/-colors
+    syn.addFlag("-packedVerts", "-pv", MSyntax::kString); // base64 uint32 vertex ids
+    syn.addFlag("-packedWeights", "-pw", MSyntax::kString); // base64 float32 weights, grayscale
+    syn.addFlag("-noProgress", "-np", MSyntax::kBoolean); // no progress bar, single write (batch runs)
+    syn.addFlag("-palette", "-p", MSyntax::kBoolean); // shared colors per weight level (setColors + assignColors)
+    syn.addFlag("-packedLevels", "-pl", MSyntax::kString); // base64 float32 unique weights, with -packedLevelIds
+    syn.addFlag("-packedLevelIds", "-pli", MSyntax::kString); // base64 uint16/uint32 level index per vertex
+    syn.addFlag("-ramp", "-r", MSyntax::kString); // "gray" (default), "viridis" or "r g b;r g b;..." stops
+    syn.addFlag("-channel", "-ch", MSyntax::kString); // query: "weight" (default, 1 float) or "rgba" (4 floats) per vertex
     syn.useSelectionAsDefault(false);
-    syn.enableQuery(false);
+    syn.enableQuery(true); // -query: packed colors of -set for the mesh or -verts/-packedVerts
+    // in query mode flags take no value unless they are made full-argument query flags
+    const char* queryFlags[] = {"-mesh", "-set", "-channel", "-ramp", "-packedVerts", "-verts"};
+    for (size_t i = 0; i < sizeof(queryFlags) / sizeof(queryFlags[0]); ++i) syn.makeFlagQueryWithFullArgs(queryFlags[i], false);
     syn.enableEdit(false);
     return syn;
 }
@@ -38,119 +670,377 @@ MSyntax ApplyDQVertexColorsCmd::newSyntax() {
 MStatus ApplyDQVertexColorsCmd::doIt(const MArgList& args) {
     MStatus status;
 
-    MString meshName;
-    MString colorSetName = "dqColorSet";
-    bool merge = true; // combine by default
-    MIntArray vertArray;
-    MColorArray colors;
-
-    // --- Flag parsing ---
+    // --- Flag parsing: one ApplyArgs per -mesh ---
+    std::vector<ApplyArgs> targets(1);
+    ApplyArgs shared;
+    bool seenMesh = false;
     for (unsigned int i = 0; i < args.length(); ++i) {
         MString token = args.asString(i, &status);
         if (token == "-mesh" || token == "-m") {
-            meshName = args.asString(++i, &status);
+            if (!seenMesh) shared = targets.back();
+            else targets.push_back(shared);
+            seenMesh = true;
+            targets.back().meshName = args.asString(++i, &status);
         }
-        else if (token == "-set" || token == "-s") {
-            colorSetName = args.asString(++i, &status);
+        else parseApplyFlag(args, i, token, targets.back());
+    }
+
+    if (targets.size() == 1) {
+        status = prepare(targets[0]);
+        if (!status || query_) return status;
+        return redoIt();
+    }
+
+    // --- Several meshes: one command, so one undo chunk and one progress window ---
+    if (shared.hasData()) {
+        MGlobal::displayError("applyDQVertexColors: with several -mesh flags, -file/-verts/-colors/-packed* go after their -mesh.");
+        return MS::kFailure;
+    }
+    noProgress_ = false;
+    for (size_t m = 0; m < targets.size(); ++m) {
+        if (targets[m].query) { MGlobal::displayError("applyDQVertexColors: -query takes a single -mesh."); return MS::kFailure; }
+    }
+    for (size_t m = 0; m < targets.size(); ++m) {
+        noProgress_ = noProgress_ || targets[m].noProgress;
+        std::unique_ptr<ApplyDQVertexColorsCmd> target(new ApplyDQVertexColorsCmd);
+        // a mesh that can't be prepared (missing, ambiguous name, bad data) is skipped, the others are applied
+        if (!target->prepare(targets[m])) {
+            MGlobal::displayWarning("applyDQVertexColors: skipped -mesh " + targets[m].meshName + ".");
+            continue;
         }
-        else if (token == "-merge" || token == "-M") {
-            merge = args.asBool(++i, &status);
+        target->noProgress_ = true;
+        batch_.push_back(std::move(target));
+        batchTargets_.push_back((int)m);
+    }
+    if (batch_.empty()) { MGlobal::displayError("applyDQVertexColors: none of the meshes could be applied."); return MS::kFailure; }
+
+    status = redoIt();
+    if (!status) return status;
+    // result: 0-based positions of the -mesh flags that were written
+    clearResult();
+    for (size_t m = 0; m < batchTargets_.size(); ++m) appendToResult(batchTargets_[m]);
+    return MS::kSuccess;
+}
+
+// Resolves one mesh and its colors (palette + ids) from its flags, nothing is written yet
+MStatus ApplyDQVertexColorsCmd::prepare(ApplyArgs& a) {
+    MStatus status;
+    MColorArray paletteColors;
+    std::vector<int> paletteIds;
+
+    std::vector<MColor> lut;
+    std::string rampError;
+    if (!buildRampLut(a.ramp, lut, rampError)) {
+        MGlobal::displayError("applyDQVertexColors: " + MString(rampError.c_str()));
+        return MS::kFailure;
+    }
+    // --- Query: the color set read back as one packed array ---
+    if (a.query) {
+        query_ = true;
+        if (a.meshName.length() == 0) { MGlobal::displayError("applyDQVertexColors: -mesh required."); return MS::kFailure; }
+        if (a.packedVerts.length() > 0) {
+            std::vector<uint32_t> verts;
+            if (!decodePacked(a.packedVerts, verts)) { MGlobal::displayError("applyDQVertexColors: bad -packedVerts data."); return MS::kFailure; }
+            for (size_t i = 0; i < verts.size(); ++i) a.vertArray.append((int)verts[i]);
         }
-        else if (token == "-verts" || token == "-v") {
-            ++i;
-            while (i < args.length()) {
-                MString tok = args.asString(i, &status);
-                if (tok.length() > 0 && tok.asChar()[0] == '-') { --i; break; }
-                int v = args.asInt(i, &status);
-                vertArray.append(v);
-                ++i;
-            }
+        MSelectionList sel;
+        sel.add(a.meshName);
+        if (!sel.getDagPath(0, meshDag_)) { MGlobal::displayError("applyDQVertexColors: mesh not found: " + a.meshName); return MS::kFailure; }
+        meshDag_.extendToShape();
+        colorSetName_ = a.colorSetName;
+        return queryColors(a.vertArray, a.channel, lut);
+    }
+
+    // -colors gives the weight as the red channel
+    if (!lut.empty()) {
+        for (unsigned int i = 0; i < a.colors.length(); ++i) a.colors[i] = rampColor(lut, a.colors[i].r);
+    }
+
+    // --- Reading weights from file, colors are built here ---
+    if (a.filePath.length() > 0) {
+        DQWeightsData data;
+        std::string error;
+        if (!readDQWeightsFile(a.filePath, data, error)) {
+            MGlobal::displayError("applyDQVertexColors: " + a.filePath + ": " + MString(error.c_str()));
+            return MS::kFailure;
         }
-        else if (token == "-colors" || token == "-c") {
-            ++i;
-            while (i + 2 < args.length()) {
-                MString tok = args.asString(i, &status);
-                if (tok.length() > 0 && tok.asChar()[0] == '-') { --i; break; }
-                double r = args.asDouble(i, &status);
-                double g = args.asDouble(i + 1, &status);
-                double b = args.asDouble(i + 2, &status);
-                colors.append(MColor((float)r, (float)g, (float)b, 1.0f));
-                i += 3;
+        if (a.meshName.length() == 0) a.meshName = data.mesh.c_str();
+        unsigned int count = (unsigned int)data.verts.size();
+        a.vertArray = MIntArray(count > 0 ? &data.verts[0] : 0, count);
+        mapWeightsToColors(count > 0 ? &data.weights[0] : 0, count, lut, a.colors);
+    }
+
+    // --- Packed arrays ---
+    if (a.packedLevels.length() > 0) {
+        // palette input: unique levels + level index per vertex
+        std::vector<uint32_t> verts, ids;
+        std::vector<float> levels;
+        if (!decodePacked(a.packedVerts, verts) || !decodePacked(a.packedLevels, levels)
+                || !decodeLevelIds(a.packedLevelIds, verts.size(), ids)) {
+            MGlobal::displayError("applyDQVertexColors: bad -packedVerts/-packedLevels/-packedLevelIds data.");
+            return MS::kFailure;
+        }
+        unsigned int count = (unsigned int)verts.size();
+        for (unsigned int l = 0; l < levels.size(); ++l) paletteColors.append(rampColor(lut, levels[l]));
+        a.vertArray.setLength(count);
+        paletteIds.resize(count);
+        for (unsigned int i = 0; i < count; ++i) {
+            if (ids[i] >= levels.size()) {
+                MGlobal::displayError("applyDQVertexColors: level id out of range.");
+                return MS::kFailure;
             }
-            --i;
+            a.vertArray[i] = (int)verts[i];
+            paletteIds[i] = (int)ids[i];
+        }
+        a.palette = true;
+    }
+    else if (a.packedVerts.length() > 0 || a.packedWeights.length() > 0) {
+        std::vector<uint32_t> verts;
+        std::vector<float> weights;
+        if (!decodePacked(a.packedVerts, verts) || !decodePacked(a.packedWeights, weights)) {
+            MGlobal::displayError("applyDQVertexColors: bad -packedVerts/-packedWeights data.");
+            return MS::kFailure;
+        }
+        if (verts.size() != weights.size()) {
+            MGlobal::displayError("applyDQVertexColors: packed vertex and weight counts differ.");
+            return MS::kFailure;
         }
+        unsigned int count = (unsigned int)verts.size();
+        a.vertArray = MIntArray(count > 0 ? (const int*)&verts[0] : 0, count);
+        mapWeightsToColors(count > 0 ? &weights[0] : 0, count, lut, a.colors);
     }
 
-    if (meshName.length() == 0) { MGlobal::displayError("applyDQVertexColors: -mesh required."); return MS::kFailure; }
-    if (vertArray.length() == 0) { MGlobal::displayError("applyDQVertexColors: no vertices provided."); return MS::kFailure; }
-    if (colors.length() == 0 || colors.length() != vertArray.length()) {
+    if (a.meshName.length() == 0) { MGlobal::displayError("applyDQVertexColors: -mesh required."); return MS::kFailure; }
+    if (a.vertArray.length() == 0) { MGlobal::displayError("applyDQVertexColors: no vertices provided."); return MS::kFailure; }
+    if (paletteIds.empty() && (a.colors.length() == 0 || a.colors.length() != a.vertArray.length())) {
         MGlobal::displayError("applyDQVertexColors: colors missing or count mismatch.");
         return MS::kFailure;
     }
 
     // --- Getting a mesh ---
     MSelectionList sel;
-    sel.add(meshName);
-    MDagPath meshDag;
-    status = sel.getDagPath(0, meshDag);
-    if (!status) { MGlobal::displayError("applyDQVertexColors: mesh not found."); return MS::kFailure; }
-    meshDag.extendToShape();
-    MFnMesh fnMesh(meshDag, &status);
-    if (!status) { MGlobal::displayError("applyDQVertexColors: failed to get MFnMesh."); return MS::kFailure; }
+    sel.add(a.meshName);
+    status = sel.getDagPath(0, meshDag_);
+    if (!status) { MGlobal::displayError("applyDQVertexColors: mesh not found: " + a.meshName); return MS::kFailure; }
+    meshDag_.extendToShape();
 
-    // --- Creating a colorSet based on merge ---
-    MStringArray existing;
-    fnMesh.getColorSetNames(existing);
-    bool hasSet = false;
-    for (unsigned int i = 0; i < existing.length(); ++i) {
-        if (existing[i] == colorSetName) { hasSet = true; break; }
-    }
+    colorSetName_ = a.colorSetName;
+    merge_ = a.merge;
+    noProgress_ = a.noProgress;
+    palette_ = a.palette;
+    verts_ = a.vertArray;
+    if (paletteIds.empty()) buildPalette(a.colors, paletteColors, paletteIds);
+    paletteColors_ = paletteColors;
+    paletteIds_.swap(paletteIds);
 
-    if (!merge && hasSet) {
-        fnMesh.deleteColorSet(colorSetName);
-        hasSet = false;
-    }
+    return MS::kSuccess;
+}
 
-    if (!hasSet) { fnMesh.createColorSet(colorSetName); }
-    fnMesh.setCurrentColorSetName(colorSetName);
+void ApplyDQVertexColorsCmd::takeSnapshot(MFnMesh& fnMesh) {
+    MStatus status;
+    prevVerts_.clear();
+    prevPalette_.clear();
+    prevIds_.clear();
 
-    // --- Progress window ---
-    MGlobal::executeCommand(
-        "progressWindow -title \"Applying DQ Colors\" "
-        "-progress 0 "
-        "-max " + MString() + vertArray.length() +
-        " -status \"Applying vertex colors...\" -isInterruptable true"
-    );
+    hadSet_ = hasColorSet(fnMesh, colorSetName_);
+    prevCurrentSet_ = fnMesh.currentColorSetName();
+    MPlug displayColorsPlug = fnMesh.findPlug("displayColors", false, &status);
+    prevDisplayColors_ = status && displayColorsPlug.asBool();
+    if (!hadSet_) return;
 
-    // --- Processing in blocks of 666 vertices ---
-    const unsigned int blockSize = 666;
-    for (unsigned int start = 0; start < vertArray.length(); start += blockSize) {
-        unsigned int end = std::min(start + blockSize, (unsigned int)vertArray.length());
+    // unset vertices come back as -1 and are removed again on undo
+    const MColor unset(-1.0f, -1.0f, -1.0f, -1.0f);
+    MColorArray vertexColors;
+    fnMesh.getVertexColors(vertexColors, &colorSetName_, &unset);
+    std::map<ColorKey, int> lookup;
+    int numVerts = (int)vertexColors.length();
 
-        MIntArray blockVerts;
-        MColorArray blockColors;
-        for (unsigned int i = start; i < end; ++i) {
-            blockVerts.append(vertArray[i]);
-            blockColors.append(colors[i]);
+    if (merge_) {
+        for (unsigned int i = 0; i < verts_.length(); ++i) {
+            int v = verts_[i];
+            if (v < 0 || v >= numVerts) continue;
+            const MColor& c = vertexColors[v];
+            prevVerts_.append(v);
+            prevIds_.push_back(c.r == -1.0f && c.a == -1.0f ? -1 : paletteIndex(lookup, prevPalette_, c));
+        }
+    }
+    else {
+        // the set is replaced: keep its colored vertices (per vertex, face-vertex splits are averaged)
+        for (int v = 0; v < numVerts; ++v) {
+            const MColor& c = vertexColors[v];
+            if (c.r == -1.0f && c.a == -1.0f) continue;
+            prevVerts_.append(v);
+            prevIds_.push_back(paletteIndex(lookup, prevPalette_, c));
         }
+    }
+}
 
-        fnMesh.setVertexColors(blockColors, blockVerts);
+// Result: base64 float32, per vertex the weight (-1 = no color) or r, g, b, a (-1 each = no color).
+// With a ramp the weight is decoded back through the inverted LUT.
+MStatus ApplyDQVertexColorsCmd::queryColors(const MIntArray& subset, const MString& channel, const std::vector<MColor>& lut) {
+    MStatus status;
+    MFnMesh fnMesh(meshDag_, &status);
+    if (!status) { MGlobal::displayError("applyDQVertexColors: failed to get MFnMesh."); return MS::kFailure; }
+    bool rgba = channel == "rgba";
+    if (!rgba && channel != "weight") { MGlobal::displayError("applyDQVertexColors: -channel must be weight or rgba."); return MS::kFailure; }
+    if (!hasColorSet(fnMesh, colorSetName_)) {
+        MGlobal::displayError("applyDQVertexColors: no color set " + colorSetName_ + " on the mesh.");
+        return MS::kFailure;
+    }
+
+    const MColor unset(-1.0f, -1.0f, -1.0f, -1.0f);
+    MColorArray vertexColors;
+    fnMesh.getVertexColors(vertexColors, &colorSetName_, &unset);
+    int numVerts = (int)vertexColors.length();
+    unsigned int count = subset.length() > 0 ? subset.length() : (unsigned int)numVerts;
+
+    std::vector<float> values(rgba ? 4 * (size_t)count : count);
+    RampIndex rampIndex;
+    if (!rgba) buildRampIndex(lut, rampIndex);
+    std::map<ColorKey, float> decoded;
+    for (unsigned int i = 0; i < count; ++i) {
+        int v = subset.length() > 0 ? subset[i] : (int)i;
+        if (v < 0 || v >= numVerts) { MGlobal::displayError("applyDQVertexColors: vertex id out of range."); return MS::kFailure; }
+        const MColor& c = vertexColors[v];
+        if (rgba) {
+            values[4 * i] = c.r;
+            values[4 * i + 1] = c.g;
+            values[4 * i + 2] = c.b;
+            values[4 * i + 3] = c.a;
+        }
+        else if (c.r == -1.0f && c.a == -1.0f) values[i] = -1.0f;
+        else if (lut.empty()) values[i] = c.r;
+        else {
+            // each distinct color is decoded once
+            ColorKey key(c.r, c.g, c.b, c.a);
+            std::map<ColorKey, float>::iterator it = decoded.find(key);
+            if (it == decoded.end()) it = decoded.insert(std::make_pair(key, rampWeight(lut, rampIndex, c))).first;
+            values[i] = it->second;
+        }
+    }
+    setResult(encodePacked(values));
+    return MS::kSuccess;
+}
 
-        // Progress Update
-        MGlobal::executeCommand(MString("progressWindow -edit -progress ") + end);
+MStatus ApplyDQVertexColorsCmd::redoBatch() {
+    unsigned int total = 0;
+    for (size_t m = 0; m < batch_.size(); ++m) total += batch_[m]->verts_.length();
+    bool showProgress = !noProgress_ && MGlobal::mayaState() == MGlobal::kInteractive;
 
-        // Checking for cancellation
-        MString cancelled;
-        MGlobal::executeCommand("progressWindow -query -isCancelled", cancelled);
-        if (cancelled == "true") {
-            MGlobal::executeCommand("progressWindow -edit -endProgress");
+    MComputation computation;
+    if (showProgress) {
+        computation.beginComputation(true, true);
+        computation.setProgressRange(0, (int)total);
+    }
+    unsigned int done = 0;
+    for (size_t m = 0; m < batch_.size(); ) {
+        MStatus status = batch_[m]->redoIt();
+        done += batch_[m]->verts_.length();
+        if (!status) {
+            // a failed mesh has already undone itself: it is dropped, the others keep their colors
+            MGlobal::displayWarning("applyDQVertexColors: skipped " + batch_[m]->meshDag_.partialPathName() + ", its colors could not be written.");
+            batch_.erase(batch_.begin() + m);
+            batchTargets_.erase(batchTargets_.begin() + m);
+        }
+        else ++m;
+        if (showProgress) computation.setProgress((int)done);
+        if (showProgress && computation.isInterruptRequested()) {
+            // cancel rolls the whole call back
+            for (size_t k = m; k-- > 0; ) batch_[k]->undoIt();
+            computation.endComputation();
             MGlobal::displayWarning("Vertex color application cancelled by user.");
             return MS::kFailure;
         }
     }
+    if (showProgress) computation.endComputation();
+    if (batch_.empty()) { MGlobal::displayError("applyDQVertexColors: none of the meshes could be applied."); return MS::kFailure; }
+    return MS::kSuccess;
+}
+
+MStatus ApplyDQVertexColorsCmd::redoIt() {
+    MStatus status;
+    if (!batch_.empty()) return redoBatch();
+    MFnMesh fnMesh(meshDag_, &status);
+    if (!status) { MGlobal::displayError("applyDQVertexColors: failed to get MFnMesh."); return MS::kFailure; }
+
+    takeSnapshot(fnMesh);
+
+    // --- Creating a colorSet based on merge ---
+    bool keepExisting = hadSet_ && merge_;
+    if (hadSet_ && !merge_) fnMesh.deleteColorSet(colorSetName_);
+    if (!keepExisting) { fnMesh.createColorSet(colorSetName_); }
+    fnMesh.setCurrentColorSetName(colorSetName_);
+
+    const unsigned int count = verts_.length();
+
+    // --- Palette write ---
+    // A small update merged into an existing set goes through setVertexColors below,
+    // rewriting every face-vertex id would cost more than it saves.
+    if (palette_ && !(keepExisting && count * 4 < (unsigned int)fnMesh.numVertices())) {
+        status = writePaletteColors(fnMesh, colorSetName_, verts_, paletteColors_, paletteIds_, keepExisting);
+        if (!status) {
+            MGlobal::displayError("applyDQVertexColors: palette write failed.");
+            undoIt();
+            return status;
+        }
+    }
+    else {
+        // --- Writing colors ---
+        // Small meshes and batch runs: one setVertexColors call on the full arrays.
+        // Large interactive runs: blocks sized to take ~100 ms each, progress and
+        // cancel are checked between blocks through MComputation (no MEL round trips).
+        const unsigned int singleCallLimit = 200000;
+        bool showProgress = !noProgress_ && count > singleCallLimit && MGlobal::mayaState() == MGlobal::kInteractive;
+
+        if (!showProgress) {
+            MColorArray colors;
+            colors.setLength(count);
+            for (unsigned int i = 0; i < count; ++i) colors[i] = paletteColors_[paletteIds_[i]];
+            status = fnMesh.setVertexColors(colors, verts_);
+            if (!status) {
+                MGlobal::displayError("applyDQVertexColors: setVertexColors failed.");
+                undoIt();
+                return status;
+            }
+        }
+        else {
+            MComputation computation;
+            computation.beginComputation(true, true);
+            computation.setProgressRange(0, (int)count);
+
+            const double targetSeconds = 0.1;
+            unsigned int blockSize = 50000;
+            MIntArray blockVerts;
+            MColorArray blockColors;
+            for (unsigned int start = 0; start < count; ) {
+                std::chrono::steady_clock::time_point blockStart = std::chrono::steady_clock::now();
+                unsigned int end = std::min(start + blockSize, count);
+                blockVerts.setLength(end - start);
+                blockColors.setLength(end - start);
+                for (unsigned int i = start; i < end; ++i) {
+                    blockVerts[i - start] = verts_[i];
+                    blockColors[i - start] = paletteColors_[paletteIds_[i]];
+                }
+                fnMesh.setVertexColors(blockColors, blockVerts);
+                start = end;
 
-    // Completion of the progress window
-    MGlobal::executeCommand("progressWindow -edit -endProgress");
+                computation.setProgress((int)end);
+                if (computation.isInterruptRequested()) {
+                    computation.endComputation();
+                    // a cancelled apply leaves the color set as it was
+                    undoIt();
+                    MGlobal::displayWarning("Vertex color application cancelled by user.");
+                    return MS::kFailure;
+                }
+
+                // next block sized from this one, at most 4x bigger
+                double elapsed = std::chrono::duration<double>(std::chrono::steady_clock::now() - blockStart).count();
+                double scale = elapsed > 0.0 ? std::min(targetSeconds / elapsed, 4.0) : 4.0;
+                blockSize = (unsigned int)std::max(10000.0, std::min((double)count, blockSize * scale));
+            }
+            computation.endComputation();
+        }
+    }
 
     // Enable color display
     MPlug displayColorsPlug = fnMesh.findPlug("displayColors", false, &status);
@@ -159,10 +1049,396 @@ MStatus ApplyDQVertexColorsCmd::doIt(const MArgList& args) {
     return MS::kSuccess;
 }
 
+MStatus ApplyDQVertexColorsCmd::undoIt() {
+    MStatus status;
+    if (!batch_.empty()) {
+        for (size_t m = batch_.size(); m-- > 0; ) batch_[m]->undoIt();
+        return MS::kSuccess;
+    }
+    MFnMesh fnMesh(meshDag_, &status);
+    if (!status) return status;
+
+    if (!hadSet_ || !merge_) {
+        // the set was created by this command: dropping it is the whole undo
+        if (hasColorSet(fnMesh, colorSetName_)) fnMesh.deleteColorSet(colorSetName_);
+    }
+    if (hadSet_) {
+        if (!merge_) fnMesh.createColorSet(colorSetName_);
+        fnMesh.setCurrentColorSetName(colorSetName_);
+
+        MIntArray colored, uncolored;
+        MColorArray colors;
+        for (unsigned int i = 0; i < prevVerts_.length(); ++i) {
+            if (prevIds_[i] < 0) uncolored.append(prevVerts_[i]);
+            else {
+                colored.append(prevVerts_[i]);
+                colors.append(prevPalette_[prevIds_[i]]);
+            }
+        }
+        if (colored.length() > 0) fnMesh.setVertexColors(colors, colored);
+        if (uncolored.length() > 0) fnMesh.removeVertexColors(uncolored);
+    }
+
+    if (prevCurrentSet_.length() > 0 && hasColorSet(fnMesh, prevCurrentSet_)) fnMesh.setCurrentColorSetName(prevCurrentSet_);
+    MPlug displayColorsPlug = fnMesh.findPlug("displayColors", false, &status);
+    if (status) displayColorsPlug.setValue(prevDisplayColors_);
+    return MS::kSuccess;
+}
+
+// --- dqWeightsToColors: skinCluster blendWeights -> color set, no file in between ---
+// Same quantization as the Python export: |w| < 10^-N is 0 (or skipped), w > 1 is 1,
+// then the nearest 10^-N level; values within float noise of .5 are rounded like "{:.Nf}".
+static long long weightLevel(double w, int decimals, double scale) {
+    if (w > 1.0) w = 1.0;
+    double scaled = w * scale;
+    double frac = scaled - std::floor(scaled);
+    if (std::fabs(frac - 0.5) <= std::fabs(scaled) * std::ldexp(1.0, -50) + 1e-9) {
+        char text[64];
+        std::snprintf(text, sizeof(text), "%.*f", decimals, w);
+        long long level = 0;
+        for (const char* c = text; *c; ++c) {
+            if (*c >= '0' && *c <= '9') level = level * 10 + (*c - '0');
+        }
+        return text[0] == '-' ? -level : level;
+    }
+    return std::llround(scaled);
+}
+
+class DQWeightsToColorsCmd : public ApplyDQVertexColorsCmd {
+public:
+    virtual MStatus doIt(const MArgList& args) override;
+    static void* creator() { return new DQWeightsToColorsCmd; }
+    static MSyntax newSyntax();
+    static const char* kName() { return "dqWeightsToColors"; }
+};
+
+MSyntax DQWeightsToColorsCmd::newSyntax() {
+    MSyntax syn;
+    syn.addFlag("-mesh", "-m", MSyntax::kString);
+    syn.addFlag("-set", "-s", MSyntax::kString);
+    syn.addFlag("-merge", "-M", MSyntax::kBoolean);
+    syn.addFlag("-verts", "-v", MSyntax::kLong); // repeated integers, whole mesh if not given
+    syn.addFlag("-packedVerts", "-pv", MSyntax::kString); // base64 uint32 vertex ids
+    syn.addFlag("-decimals", "-d", MSyntax::kLong); // quantization, like DECIMAL_PLACES (0-15)
+    syn.addFlag("-skipZero", "-sz", MSyntax::kBoolean); // leave vertices below 10^-N uncolored
+    syn.addFlag("-palette", "-p", MSyntax::kBoolean);
+    syn.addFlag("-noProgress", "-np", MSyntax::kBoolean);
+    syn.addFlag("-ramp", "-r", MSyntax::kString);
+    syn.useSelectionAsDefault(false);
+    syn.enableQuery(false);
+    syn.enableEdit(false);
+    return syn;
+}
+
+MStatus DQWeightsToColorsCmd::doIt(const MArgList& args) {
+    MStatus status;
+
+    MString meshName;
+    MString packedVerts;
+    MIntArray vertArray;
+    int decimals = 4;
+    bool skipZero = false;
+    MString ramp = "gray";
+    colorSetName_ = "dqColorSet";
+
+    // --- Flag parsing ---
+    for (unsigned int i = 0; i < args.length(); ++i) {
+        MString token = args.asString(i, &status);
+        if (token == "-mesh" || token == "-m") meshName = args.asString(++i, &status);
+        else if (token == "-set" || token == "-s") colorSetName_ = args.asString(++i, &status);
+        else if (token == "-merge" || token == "-M") merge_ = args.asBool(++i, &status);
+        else if (token == "-decimals" || token == "-d") decimals = args.asInt(++i, &status);
+        else if (token == "-skipZero" || token == "-sz") skipZero = args.asBool(++i, &status);
+        else if (token == "-palette" || token == "-p") palette_ = args.asBool(++i, &status);
+        else if (token == "-noProgress" || token == "-np") noProgress_ = args.asBool(++i, &status);
+        else if (token == "-packedVerts" || token == "-pv") packedVerts = args.asString(++i, &status);
+        else if (token == "-ramp" || token == "-r") ramp = args.asString(++i, &status);
+        else if (token == "-verts" || token == "-v") {
+            ++i;
+            while (i < args.length()) {
+                int v = args.asInt(i, &status);
+                if (!status) { --i; break; }
+                vertArray.append(v);
+                ++i;
+            }
+        }
+    }
+
+    if (meshName.length() == 0) { MGlobal::displayError("dqWeightsToColors: -mesh required."); return MS::kFailure; }
+    if (decimals < 0 || decimals > 15) { MGlobal::displayError("dqWeightsToColors: -decimals must be 0-15."); return MS::kFailure; }
+    std::vector<MColor> lut;
+    std::string rampError;
+    if (!buildRampLut(ramp, lut, rampError)) { MGlobal::displayError("dqWeightsToColors: " + MString(rampError.c_str())); return MS::kFailure; }
+    if (packedVerts.length() > 0) {
+        std::vector<uint32_t> verts;
+        if (!decodePacked(packedVerts, verts)) { MGlobal::displayError("dqWeightsToColors: bad -packedVerts data."); return MS::kFailure; }
+        for (size_t i = 0; i < verts.size(); ++i) vertArray.append((int)verts[i]);
+    }
+
+    // --- Mesh and its skinCluster ---
+    MSelectionList sel;
+    sel.add(meshName);
+    status = sel.getDagPath(0, meshDag_);
+    if (!status) { MGlobal::displayError("dqWeightsToColors: mesh not found."); return MS::kFailure; }
+    meshDag_.extendToShape();
+    MFnMesh fnMesh(meshDag_, &status);
+    if (!status) { MGlobal::displayError("dqWeightsToColors: failed to get MFnMesh."); return MS::kFailure; }
+
+    MObject meshNode = meshDag_.node();
+    MItDependencyGraph history(meshNode, MFn::kSkinClusterFilter, MItDependencyGraph::kUpstream,
+                               MItDependencyGraph::kDepthFirst, MItDependencyGraph::kNodeLevel, &status);
+    if (!status || history.isDone()) {
+        MGlobal::displayError("dqWeightsToColors: no skinCluster found on " + meshName + ".");
+        return MS::kFailure;
+    }
+    MFnSkinCluster fnSkin(history.currentItem(), &status);
+    if (!status) { MGlobal::displayError("dqWeightsToColors: failed to get MFnSkinCluster."); return MS::kFailure; }
+
+    // --- Blend weights in one call ---
+    MFnSingleIndexedComponent fnComponent;
+    MObject components = fnComponent.create(MFn::kMeshVertComponent);
+    int numVerts = fnMesh.numVertices();
+    if (vertArray.length() == 0) fnComponent.setCompleteData(numVerts);
+    else fnComponent.addElements(vertArray);
+
+    MDoubleArray weights;
+    status = fnSkin.getBlendWeights(meshDag_, components, weights);
+    if (!status) { MGlobal::displayError("dqWeightsToColors: getBlendWeights failed."); return status; }
+    if (vertArray.length() == 0) {
+        vertArray.setLength(numVerts);
+        for (int v = 0; v < numVerts; ++v) vertArray[v] = v;
+    }
+    if (weights.length() != vertArray.length()) {
+        MGlobal::displayError("dqWeightsToColors: blend weight count doesn't match the vertices.");
+        return MS::kFailure;
+    }
+
+    // --- Quantize into palette + ids ---
+    const double scale = std::pow(10.0, decimals);
+    const double threshold = std::pow(10.0, -decimals);
+    std::map<long long, int> levelIndex;
+    verts_.setLength(0);
+    paletteColors_.setLength(0);
+    paletteIds_.clear();
+    paletteIds_.reserve(vertArray.length());
+    for (unsigned int i = 0; i < vertArray.length(); ++i) {
+        double w = weights[i];
+        long long level = 0;
+        if (std::fabs(w) < threshold) {
+            if (skipZero) continue;
+        }
+        else level = weightLevel(w, decimals, scale);
+
+        std::map<long long, int>::iterator it = levelIndex.find(level);
+        int id;
+        if (it == levelIndex.end()) {
+            id = (int)paletteColors_.length();
+            paletteColors_.append(rampColor(lut, (float)(level / scale)));
+            levelIndex[level] = id;
+        }
+        else id = it->second;
+        verts_.append(vertArray[i]);
+        paletteIds_.push_back(id);
+    }
+    if (verts_.length() == 0) {
+        MGlobal::displayWarning("dqWeightsToColors: no vertices left to color.");
+        nothingDone_ = true;
+        return MS::kSuccess;
+    }
+
+    return redoIt();
+}
+
+// --- dqWeightColor: live node, keeps the DQ color set in sync with the skinCluster ---
+// connectAttr skinCluster.blendWeights node.blendWeights; connectAttr meshShape.message node.mesh
+// Dirty blendWeights elements are collected in setDependentsDirty and applied on idle, so a paint
+// stroke that touches 200 vertices writes 200 colors. If the whole array is dirtied at once, all
+// weights are re-read in one getBlendWeights call and only vertices whose level changed are written.
+class DQWeightColorNode : public MPxNode {
+public:
+    DQWeightColorNode() : colorCount_(-1), fullDirty_(true), taskQueued_(false) { liveNodes().insert(this); }
+    virtual ~DQWeightColorNode() override { liveNodes().erase(this); }
+    virtual MStatus compute(const MPlug&, MDataBlock&) override { return MS::kUnknownParameter; }
+    virtual MStatus setDependentsDirty(const MPlug& plug, MPlugArray& affected) override;
+
+    static void* creator() { return new DQWeightColorNode; }
+    static MStatus initialize();
+    static const char* kName() { return "dqWeightColor"; }
+    static MTypeId id; // local id range (0x0-0x7ffff), register a block before sharing the plugin
+
+    static MObject aBlendWeights;
+    static MObject aMesh;
+    static MObject aColorSet;
+    static MObject aDecimals;
+    static MObject aRamp;
+
+private:
+    static std::set<DQWeightColorNode*>& liveNodes() { static std::set<DQWeightColorNode*> nodes; return nodes; }
+    static void applyOnIdle(void* data);
+    void applyPending();
+    bool sourceNode(const MObject& attr, MObject& node) const;
+
+    std::vector<long long> levels_; // level applied per vertex, LLONG_MIN = not colored yet
+    int colorCount_; // colors in the set after our last write, another count means someone else wrote it
+    std::vector<MColor> lut_;
+    MString lutRamp_;
+    std::vector<unsigned int> dirty_;
+    bool fullDirty_;
+    bool taskQueued_;
+};
+
+MTypeId DQWeightColorNode::id(0x0007F1A0);
+MObject DQWeightColorNode::aBlendWeights;
+MObject DQWeightColorNode::aMesh;
+MObject DQWeightColorNode::aColorSet;
+MObject DQWeightColorNode::aDecimals;
+MObject DQWeightColorNode::aRamp;
+
+MStatus DQWeightColorNode::initialize() {
+    MFnNumericAttribute nAttr;
+    MFnTypedAttribute tAttr;
+    MFnMessageAttribute mAttr;
+
+    aBlendWeights = nAttr.create("blendWeights", "bw", MFnNumericData::kDouble, 0.0);
+    nAttr.setArray(true);
+    nAttr.setUsesArrayDataBuilder(true);
+    nAttr.setStorable(false);
+
+    aMesh = mAttr.create("mesh", "msh");
+
+    MFnStringData stringData;
+    aColorSet = tAttr.create("colorSet", "cs", MFnData::kString, stringData.create("dqColorSet"));
+
+    aDecimals = nAttr.create("decimals", "d", MFnNumericData::kInt, 4);
+    nAttr.setMin(0);
+    nAttr.setMax(15);
+
+    aRamp = tAttr.create("ramp", "rmp", MFnData::kString, stringData.create("gray"));
+
+    addAttribute(aBlendWeights);
+    addAttribute(aMesh);
+    addAttribute(aColorSet);
+    addAttribute(aDecimals);
+    addAttribute(aRamp);
+    return MS::kSuccess;
+}
+
+MStatus DQWeightColorNode::setDependentsDirty(const MPlug& plug, MPlugArray&) {
+    if (plug.attribute() == aBlendWeights) {
+        if (plug.isElement()) dirty_.push_back(plug.logicalIndex());
+        else fullDirty_ = true;
+    }
+    else if (plug.attribute() == aMesh || plug.attribute() == aColorSet || plug.attribute() == aDecimals
+             || plug.attribute() == aRamp) {
+        fullDirty_ = true;
+        levels_.clear();
+    }
+    else return MS::kSuccess;
+
+    // one idle task per burst of dirty messages (a paint stroke)
+    if (!taskQueued_) {
+        taskQueued_ = true;
+        MGlobal::executeTaskOnIdle(applyOnIdle, this);
+    }
+    return MS::kSuccess;
+}
+
+void DQWeightColorNode::applyOnIdle(void* data) {
+    DQWeightColorNode* node = static_cast<DQWeightColorNode*>(data);
+    // the node may have been deleted before Maya got idle
+    if (liveNodes().count(node) == 0) return;
+    node->taskQueued_ = false;
+    node->applyPending();
+}
+
+bool DQWeightColorNode::sourceNode(const MObject& attr, MObject& node) const {
+    MPlugArray sources;
+    MPlug(thisMObject(), attr).connectedTo(sources, true, false);
+    if (sources.length() == 0) return false;
+    node = sources[0].node();
+    return true;
+}
+
+void DQWeightColorNode::applyPending() {
+    MStatus status;
+    MObject meshNode, skinNode;
+    MDagPath meshDag;
+    if (!sourceNode(aMesh, meshNode) || !MDagPath::getAPathTo(meshNode, meshDag)) return;
+    MFnMesh fnMesh(meshDag, &status);
+    if (!status) return;
+
+    MString colorSet = MPlug(thisMObject(), aColorSet).asString();
+    int decimals = MPlug(thisMObject(), aDecimals).asInt();
+    const double scale = std::pow(10.0, decimals);
+    const double threshold = std::pow(10.0, -decimals);
+    MString ramp = MPlug(thisMObject(), aRamp).asString();
+    if (ramp != lutRamp_) {
+        std::string error;
+        if (!buildRampLut(ramp, lut_, error)) {
+            MGlobal::displayWarning("dqWeightColor: " + MString(error.c_str()) + ", using gray.");
+            lut_.clear();
+        }
+        lutRamp_ = ramp;
+    }
+    int numVerts = fnMesh.numVertices();
+    // a deleted set, or one written by Paint Vertex Color / applyDQVertexColors, no longer shows levels_
+    bool setChanged = !hasColorSet(fnMesh, colorSet) || fnMesh.numColors(&colorSet) != colorCount_;
+    if ((int)levels_.size() != numVerts || setChanged) {
+        levels_.assign(numVerts, LLONG_MIN);
+        fullDirty_ = true;
+    }
+
+    // --- Changed weights ---
+    MIntArray changedVerts;
+    MColorArray changedColors;
+    MPlug weightsPlug(thisMObject(), aBlendWeights);
+    std::vector<unsigned int> dirty;
+    dirty.swap(dirty_);
+
+    MDoubleArray weights;
+    bool full = fullDirty_;
+    if (full) {
+        fullDirty_ = false;
+        if (!sourceNode(aBlendWeights, skinNode)) return;
+        MFnSkinCluster fnSkin(skinNode, &status);
+        if (!status) return;
+        MFnSingleIndexedComponent fnComponent;
+        MObject components = fnComponent.create(MFn::kMeshVertComponent);
+        fnComponent.setCompleteData(numVerts);
+        if (!fnSkin.getBlendWeights(meshDag, components, weights) || (int)weights.length() != numVerts) return;
+    }
+
+    unsigned int count = full ? (unsigned int)numVerts : (unsigned int)dirty.size();
+    for (unsigned int i = 0; i < count; ++i) {
+        int v = full ? (int)i : (int)dirty[i];
+        if (v < 0 || v >= numVerts) continue;
+        double w = full ? weights[i] : weightsPlug.elementByLogicalIndex(v).asDouble();
+        long long level = std::fabs(w) < threshold ? 0 : weightLevel(w, decimals, scale);
+        if (level == levels_[v]) continue;
+        levels_[v] = level;
+        changedVerts.append(v);
+        changedColors.append(rampColor(lut_, (float)(level / scale)));
+    }
+    if (changedVerts.length() == 0) return;
+
+    // --- Write only what changed ---
+    MString current = fnMesh.currentColorSetName();
+    if (!hasColorSet(fnMesh, colorSet)) {
+        fnMesh.createColorSet(colorSet);
+        current = colorSet;
+        MPlug displayColorsPlug = fnMesh.findPlug("displayColors", false, &status);
+        if (status) displayColorsPlug.setValue(true);
+    }
+    fnMesh.setCurrentColorSetName(colorSet);
+    fnMesh.setVertexColors(changedColors, changedVerts);
+    colorCount_ = fnMesh.numColors(&colorSet);
+    if (current != colorSet && current.length() > 0) fnMesh.setCurrentColorSetName(current);
+}
+
 // --- Plugin entry ---
 MStatus initializePlugin(MObject obj) {
     MStatus status;
-    MFnPlugin plugin(obj, "dqTools", "1.0", "Any", &status);
+    MFnPlugin plugin(obj, "dqTools", "1.1", "Any", &status); // 1.1: several -mesh in one applyDQVertexColors call
     if (!status) return status;
 
     status = plugin.registerCommand(
@@ -170,6 +1446,21 @@ MStatus initializePlugin(MObject obj) {
         ApplyDQVertexColorsCmd::creator,
         ApplyDQVertexColorsCmd::newSyntax
     );
+    if (!status) return status;
+
+    status = plugin.registerCommand(
+        DQWeightsToColorsCmd::kName(),
+        DQWeightsToColorsCmd::creator,
+        DQWeightsToColorsCmd::newSyntax
+    );
+    if (!status) return status;
+
+    status = plugin.registerNode(
+        DQWeightColorNode::kName(),
+        DQWeightColorNode::id,
+        DQWeightColorNode::creator,
+        DQWeightColorNode::initialize
+    );
     return status;
 }
 
@@ -177,5 +1468,7 @@ MStatus uninitializePlugin(MObject obj) {
     MStatus status;
     MFnPlugin plugin(obj);
     status = plugin.deregisterCommand(ApplyDQVertexColorsCmd::kName());
+    plugin.deregisterCommand(DQWeightsToColorsCmd::kName());
+    plugin.deregisterNode(DQWeightColorNode::id);
     return status;
 }
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+---------------------------------------------------------------------------------------------------------------
+DQ export format check
+======================
+
+Checks that the streaming JSON export of export_quaternion_v4 is byte-identical to the original one:
+json.dumps(indent=4) with the vertex arrays folded into one line by a regex.
+The original export code is kept below as it was, every case is exported both ways and the files compared.
+Runs on plain Python with the maya.cmds stand-in of dq_bench, exits with 1 if any case differs.
+
+    python check_export_format.py
+    python check_export_format.py --sizes 1000 20000 --decimals 2 4 8 --no-numpy
+
+Проверка формата экспорта DQ
+============================
+
+Проверяет, что потоковый экспорт JSON из export_quaternion_v4 побайтно совпадает с исходным:
+json.dumps(indent=4) и массивы вертексов в одну строку через регулярку.
+Исходный код экспорта сохранен ниже как был, каждый случай экспортируется обоими способами и сравнивается.
+---------------------------------------------------------------------------------------------------------------
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from dq_bench import (DISTRIBUTIONS, _SCENE, add_mesh, baseline_export_data, baseline_format_json,
+                      import_dq_tool)
+
+SIZES = [1000, 20000]   # vertex counts / количество вертексов
+DECIMALS = list(range(2, 21))   # every value of the Decimals slider / все значения слайдера Decimals
+
+
+# --- Check ---
+def _first_difference(a, b):
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return min(len(a), len(b))
+
+
+def check_case(dq, count, distribution, decimal_places, save_zero_weights, work_dir):
+    """
+    -----------------------------------------------------------------
+    Exports one mesh the original way and through the current tool,
+    returns None if the files match or a short description otherwise
+
+    Экспортирует один меш обоими способами, возвращает None если
+    файлы совпадают, иначе описание отличия
+    -----------------------------------------------------------------
+    """
+    name = "%s%d" % (distribution, count)
+    skin = add_mesh(name, count, distribution)
+    mesh = "|" + name
+    try:
+        expected = baseline_format_json(
+            baseline_export_data(skin, mesh, count, decimal_places, save_zero_weights)).encode("utf-8")
+
+        path = os.path.join(work_dir, name + ".json")
+        weights = dq.read_blend_weights(skin, range(count))
+        levels = dq.group_weight_levels(range(count), weights, decimal_places, save_zero_weights)
+        dq.DECIMAL_PLACES = decimal_places
+        dq._save_dq_export(path, mesh, skin, "mesh", levels)
+        with open(path, "rb") as f:
+            actual = f.read()
+    finally:
+        _SCENE["meshes"].clear()
+        _SCENE["skins"].clear()
+
+    if actual == expected:
+        return None
+    at = _first_difference(actual, expected)
+    return "differs at byte %d: %r != %r" % (at, actual[max(0, at - 20):at + 20], expected[max(0, at - 20):at + 20])
+
+
+def run_checks(sizes=None, distributions=None, decimals=None, use_numpy=True):
+    """
+    Checks every size x distribution x decimals x save-zero case, returns the number of failed cases
+    """
+    dq = import_dq_tool()
+    dq.USE_EXPORT_CACHE = False
+    dq.DELTA_EXPORT = False
+    dq.RANGE_ENCODE_VERTICES = False
+    if not use_numpy:
+        dq.np = None
+
+    work_dir = tempfile.mkdtemp(prefix="dq_format_")
+    failed = 0
+    total = 0
+    try:
+        for count in sizes or SIZES:
+            for distribution in distributions or DISTRIBUTIONS:
+                for decimal_places in decimals or DECIMALS:
+                    for save_zero_weights in (True, False):
+                        total += 1
+                        error = check_case(dq, count, distribution, decimal_places, save_zero_weights, work_dir)
+                        if error:
+                            failed += 1
+                            print("FAIL %s %d decimals=%d saveZero=%s: %s"
+                                  % (distribution, count, decimal_places, save_zero_weights, error))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("%d of %d cases identical (numpy: %s)" % (total - failed, total, getattr(dq.np, "__version__", None)))
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the JSON export against the original format byte for byte")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="vertex counts")
+    parser.add_argument("--dists", nargs="+", default=DISTRIBUTIONS, choices=DISTRIBUTIONS, help="weight distributions")
+    parser.add_argument("--decimals", type=int, nargs="+", default=DECIMALS, help="decimal places")
+    parser.add_argument("--no-numpy", action="store_true", help="check the pure Python fallbacks")
+    args = parser.parse_args(argv)
+
+    failed = run_checks(args.sizes, args.dists, args.decimals, not args.no_numpy)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
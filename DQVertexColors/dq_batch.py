@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+---------------------------------------------------------------------------------------------------------------
+DQ Blend Weights batch runner (mayapy)
+======================================
+
+Exports (and optionally applies) DQ weights for many scenes without the UI.
+Scenes are spread over worker processes, each worker runs its own maya.standalone.
+Every finished mesh and scene is appended to a status file, a crashed or stopped run continues
+from it: scenes already done are skipped, in the others the meshes already done are skipped.
+
+    mayapy dq_batch.py manifest.json --workers 4
+
+Manifest:
+    {
+        "exportDir": "D:/export_dq_blend_weights",     # optional, EXPORT_DIR of export_quaternion_v4
+        "settings": {"DECIMAL_PLACES": 4, "BINARY_EXPORT": true},    # optional, export_quaternion_v4 settings
+        "apply": false,             # also write the DQ color set
+        "saveScene": false,         # save the scene after apply
+        "jobs": [
+            {"scene": "D:/chars/hero.mb", "meshes": ["body", "head"]},
+            {"scene": "D:/chars/crowd_a.mb"}       # no meshes: every skinned mesh of the scene
+        ]
+    }
+
+Пакетный запуск экспорта DQ весов через mayapy
+==============================================
+
+Экспортирует (и при необходимости применяет) DQ веса для множества сцен без UI.
+Сцены распределяются по процессам, в каждом свой maya.standalone.
+Каждый готовый меш и сцена дописываются в файл статуса, упавший или остановленный запуск
+продолжается с него: готовые сцены пропускаются, в остальных пропускаются готовые меши.
+---------------------------------------------------------------------------------------------------------------
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import time
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:
+    # mayapy 2 has no concurrent.futures, scenes run one by one in this process
+    ProcessPoolExecutor = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_ATTEMPTS = 2    # a scene running when a worker crashed is retried this many times / сколько раз повторять сцену, на которой упал процесс
+
+_dq = None  # export_quaternion_v4, imported after maya.standalone is up
+
+
+# --- Maya session ---
+def _init_maya(settings, export_dir):
+    """
+    Starts maya.standalone in this process and imports the DQ tool with the manifest settings
+    """
+    global _dq
+    if _dq is not None:
+        return
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    if multiprocessing.current_process().name != "MainProcess":
+        # pool workers leave through os._exit, atexit never runs there; finalizers do
+        multiprocessing.util.Finalize(None, _shutdown_maya, exitpriority=100)
+
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import export_quaternion_v4 as dq
+    for name, value in (settings or {}).items():
+        setattr(dq, name, value)
+    if export_dir:
+        dq.EXPORT_DIR = export_dir
+    _dq = dq
+
+
+def _shutdown_maya():
+    """
+    Shuts maya.standalone down once the process is done with scenes
+    """
+    global _dq
+    if _dq is None:
+        return
+    _dq = None
+    import maya.standalone
+    maya.standalone.uninitialize()
+
+
+def _skinned_meshes():
+    import maya.cmds as cmds
+    meshes = []
+    for skin_cluster in cmds.ls(type="skinCluster") or []:
+        for shape in cmds.skinCluster(skin_cluster, query=True, geometry=True) or []:
+            if cmds.objectType(shape, isType="mesh"):
+                meshes.extend(cmds.listRelatives(shape, parent=True, fullPath=True) or [])
+    return sorted(set(meshes))
+
+
+def run_scene(job, settings=None, export_dir=None, apply_colors=False, save_scene=False, status_path=None):
+    """
+    Opens one scene and exports its meshes, runs inside a worker
+    Every mesh is appended to the status file as it is done, meshes done there before are skipped:
+    exported once without apply, applied and saved with apply + saveScene.
+    With apply but no saveScene the colors don't outlive the process, only the export is skipped
+    Returns the status record of the scene
+    """
+    start_time = time.time()
+    _init_maya(settings, export_dir)
+    import maya.cmds as cmds
+
+    previous = read_mesh_status(status_path, job["scene"]) if status_path else {}
+    record = {"scene": job["scene"], "status": "done", "meshes": [], "vertices": 0, "resumed": 0, "error": None}
+    try:
+        cmds.file(job["scene"], open=True, force=True, prompt=False, ignoreVersion=True)
+        meshes = job.get("meshes") or _skinned_meshes()
+        paths = []
+        path_meshes = {}
+        for mesh in meshes:
+            old = previous.get(mesh)
+            if old and old["status"] == "done":
+                record["resumed"] += 1
+                continue
+            if old and old["status"] == "exported" and apply_colors and os.path.exists(old["path"]):
+                # exported before the run stopped, only the apply is left
+                record["resumed"] += 1
+                paths.append(old["path"])
+                path_meshes[old["path"]] = old
+                continue
+
+            mesh_start = time.time()
+            path = _dq.export_dq_blend_weights(_dq.build_export_path(mesh.split("|")[-1]), False, target_mesh=mesh)
+            vertices = cmds.polyEvaluate(mesh, vertex=True) if path else 0
+            mesh_record = {"mesh": mesh, "path": path, "vertices": vertices,
+                           "seconds": round(time.time() - mesh_start, 3)}
+            record["meshes"].append(mesh_record)
+            record["vertices"] += vertices
+            if path:
+                paths.append(path)
+                path_meshes[path] = mesh_record
+                _append_mesh_status(status_path, job["scene"], mesh_record, "exported" if apply_colors else "done")
+
+        if apply_colors and paths:
+            applied = _dq.apply_dq_batch_with_plugin(paths, progress=False)
+            if save_scene and applied:
+                cmds.file(save=True, force=True)
+                for path in applied:
+                    _append_mesh_status(status_path, job["scene"], path_meshes[path], "done")
+            if len(applied) < len(paths):
+                record["status"] = "failed"
+                record["error"] = "applied %d of %d meshes" % (len(applied), len(paths))
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = "%s: %s" % (type(e).__name__, e)
+
+    record["seconds"] = round(time.time() - start_time, 3)
+    record["pid"] = os.getpid()
+    return record
+
+
+# --- Status file ---
+def _scene_key(scene):
+    return os.path.normcase(os.path.abspath(scene))
+
+
+def _read_records(status_path):
+    """
+    Records of the status file (JSON lines), a torn last line is ignored
+    """
+    if not os.path.exists(status_path):
+        return
+    with open(status_path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def read_status(status_path):
+    """
+    Last record per scene from the status file
+    """
+    records = {}
+    for record in _read_records(status_path):
+        if "mesh" not in record:
+            records[_scene_key(record["scene"])] = record
+    return records
+
+
+def read_mesh_status(status_path, scene):
+    """
+    Last record per mesh of one scene from the status file
+    """
+    key = _scene_key(scene)
+    records = {}
+    for record in _read_records(status_path):
+        if "mesh" in record and _scene_key(record["scene"]) == key:
+            records[record["mesh"]] = record
+    return records
+
+
+def _append_mesh_status(status_path, scene, mesh_record, status):
+    if status_path:
+        append_status(status_path, dict(mesh_record, scene=scene, status=status))
+
+
+def append_status(status_path, record):
+    record["time"] = datetime.datetime.now().isoformat()
+    with open(status_path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+# --- Runner ---
+def run_manifest(manifest_path, workers=1, status_path=None):
+    """
+    -----------------------------------------------------------------
+    Runs every scene of the manifest that is not done in the status
+    file yet, returns the throughput report
+
+    Обрабатывает все сцены манифеста, которых еще нет в файле статуса
+    -----------------------------------------------------------------
+    """
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    status_path = status_path or manifest_path + ".status.jsonl"
+    options = {
+        "settings": manifest.get("settings"),
+        "export_dir": manifest.get("exportDir"),
+        "apply_colors": bool(manifest.get("apply")),
+        "save_scene": bool(manifest.get("saveScene")),
+        "status_path": status_path,
+    }
+
+    previous = read_status(status_path)
+    pending = []
+    skipped = 0
+    for job in manifest["jobs"]:
+        old = previous.get(_scene_key(job["scene"]))
+        if old and old["status"] == "done":
+            skipped += 1
+        elif old and old["status"] == "crashed" and old.get("attempt", 0) >= MAX_ATTEMPTS:
+            skipped += 1
+        else:
+            job = dict(job)
+            job["attempt"] = old.get("attempt", 0) if old and old["status"] == "crashed" else 0
+            pending.append(job)
+    print("%d scenes to run, %d done or given up in %s" % (len(pending), skipped, status_path))
+
+    start_time = time.time()
+    records = []
+    if ProcessPoolExecutor is None:
+        try:
+            for job in pending:
+                record = run_scene(job, **options)
+                append_status(status_path, record)
+                records.append(record)
+                _print_record(record)
+        finally:
+            _shutdown_maya()
+    else:
+        records = _run_pool(pending, workers, status_path, options)
+
+    report = throughput_report(records, time.time() - start_time, workers, skipped)
+    print_report(report)
+    return report
+
+
+def _run_pool(pending, workers, status_path, options):
+    """
+    At most one scene per worker in flight. A crashed worker (Maya can take the whole
+    process down) breaks the pool, the scenes that were running are rerun one at a time,
+    so an attempt is charged only to the scene that really crashes
+    """
+    records = []
+    queue = list(reversed(pending))
+    while queue:
+        running = {}
+        broken = []
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            while (queue or running) and not broken:
+                while queue and len(running) < workers:
+                    if running and (queue[-1].get("isolate") or any(j.get("isolate") for j in running.values())):
+                        break
+                    job = queue.pop()
+                    running[pool.submit(run_scene, job, **options)] = job
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        record = future.result()
+                    except BrokenProcessPool:
+                        broken.append(job)
+                        continue
+                    append_status(status_path, record)
+                    records.append(record)
+                    _print_record(record)
+        finally:
+            pool.shutdown(wait=False)
+
+        # the pool is gone, every scene still running went down with it
+        broken.extend(running.values())
+        if len(broken) > 1:
+            # any of them could be the one that crashed, rerun each alone before charging attempts
+            for job in broken:
+                print("[requeued] %s: worker process died, rerunning alone" % job["scene"])
+                queue.append(dict(job, isolate=True))
+            continue
+        for job in broken:
+            attempt = job.get("attempt", 0) + 1
+            record = {"scene": job["scene"], "status": "crashed", "attempt": attempt, "meshes": [],
+                      "vertices": 0, "seconds": 0.0, "error": "worker process died"}
+            append_status(status_path, record)
+            records.append(record)
+            _print_record(record)
+            if attempt < MAX_ATTEMPTS:
+                queue.append(dict(job, attempt=attempt))
+    return records
+
+
+# --- Report ---
+def throughput_report(records, wall_seconds, workers, skipped=0):
+    # a crashed scene that was retried counts by its last record
+    last = dict((_scene_key(r["scene"]), r) for r in records)
+    done = [r for r in records if r["status"] == "done"]
+    meshes = sum(len(r["meshes"]) for r in done)
+    vertices = sum(r["vertices"] for r in done)
+    busy = sum(r["seconds"] for r in records)
+    return {
+        "scenes": len(done),
+        "failed": len([r for r in last.values() if r["status"] == "failed"]),
+        "crashed": len([r for r in last.values() if r["status"] == "crashed"]),
+        "skipped": skipped,
+        "meshes": meshes,
+        "vertices": vertices,
+        "workers": workers,
+        "wallSeconds": round(wall_seconds, 3),
+        "meshesPerSecond": round(meshes / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "verticesPerSecond": round(vertices / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        # busy time of all workers over the time they had: 1.0 = no worker ever waited
+        "workerUtilization": round(busy / (wall_seconds * workers), 3) if wall_seconds > 0 else 0.0,
+    }
+
+
+def _print_record(record):
+    print("[%s] %s: %d meshes, %d vertices, %.1f s%s%s" % (
+        record["status"], record["scene"], len(record["meshes"]), record["vertices"], record["seconds"],
+        ", %d done before" % record["resumed"] if record.get("resumed") else "",
+        " (%s)" % record["error"] if record.get("error") else ""))
+
+
+def print_report(report):
+    print("Scenes: %d done, %d failed, %d crashed, %d skipped" % (
+        report["scenes"], report["failed"], report["crashed"], report["skipped"]))
+    print("Throughput: {meshesPerSecond:.2f} meshes/s, {verticesPerSecond:,.0f} vertices/s "
+          "({meshes} meshes, {vertices:,} vertices in {wallSeconds:.1f} s on {workers} workers, "
+          "utilization {workerUtilization:.0%})".format(**report))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch DQ blend weights export/apply under mayapy")
+    parser.add_argument("manifest", help="JSON job manifest")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, one Maya each")
+    parser.add_argument("--status", help="status file (default: <manifest>.status.jsonl)")
+    parser.add_argument("--report", help="also write the throughput report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_manifest(args.manifest, args.workers, args.status)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if not report["failed"] and not report["crashed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+---------------------------------------------------------------------------------------------------------------
+DQ Blend Weights benchmark
+==========================
+
+Times every stage of the export/apply pipeline of export_quaternion_v4 on plain Python, without Maya:
+maya.cmds is replaced by an in-memory stand-in that serves synthetic skinClusters.
+Results are written as JSON (to the temp folder unless --out is given), a run can be compared
+with the results of another commit. --baseline times the original pipeline kept below: one getAttr
+per vertex, json.dumps + regex, json.load and -verts/-colors arguments, so before/after numbers
+come from one tree.
+
+    python dq_bench.py --baseline --out bench_base.json
+    python dq_bench.py --out bench_new.json --compare bench_base.json
+    python dq_bench.py --sizes 10000 100000 --dists dense --repeat 5 --set RANGE_ENCODE_VERTICES=true
+
+Stages: read (blendWeights from the skinCluster), group (quantize into levels), json_write,
+json_read, args (applyDQVertexColors flags: packed, or -verts/-colors for the baseline).
+Distributions: dense (every vertex painted, any value), sparse (5% painted), banded (20 falloff steps).
+
+Бенчмарк DQ Blend Weights
+=========================
+
+Замеряет каждый этап экспорта/применения export_quaternion_v4 в обычном Python, без Maya:
+maya.cmds подменяется заглушкой в памяти с синтетическими скинкластерами.
+Результаты пишутся в JSON и сравниваются с результатами другого коммита.
+--baseline замеряет исходный вариант (getAttr на вертекс, json.dumps + регулярка), сохраненный ниже.
+---------------------------------------------------------------------------------------------------------------
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SIZES = [10000, 100000, 1000000]    # vertex counts / количество вертексов
+DISTRIBUTIONS = ["dense", "sparse", "banded"]   # weight distributions / распределения весов
+STAGES = ["read", "group", "json_write", "json_read", "args"]
+SPARSE_PAINTED = 0.05   # part of the vertices painted in "sparse" / доля закрашенных вертексов в "sparse"
+BANDED_STEPS = 20   # falloff steps in "banded" / ступени градиента в "banded"
+CHANGE_THRESHOLD = 0.10     # --compare marks stages that changed more than this / порог изменения при сравнении
+
+timer = getattr(time, "perf_counter", time.time)
+
+
+# --- Fake maya.cmds ---
+_SCENE = {"meshes": {}, "skins": {}}
+
+
+def synthetic_weights(count, distribution, seed=1):
+    """
+    {vertex: weight} of the painted vertices, unpainted vertices are left out like in a real skinCluster
+    """
+    rng = random.Random(seed)
+    if distribution == "dense":
+        return dict((i, rng.random()) for i in range(count))
+    if distribution == "sparse":
+        painted = rng.sample(range(count), int(count * SPARSE_PAINTED))
+        return dict((i, rng.random()) for i in sorted(painted))
+    if distribution == "banded":
+        # soft falloffs painted with a stepped brush: few distinct values in long runs
+        return dict((i, ((i // 64) % BANDED_STEPS) / float(BANDED_STEPS - 1)) for i in range(count))
+    raise ValueError("unknown distribution: %s" % distribution)
+
+
+def add_mesh(name, count, distribution, seed=1):
+    """
+    Adds transform <name> with shape <name>Shape skinned by <name>_skinCluster, returns the skinCluster
+    """
+    weights = synthetic_weights(count, distribution, seed)
+    skin = name + "_skinCluster"
+    indices = sorted(weights)
+    _SCENE["meshes"][name] = {"shape": name + "Shape", "skin": skin, "count": count}
+    _SCENE["skins"][skin] = {"weights": weights, "indices": indices, "values": [weights[i] for i in indices]}
+    return skin
+
+
+def _find_mesh(name):
+    name = name.split("|")[-1]
+    for transform, mesh in _SCENE["meshes"].items():
+        if name in (transform, mesh["shape"]):
+            return transform, mesh
+    return None, None
+
+
+def _get_attr(attr, multiIndices=False, **kwargs):
+    node, _, plug = attr.partition(".")
+    skin = _SCENE["skins"][node]
+    if plug == "blendWeights":
+        if multiIndices:
+            return list(skin["indices"]) or None
+        return [tuple(skin["values"])]   # Maya wraps the whole multi in a list of one tuple / Maya оборачивает весь мульти в список из одного кортежа
+    index = int(plug[plug.index("[") + 1:-1])
+    return skin["weights"].get(index, 0.0)
+
+
+def _ls(*args, **kwargs):
+    if kwargs.get("type") == "skinCluster":
+        return [n for n in (args[0] if args else _SCENE["skins"]) if n in _SCENE["skins"]]
+    return list(args[0]) if args and isinstance(args[0], list) else list(args)
+
+
+def _list_relatives(name, shapes=False, parent=False, fullPath=False, **kwargs):
+    transform, mesh = _find_mesh(name)
+    if transform is None:
+        return None
+    if shapes:
+        return [mesh["shape"]]
+    return ["|" + transform if fullPath else transform]
+
+
+def _object_type(name, isType=None):
+    transform, _ = _find_mesh(name)
+    kind = "transform" if name.split("|")[-1] == transform else "mesh"
+    return kind == isType if isType else kind
+
+
+def _list_history(name, **kwargs):
+    _, mesh = _find_mesh(name)
+    return [mesh["skin"], mesh["shape"]]
+
+
+def install_fake_maya():
+    """
+    Puts the stand-in into sys.modules as maya.cmds, must run before export_quaternion_v4 is imported
+    """
+    cmds = types.ModuleType("maya.cmds")
+    cmds.getAttr = _get_attr
+    cmds.ls = _ls
+    cmds.listRelatives = _list_relatives
+    cmds.objectType = _object_type
+    cmds.listHistory = _list_history
+    cmds.objExists = lambda name: _find_mesh(name)[0] is not None
+    cmds.polyEvaluate = lambda name, vertex=True: _find_mesh(name)[1]["count"]
+    cmds.file = lambda *args, **kwargs: "dq_bench.mb"
+    cmds.pluginInfo = lambda *args, **kwargs: "1.1" if kwargs.get("version") else True
+    cmds.loadPlugin = lambda *args, **kwargs: None
+    cmds.polyColorSet = lambda *args, **kwargs: []
+    cmds.applyDQVertexColors = lambda *args: None
+    cmds.warning = lambda message: sys.stderr.write("Warning: %s\n" % message)
+
+    def error(message):
+        raise RuntimeError(message)
+    cmds.error = error
+
+    maya = types.ModuleType("maya")
+    maya.cmds = cmds
+    sys.modules["maya"] = maya
+    sys.modules["maya.cmds"] = cmds
+    return cmds
+
+
+def import_dq_tool():
+    install_fake_maya()
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    import export_quaternion_v4
+    return export_quaternion_v4
+
+
+# --- Original pipeline (kept as it was, split into the same stages) ---
+def baseline_read_weights(skin_cluster, num_verts):
+    """
+    One getAttr per vertex, like the original export loop
+    """
+    import maya.cmds as cmds
+    return [float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, i))) for i in range(num_verts)]
+
+
+def baseline_group_weights(weights, decimal_places, save_zero_weights):
+    """
+    Weight strings grouped and sorted like the original export
+    """
+    raw_weights = {}
+    threshold = 10.0 ** (-decimal_places)
+    for i, w in enumerate(weights):
+        if abs(w) < threshold:
+            if save_zero_weights: w = 0.0
+            else: continue
+        if w > 1.0: w = 1.0
+        weight_str = "{0:.{1}f}".format(w, decimal_places).rstrip("0").rstrip(".")
+        raw_weights[i] = weight_str
+
+    grouped = {}
+    for vtx, w_str in raw_weights.items():
+        grouped.setdefault(w_str, []).append(vtx)
+
+    return [
+        {"weight": w_str, "vertices": sorted(verts)}
+        for w_str, verts in sorted(grouped.items(), key=lambda x: float(x[0]))
+    ]
+
+
+def baseline_export_data(skin_cluster, mesh_transform, num_verts, decimal_places, save_zero_weights):
+    """
+    Export dict of the original per-vertex loop, whole mesh mode
+    """
+    return {
+        "mesh": mesh_transform,
+        "skinCluster": skin_cluster if skin_cluster else "",
+        "exportMode": "mesh",
+        "blendWeights": baseline_group_weights(baseline_read_weights(skin_cluster, num_verts),
+                                               decimal_places, save_zero_weights)
+    }
+
+
+def baseline_format_json(data):
+    """
+    Text the original save_json_singleline_vertices wrote
+    """
+    text = json.dumps(data, indent=4)
+
+    def one_line_vertices(match):
+        arr = match.group(1)
+        arr = arr.replace("\n", "").replace(" ", "")
+        numbers = arr.strip("[],")
+        nums = [n for n in numbers.split(",") if n]
+        return '"vertices": [%s]' % ", ".join(nums)
+
+    return re.sub(r'"vertices": \[(.*?)\]', one_line_vertices, text, flags=re.S)
+
+
+def baseline_apply_args(data, mesh_name, color_set_name="dqColorSet", merge=True):
+    """
+    -verts/-colors arguments the original apply built from the loaded JSON
+    """
+    verts = []
+    colors = []
+    for block in data['blendWeights']:
+        w = float(block['weight'])
+        for idx in block['vertices']:
+            verts.append(int(idx))
+            colors.extend([w, w, w])
+
+    args = ['-mesh', mesh_name, '-set', color_set_name, '-M', merge]
+
+    for v in verts:
+        args.extend(['-verts', int(v)])
+
+    for i in range(0, len(colors), 3):
+        args.extend(['-colors', float(colors[i]), float(colors[i+1]), float(colors[i+2])])
+    return args
+
+
+# --- Stages ---
+def run_case(dq, count, distribution, repeat, work_dir):
+    """
+    ---------------------------------------------------------------
+    Runs every stage of one mesh repeat times, returns the result:
+    best and median seconds per stage, levels and file size
+
+    Прогоняет все этапы для одного меша repeat раз
+    ---------------------------------------------------------------
+    """
+    name = "%s%d" % (distribution, count)
+    skin = add_mesh(name, count, distribution)
+    shape = _SCENE["meshes"][name]["shape"]
+    path = os.path.join(work_dir, name + ".json")
+
+    times = dict((stage, []) for stage in STAGES)
+    for _ in range(repeat):
+        start = timer()
+        weights = dq.read_blend_weights(skin, range(count))
+        times["read"].append(timer() - start)
+
+        start = timer()
+        levels = dq.group_weight_levels(range(count), weights, dq.DECIMAL_PLACES, dq.SAVE_ZERO_WEIGHTS)
+        times["group"].append(timer() - start)
+
+        start = timer()
+        dq._save_dq_export(path, "|" + name, skin, "mesh", levels)
+        times["json_write"].append(timer() - start)
+
+        start = timer()
+        _, verts, level_weights = dq.read_dq_weights(path)
+        times["json_read"].append(timer() - start)
+
+        start = timer()
+        dq.dq_array_args(shape, verts, level_weights)
+        times["args"].append(timer() - start)
+
+    return {
+        "vertices": count,
+        "distribution": distribution,
+        "levels": len(levels),
+        "fileBytes": os.path.getsize(path),
+        "stages": dict((stage, _summary(values)) for stage, values in times.items()),
+    }
+
+
+def run_baseline_case(settings, count, distribution, repeat, work_dir):
+    """
+    run_case for the original pipeline
+    """
+    name = "%s%d" % (distribution, count)
+    skin = add_mesh(name, count, distribution)
+    shape = _SCENE["meshes"][name]["shape"]
+    path = os.path.join(work_dir, name + ".json")
+
+    times = dict((stage, []) for stage in STAGES)
+    for _ in range(repeat):
+        start = timer()
+        weights = baseline_read_weights(skin, count)
+        times["read"].append(timer() - start)
+
+        start = timer()
+        blocks = baseline_group_weights(weights, settings["DECIMAL_PLACES"], settings["SAVE_ZERO_WEIGHTS"])
+        times["group"].append(timer() - start)
+
+        start = timer()
+        export_data = {"mesh": "|" + name, "skinCluster": skin, "exportMode": "mesh", "blendWeights": blocks}
+        with open(path, "w") as f:
+            f.write(baseline_format_json(export_data))
+        times["json_write"].append(timer() - start)
+
+        start = timer()
+        with open(path, "r") as f:
+            data = json.load(f)
+        times["json_read"].append(timer() - start)
+
+        start = timer()
+        baseline_apply_args(data, shape)
+        times["args"].append(timer() - start)
+
+    return {
+        "vertices": count,
+        "distribution": distribution,
+        "levels": len(blocks),
+        "fileBytes": os.path.getsize(path),
+        "stages": dict((stage, _summary(values)) for stage, values in times.items()),
+    }
+
+
+def _summary(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    median = values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+    return {"best": round(values[0], 6), "median": round(median, 6)}
+
+
+def _git_commit():
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                                      stderr=subprocess.STDOUT)
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=SCRIPT_DIR)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode("ascii").strip() + ("-dirty" if dirty.strip() else "")
+
+
+def run_benchmark(sizes=None, distributions=None, repeat=3, settings=None, use_numpy=True, baseline=False):
+    """
+    ------------------------------------------------------------------
+    Runs every size x distribution, returns the results as a dict that
+    is written to JSON as-is
+    baseline: time the original pipeline instead of export_quaternion_v4
+
+    Прогоняет все размеры и распределения, возвращает результаты
+    ------------------------------------------------------------------
+    """
+    if baseline:
+        install_fake_maya()
+        # the original had no range encoding, palette or ramps
+        dq = types.ModuleType("baseline")
+        dq.np = None
+        dq.__dict__.update(DECIMAL_PLACES=4, SAVE_ZERO_WEIGHTS=True, RANGE_ENCODE_VERTICES=False,
+                           PALETTE_COLORSET=False, COLOR_RAMP="gray")
+        for key, value in (settings or {}).items():
+            if key in ("DECIMAL_PLACES", "SAVE_ZERO_WEIGHTS"):
+                setattr(dq, key, value)
+        run = functools.partial(run_baseline_case, dq.__dict__)
+    else:
+        dq = import_dq_tool()
+        dq.USE_EXPORT_CACHE = False
+        dq.DELTA_EXPORT = False
+        for key, value in (settings or {}).items():
+            setattr(dq, key, value)
+        if not use_numpy:
+            dq.np = None
+        # the tool imports numpy on the first grouping, keep that out of the timed stages
+        dq._numpy()
+        run = functools.partial(run_case, dq)
+
+    work_dir = tempfile.mkdtemp(prefix="dq_bench_")
+    results = []
+    try:
+        for count in sizes or SIZES:
+            for distribution in distributions or DISTRIBUTIONS:
+                result = run(count, distribution, repeat, work_dir)
+                results.append(result)
+                _print_result(result)
+                # drop the case's weights before the next one, 1M vertices take a few hundred MB
+                _SCENE["meshes"].clear()
+                _SCENE["skins"].clear()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "commit": _git_commit(),
+        "pipeline": "baseline" if baseline else "current",
+        "time": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": getattr(dq.np, "__version__", None),
+        "repeat": repeat,
+        "settings": dict((key, getattr(dq, key)) for key in (
+            "DECIMAL_PLACES", "SAVE_ZERO_WEIGHTS", "RANGE_ENCODE_VERTICES", "PALETTE_COLORSET", "COLOR_RAMP")),
+        "results": results,
+    }
+
+
+# --- Report ---
+def _case_key(result):
+    return "%s %d" % (result["distribution"], result["vertices"])
+
+
+def _print_result(result):
+    stages = "  ".join("%s %.3f" % (stage, result["stages"][stage]["best"]) for stage in STAGES)
+    print("%-16s %7d levels  %s s" % (_case_key(result), result["levels"], stages))
+
+
+def compare_results(new, old):
+    """
+    Prints best times of both runs per case and stage, stages that changed more than CHANGE_THRESHOLD are marked
+    """
+    old_cases = dict((_case_key(r), r) for r in old["results"])
+    print("Compared with %s %s (%s)" % (old.get("pipeline", "current"), old.get("commit"), old.get("time")))
+    for key in ("settings", "numpy", "python"):
+        if old.get(key) != new.get(key):
+            print("Warning: %s differ: %s -> %s" % (key, old.get(key), new.get(key)))
+    for result in new["results"]:
+        previous = old_cases.get(_case_key(result))
+        if previous is None:
+            continue
+        for stage in STAGES:
+            before = previous["stages"].get(stage, {}).get("best")
+            after = result["stages"][stage]["best"]
+            if not before:
+                continue
+            ratio = after / before
+            mark = ""
+            if ratio < 1.0 - CHANGE_THRESHOLD:
+                mark = "faster"
+            elif ratio > 1.0 + CHANGE_THRESHOLD:
+                mark = "SLOWER"
+            print("%-16s %-10s %8.3f -> %8.3f s  x%.2f %s" % (_case_key(result), stage, before, after, ratio, mark))
+
+
+def _parse_setting(text):
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DQ export/apply stages against a fake maya.cmds")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="vertex counts")
+    parser.add_argument("--dists", nargs="+", default=DISTRIBUTIONS, choices=DISTRIBUTIONS, help="weight distributions")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best and median are kept")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="export_quaternion_v4 setting, value in JSON (DECIMAL_PLACES=2)")
+    parser.add_argument("--no-numpy", action="store_true", help="time the pure Python fallbacks")
+    parser.add_argument("--baseline", action="store_true", help="time the original getAttr loop and json.dumps + regex pipeline")
+    parser.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "dq_bench.json"), help="results file")
+    parser.add_argument("--compare", help="results file of an earlier run")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.dists, args.repeat, dict(_parse_setting(s) for s in args.set),
+                           not args.no_numpy, args.baseline)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print("Results written to %s" % args.out)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare_results(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
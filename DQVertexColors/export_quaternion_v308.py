@@ -23,15 +23,25 @@ convert DQ weights to a grayscale color set for visualization and further use in
 ---------------------------------------------------------------------------------------------------------------
 """
 
-# --- load plugin automatically ---
+# --- plugin, loaded on the first apply ---
 PLUGIN_PATH = r"E:\maya_plugins\DQ_weights\applyDQVertexColorsCmd\x64\Release\applyDQVertexColors.mll"
-if not cmds.pluginInfo(PLUGIN_PATH, query=True, loaded=True):
+
+
+def load_dq_plugin():
+    """
+    Loads the plugin from PLUGIN_PATH on the first apply, not on import,
+    falls back to Maya's plug-in path
+    """
+    if cmds.pluginInfo('applyDQVertexColors', query=True, loaded=True):
+        return
     try:
         cmds.loadPlugin(PLUGIN_PATH)
         print("Plugin loaded:", PLUGIN_PATH)
     except Exception as e:
         cmds.warning("Failed to load plugin: %s" % e)
-        
+        cmds.loadPlugin('applyDQVertexColors')
+
+
 EXPORT_DIR = r"D:\export_dq_blend_weights"  # export folder, created automatically if it doesn't exist / папка для экспорта, создает автоматически, если её нет
 DECIMAL_PLACES = 4  # number of decimal places for weights / количество знаков после запятой
 SAVE_ZERO_WEIGHTS = True    # save zero weights or skip / сохранять нулевые веса при экспорте или нет
@@ -214,8 +224,7 @@ def apply_dq_weights_with_plugin(json_path, color_set_name='dqColorSet'):
     --------------------------------------------------------
     """
     start_time = time.time()  # старт таймера
-    if not cmds.pluginInfo('applyDQVertexColors', query=True, loaded=True):
-        cmds.loadPlugin('applyDQVertexColors')
+    load_dq_plugin()
 
     with open(json_path, 'r') as f:
         data = json.load(f)
@@ -1,9 +1,33 @@
 # -*- coding: utf-8 -*-
 import maya.cmds as cmds
+import contextlib
+import datetime
+import errno
+import functools
+import base64
+import hashlib
 import json
+import math
+import mmap
 import os
 import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
 import time
+from array import array
+from collections import OrderedDict, deque
+
+try:
+    import jspl_selection
+except ImportError:
+    jspl_selection = None
+
+# numpy takes longer to import than the rest of the tool, it is imported on the first
+# export (_numpy); False until then, None if it is not installed
+np = False
 
 """
 ---------------------------------------------------------------------------------------------------------------
@@ -23,51 +47,405 @@ convert DQ weights to a grayscale color set for visualization and further use in
 ---------------------------------------------------------------------------------------------------------------
 """
 
-# --- load plugin automatically (UPDATED PATH) ---
-PLUGIN_PATH = r"U:\AssetStorage\CharTools\an_scripts\skinning\quaternion_plugin\applyDQVertexColors.mll"
-if not cmds.pluginInfo(PLUGIN_PATH, query=True, loaded=True):
-    try:
-        cmds.loadPlugin(PLUGIN_PATH)
-        print("Plugin loaded:", PLUGIN_PATH)
-    except Exception as e:
-        cmds.warning("Failed to load plugin: %s" % e)
-        
+# --- plugin, loaded on the first apply (ensure_dq_plugin) ---
+PLUGIN_NAME = "applyDQVertexColors"
+PLUGIN_SEARCH_PATH = [r"U:\AssetStorage\CharTools\an_scripts\skinning\quaternion_plugin"]  # folders with the plugin build, DQ_PLUGIN_PATH env folders go first / папки со сборкой плагина
+PLUGIN_CACHE_DIR = os.path.join(os.path.expanduser("~"), "dq_plugin_cache")    # local copy of the plugin, used when the share is unreachable / локальная копия плагина
+
 EXPORT_DIR = r"D:\export_dq_blend_weights"  # export folder, created automatically if it doesn't exist / папка для экспорта, создает автоматически, если её нет
 DECIMAL_PLACES = 4  # number of decimal places for weights / количество знаков после запятой
 SAVE_ZERO_WEIGHTS = True    # save zero weights or skip / сохранять нулевые веса при экспорте или нет
 MERGE_COLORSET = True   # combine colorsets or replace / объединять колорсеты или заменить
 CHECK_DQ_WEIGHTS = False    # check if weights exist before export / проверка на DQ веса перед экспортом
+BINARY_EXPORT = False   # export to binary .dqw instead of .json / экспорт в бинарный .dqw вместо .json
+RANGE_ENCODE_VERTICES = False   # write runs of vertices as [start, end] / записывать подряд идущие вертексы как [начало, конец]
+USE_EXPORT_CACHE = True    # reuse the last export if nothing changed / не перезаписывать экспорт, если ничего не изменилось
+DELTA_EXPORT = False    # write only vertices changed since the last version / сохранять только изменения относительно прошлой версии
+PALETTE_COLORSET = True    # one shared color per weight level in the colorset / один общий цвет на уровень веса в колорсете
+PREVIEW_ONLY = False    # Export+Apply colors the mesh straight from the skinCluster, no file / Export+Apply красит меш сразу из skinCluster, без файла
+COLOR_RAMP = "gray"     # "gray", "viridis" or stops "r g b;r g b;..." / цветовая шкала: "gray", "viridis" или точки "r g b;r g b;..."
+COLOR_RAMPS = ["gray", "viridis", "0 0 1;0 1 0;1 0 0"]    # ramps in the UI menu / шкалы в меню UI
+PROFILE_STAGES = False  # print the time of every stage after export/apply / печатать время каждого этапа после экспорта/применения
+PROFILE_LOG = ""    # one JSON line per export/apply, file name in EXPORT_DIR or full path, "" = no log / лог замеров: имя в EXPORT_DIR или полный путь, "" = без лога
+PROFILE_CPROFILE = False    # also capture cProfile stats of every run / дополнительно собирать статистику cProfile
+EXPORT_THREADS = 4  # batch export: threads writing files while Maya reads the next mesh, 1 = one by one / потоки записи файлов в пакетном экспорте, 1 = по очереди
+
+
+# --- Python 2 (Maya 2020 and older) ---
+def _replace_file(src, dst):
+    # os.replace is Python 3 only, os.rename can't overwrite an existing file on Windows
+    if hasattr(os, "replace"):
+        os.replace(src, dst)
+        return
+    if os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+
+def _array_bytes(values):
+    return values.tobytes() if hasattr(values, "tobytes") else values.tostring()
+
+
+def _array_from_bytes(typecode, data):
+    values = array(typecode)
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    return values
+
+
+# --- Profiling ---
+# Every export/apply is a run of timed spans (stage, seconds, vertices, bytes),
+# the breakdown goes to the Script Editor and one line per run to PROFILE_LOG
+PROFILE_TOP = 25    # functions printed from cProfile stats
+_profile_run = None     # run in progress, only the thread that started it adds spans to it
+_profile_local = threading.local()  # spans of a worker thread, merged into the run when it is joined
+_timer = getattr(time, "perf_counter", time.time)
+
+
+@contextlib.contextmanager
+def profile_span(stage, **info):
+    """
+    Times one stage of the current run, vertices/bytes known only at the end go into the yielded dict
+    Outside a run the span is dropped, in a worker thread it goes to the worker's own list
+    """
+    span = dict(info, stage=stage)
+    start = _timer()
+    try:
+        yield span
+    finally:
+        span["seconds"] = _timer() - start
+        spans = getattr(_profile_local, "spans", None)
+        run = _profile_run
+        if spans is not None:
+            spans.append(span)
+        elif run is not None and run["thread"] is threading.current_thread():
+            run["spans"].append(span)
+
+
+@contextlib.contextmanager
+def profile_run(name):
+    """
+    ------------------------------------------------------------------------
+    One export/apply: collects the spans of everything it calls, then prints
+    the breakdown and appends it to PROFILE_LOG
+    A run started inside another run (apply in Export+Apply) is timed as one
+    more stage of the outer run
+
+    Замер одного экспорта/применения: собирает время всех этапов,
+    печатает его и дописывает в PROFILE_LOG
+    ------------------------------------------------------------------------
+    """
+    global _profile_run
+    if _profile_run is not None or not (PROFILE_STAGES or PROFILE_LOG or PROFILE_CPROFILE):
+        with profile_span(name):
+            yield
+        return
+
+    run = {"run": name, "spans": [], "thread": threading.current_thread()}
+    profiler = None
+    if PROFILE_CPROFILE:
+        import cProfile
+        profiler = cProfile.Profile()
+    _profile_run = run
+    start = _timer()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    except Exception as e:
+        run["error"] = "%s: %s" % (type(e).__name__, e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        run["seconds"] = _timer() - start
+        _profile_run = None
+        _finish_profile_run(run, profiler)
+
+
+def profiled(name):
+    """
+    Decorator: the function is one profile_run
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_run(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_worker(func):
+    """
+    Wraps func for a worker thread: the wrapper returns (result, spans) and the thread
+    that joins the worker adds the spans to its run with merge_profile_spans
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        spans = []
+        _profile_local.spans = spans
+        try:
+            return func(*args, **kwargs), spans
+        finally:
+            _profile_local.spans = None
+    return wrapper
+
+
+def merge_profile_spans(spans):
+    run = _profile_run
+    if run is not None and run["thread"] is threading.current_thread():
+        run["spans"].extend(spans)
+
+
+def summarize_profile_run(run):
+    """
+    Spans of a run summed per stage, in the order the stages first ran
+    """
+    stages = []
+    by_stage = {}
+    for span in run["spans"]:
+        total = by_stage.get(span["stage"])
+        if total is None:
+            total = by_stage[span["stage"]] = {"stage": span["stage"], "seconds": 0.0, "calls": 0}
+            stages.append(total)
+        total["seconds"] += span["seconds"]
+        total["calls"] += 1
+        for key in ("vertices", "bytes"):
+            if span.get(key):
+                total[key] = total.get(key, 0) + span[key]
+    return stages
+
+
+def _finish_profile_run(run, profiler):
+    stages = summarize_profile_run(run)
+    for stage in stages:
+        stage["seconds"] = round(stage["seconds"], 6)
+    record = {
+        "run": run["run"],
+        "time": datetime.datetime.now().isoformat(),
+        "scene": cmds.file(query=True, sceneName=True) or "",
+        "seconds": round(run["seconds"], 6),
+        "stages": stages,
+    }
+    if run.get("error"):
+        record["error"] = run["error"]
+
+    if PROFILE_STAGES:
+        print("DQ profile: %s %.3f s%s" % (run["run"], run["seconds"], " (failed)" if run.get("error") else ""))
+        for stage in stages:
+            extra = ""
+            if stage.get("vertices"):
+                extra += "  {:,} verts".format(stage["vertices"])
+            if stage.get("bytes"):
+                extra += "  %.2f MB" % (stage["bytes"] / 1048576.0)
+            share = 100.0 * stage["seconds"] / run["seconds"] if run["seconds"] else 0.0
+            print("  %-16s %8.3f s %4.0f%%  x%d%s" % (stage["stage"], stage["seconds"], share, stage["calls"], extra))
+
+    log_path = os.path.join(EXPORT_DIR, PROFILE_LOG) if PROFILE_LOG else None
+    log_dir = os.path.dirname(os.path.abspath(log_path)) if log_path else None
+    if profiler:
+        import pstats
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        if log_path:
+            stats_path = os.path.splitext(log_path)[0] + "_%s_%s.prof" % (
+                run["run"], datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f"))
+            try:
+                _make_dirs(log_dir)
+                profiler.dump_stats(stats_path)
+                record["cprofile"] = stats_path
+            except (IOError, OSError) as e:
+                cmds.warning("Could not write profile stats %s: %s" % (stats_path, e))
+
+    if log_path:
+        try:
+            _make_dirs(log_dir)
+            with open(log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except (IOError, OSError) as e:
+            cmds.warning("Could not write profile log %s: %s" % (log_path, e))
+
+
+# --- Plugin loading ---
+PLUGIN_EXT = {"win32": ".mll", "darwin": ".bundle"}.get(sys.platform, ".so")
+PLUGIN_CACHE_KEEP = 3   # local copies kept in PLUGIN_CACHE_DIR
+
+
+def _plugin_search_dirs():
+    dirs = [d for d in os.environ.get("DQ_PLUGIN_PATH", "").split(os.pathsep) if d]
+    dirs.extend(PLUGIN_SEARCH_PATH)
+    # the build kept next to this script
+    if "__file__" in globals():
+        dirs.append(os.path.dirname(os.path.abspath(__file__)))
+    return dirs
+
+
+def find_dq_plugin():
+    """
+    First plugin build found on the search path or None
+    """
+    for folder in _plugin_search_dirs():
+        path = os.path.join(folder, PLUGIN_NAME + PLUGIN_EXT)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _cached_dq_plugins():
+    """
+    Local copies, newest first: <PLUGIN_CACHE_DIR>/<size>_<mtime>/<plugin file>
+    """
+    paths = []
+    if os.path.isdir(PLUGIN_CACHE_DIR):
+        for name in os.listdir(PLUGIN_CACHE_DIR):
+            path = os.path.join(PLUGIN_CACHE_DIR, name, PLUGIN_NAME + PLUGIN_EXT)
+            if os.path.isfile(path):
+                paths.append(path)
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def cache_dq_plugin(source):
+    """
+    --------------------------------------------------------------------------
+    Copies a plugin build into PLUGIN_CACHE_DIR and returns the local copy
+    Every build gets its own folder (size + mtime), the file keeps its name
+    so the plugin name stays the same and a copy loaded by another Maya
+    (locked on Windows) is never overwritten
+
+    Копирует сборку плагина в локальный кеш и возвращает путь к копии
+    --------------------------------------------------------------------------
+    """
+    stat = os.stat(source)
+    folder = os.path.join(PLUGIN_CACHE_DIR, "%d_%d" % (stat.st_size, int(stat.st_mtime)))
+    path = os.path.join(folder, os.path.basename(source))
+    if not os.path.isfile(path):
+        _make_dirs(folder)
+        part = path + ".part"
+        shutil.copyfile(source, part)
+        _replace_file(part, path)
+        # older builds, a copy still loaded by another Maya can't be removed and stays
+        for old in _cached_dq_plugins()[PLUGIN_CACHE_KEEP:]:
+            shutil.rmtree(os.path.dirname(old), ignore_errors=True)
+    return path
+
+
+def ensure_dq_plugin():
+    """
+    ---------------------------------------------------------------------------
+    Loads the plugin on first use, not on import: the build from the search
+    path is loaded through its local copy; if no build is reachable (off-site,
+    share down) the newest local copy is loaded, then Maya's own plug-in path
+
+    Загружает плагин при первом применении, а не при импорте: сборка
+    с сетевого пути грузится через локальную копию, без сети - последняя копия
+    ---------------------------------------------------------------------------
+    """
+    if cmds.pluginInfo(PLUGIN_NAME, query=True, loaded=True):
+        return
+    with profile_span("load_plugin"):
+        path = None
+        source = find_dq_plugin()
+        if source:
+            try:
+                path = cache_dq_plugin(source)
+            except (IOError, OSError) as e:
+                cmds.warning("Could not copy %s to %s: %s" % (source, PLUGIN_CACHE_DIR, e))
+                path = source
+        else:
+            cached = _cached_dq_plugins()
+            if cached:
+                path = cached[0]
+                cmds.warning("%s not found on %s, loading the local copy %s" % (
+                    PLUGIN_NAME + PLUGIN_EXT, os.pathsep.join(_plugin_search_dirs()), path))
+
+        try:
+            cmds.loadPlugin(path or PLUGIN_NAME)
+        except RuntimeError as e:
+            cmds.error("Failed to load %s (searched %s): %s" % (
+                PLUGIN_NAME, os.pathsep.join(_plugin_search_dirs()), e))
+        print("Plugin loaded:", path or PLUGIN_NAME)
+
+
+# 1.1 is the first build with -file, -packed*, -noProgress, -palette, -ramp, several -mesh
+# per call, dqWeightsToColors and the dqWeightColor node; 1.0 builds only know -verts/-colors
+PLUGIN_CURRENT_VERSION = (1, 1)
+
+
+def dq_plugin_version():
+    """
+    Version of the loaded plugin as a tuple of ints, (1, 0) for the first builds
+    """
+    version = cmds.pluginInfo(PLUGIN_NAME, query=True, version=True) or "0"
+    return tuple(int(x) for x in version.split('.')[:2] if x.isdigit())
+
+
+def check_dq_plugin(feature):
+    """
+    Loads the plugin, warns and returns False if the build is older than 1.1 and lacks feature
+    """
+    ensure_dq_plugin()
+    if dq_plugin_version() >= PLUGIN_CURRENT_VERSION:
+        return True
+    cmds.warning("The loaded %s plugin (%s) has no %s, rebuild the plugin from applyDQVertexColorsCmd.cpp" % (
+        PLUGIN_NAME, cmds.pluginInfo(PLUGIN_NAME, query=True, version=True), feature))
+    return False
 
 
 # --- Convert faces, edges -> vert ---
 def get_selected_vertices():
     """
-    -----------------------------------------------------
+    ------------------------------------------------------------------
     Gets all selected vertices from the current selection
     Converts faces/edges to vertices if necessary
+    Returns [(mesh, sorted vertex indices)] per mesh, in selection order
 
     Получает все выбранные вертексы из текущего выделения
     Автоматически конвертирует фэйсы/эджи в вертексы
-    -----------------------------------------------------
+    Возвращает [(меш, отсортированные индексы вертексов)] по каждому мешу
+    ------------------------------------------------------------------
     """
+    if jspl_selection is not None:
+        # MSelectionList -> index arrays, no "mesh.vtx[i]" strings
+        return [(transform, indices) for transform, _, indices in jspl_selection.jspl_selected_vertices()]
+
     sel = cmds.ls(selection=True, flatten=True)
     if not sel:
         return []
     verts = cmds.polyListComponentConversion(sel, toVertex=True)
-    verts = cmds.ls(verts, flatten=True)
-    return verts
+    meshes = {}
+    order = []
+    for v in cmds.ls(verts, flatten=True) or []:
+        mesh, _, idx = v.partition(".vtx[")
+        if mesh not in meshes:
+            meshes[mesh] = []
+            order.append(mesh)
+        meshes[mesh].append(int(idx.rstrip("]")))
+    return [(mesh, sorted(meshes[mesh])) for mesh in order]
 
 
 # --- Build export path with versioning ---
-def build_export_path(mesh_name, suffix=""):
+def _make_dirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def build_export_path(mesh_name, suffix="", reserve=True):
     """
-    -------------------------------------------------------------
+    ---------------------------------------------------------------------
     Creates an export path with automatic version addition
     Creates a folder for saving files if one doesn't exist
+    The next version comes from one directory listing and is reserved
+    with an exclusive create, so parallel exports never get the same file
 
     Создает путь для экспорта с автоматическим добавлением версии
     Создает папку для сохранений файлов, если её нет
-    -------------------------------------------------------------
+    Версия резервируется созданием пустого файла
+    ---------------------------------------------------------------------
     """
     scene_path = cmds.file(query=True, sceneName=True)
     scene_name = "untitled" if not scene_path else os.path.splitext(os.path.basename(scene_path))[0]
@@ -75,54 +453,698 @@ def build_export_path(mesh_name, suffix=""):
     # create a subfolder for the scene
     scene_dir = os.path.join(EXPORT_DIR, scene_name)
     if not os.path.exists(scene_dir):
-        os.makedirs(scene_dir)
+        _make_dirs(scene_dir)
 
     base_name = "{}_{}".format(scene_name, mesh_name)
     if suffix:
         base_name += "_{}".format(suffix)
     base_name_clean = re.sub(r'_v\d{2}$', '', base_name)
+    ext = DQW_EXT if use_binary_export() else ".json"
+
+    # .json and .dqw exports share one version sequence
+    pattern = re.compile(r"^%s_v(\d+)(?:\.json|%s)$" % (re.escape(base_name_clean), re.escape(DQW_EXT)), re.I)
+    versions = [int(m.group(1)) for m in map(pattern.match, os.listdir(scene_dir)) if m]
+    version = max(versions) + 1 if versions else 1
 
-    version = 1
     while True:
-        versioned_name = "{}_v{:02d}.json".format(base_name_clean, version)
+        versioned_name = "{}_v{:02d}{}".format(base_name_clean, version, ext)
         final_path = os.path.join(scene_dir, versioned_name)
-        if not os.path.exists(final_path):
+        if not reserve:
             return final_path
+        try:
+            os.close(os.open(final_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return final_path
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
         version += 1
 
 
+def release_export_path(path):
+    """
+    Removes a version reserved by build_export_path that was never written
+    """
+    try:
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def staged_write(path, mode="w"):
+    """
+    --------------------------------------------------------------------
+    Writes to a local temp file, then copies it next to path and renames
+    it over path, readers on the share never see a half-written export
+
+    Пишет во временный локальный файл, затем одним переименованием
+    переносит его на место path
+    --------------------------------------------------------------------
+    """
+    fd, tmp = tempfile.mkstemp(prefix="dq_", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        with profile_span("share_copy", bytes=os.path.getsize(tmp)):
+            part = path + ".part"
+            shutil.copyfile(tmp, part)
+            _replace_file(part, path)
+    finally:
+        os.remove(tmp)
+
+
 # --- Save JSON ---
+# item separator json.dumps(indent=4) puts before a newline: "," on Python 3, ", " on Python 2
+_JSON_COMMA = json.dumps([0, 0], indent=0)[3:-4]
+
+
+def _json_value(value, depth):
+    # same text json.dumps(indent=4) gives for a value nested at this depth
+    return json.dumps(value, indent=4).replace("\n", "\n" + "    " * depth)
+
+
+def _write_vertices_line(f, verts, chunk_size=4096):
+    f.write('"vertices": [')
+    for start in range(0, len(verts), chunk_size):
+        if start:
+            f.write(", ")
+        f.write(", ".join(map(str, verts[start:start + chunk_size])))
+    f.write("]")
+
+
 def save_json_singleline_vertices(data, path):
     """
     --------------------------------------------------------------------------------------------------
     Saving JSON to a file also creates arrays for vertices in one line for easier reading
+    Written block by block straight to the file, same layout as json.dumps(indent=4)
 
     Сохранение JSON в файла, вдобавок создает массивы для вертексов в одну строку для удобства чтения
+    Пишется в файл поблочно, без сборки всего текста в памяти
     --------------------------------------------------------------------------------------------------
     """
-    text = json.dumps(data, indent=4)
+    with staged_write(path, "w") as f:
+        with profile_span("json_write") as span:
+            f.write("{")
+            for i, (key, value) in enumerate(data.items()):
+                f.write(_JSON_COMMA + "\n    " if i else "\n    ")
+                f.write(json.dumps(key) + ": ")
+                if key != "blendWeights" or not value:
+                    f.write(_json_value(value, 1))
+                    continue
+
+                f.write("[")
+                for j, block in enumerate(value):
+                    f.write(_JSON_COMMA + "\n        {" if j else "\n        {")
+                    for k, (block_key, block_value) in enumerate(block.items()):
+                        f.write(_JSON_COMMA + "\n            " if k else "\n            ")
+                        if block_key == "vertices":
+                            _write_vertices_line(f, block_value)
+                        else:
+                            f.write(json.dumps(block_key) + ": " + _json_value(block_value, 3))
+                    f.write("\n        }" if block else "}")
+                f.write("\n    ]")
+            f.write("\n}" if data else "}")
+            f.flush()
+            span["bytes"] = f.tell()
+
+
+# --- Range-encoded vertex lists ---
+# formatVersion 2 JSON stores runs of consecutive vertices as inclusive [start, end] pairs
+RANGES_FORMAT_VERSION = 2
+
+
+def encode_vertex_ranges(verts, min_run=3):
+    """
+    -------------------------------------------------------------------------------------------
+    Turns a sorted vertex list into ints and [start, end] pairs: [0, 1, 2, 3, 7] -> [[0, 3], 7]
+    Runs shorter than min_run stay as plain ints, a pair would be longer than them
+
+    Превращает отсортированный список вертексов в числа и пары [начало, конец]
+    -------------------------------------------------------------------------------------------
+    """
+    encoded = []
+    count = len(verts)
+    i = 0
+    while i < count:
+        start = verts[i]
+        j = i + 1
+        while j < count and verts[j] == start + (j - i):
+            j += 1
+        if j - i >= min_run:
+            encoded.append([start, verts[j - 1]])
+        else:
+            encoded.extend(verts[i:j])
+        i = j
+    return encoded
+
+
+def decode_vertex_ranges(items):
+    """
+    Expands ints and [start, end] pairs back into a flat vertex list
+    """
+    verts = []
+    for item in items:
+        if isinstance(item, list):
+            verts.extend(range(item[0], item[1] + 1))
+        else:
+            verts.append(item)
+    return verts
+
+
+def block_vertices(data, block):
+    """
+    Flat vertex list of a JSON blendWeights block, whatever formatVersion the file has
+    """
+    if data.get("formatVersion", 1) >= RANGES_FORMAT_VERSION:
+        return decode_vertex_ranges(block["vertices"])
+    return block["vertices"]
+
+
+# --- Binary DQ weights (.dqw) ---
+# Layout (little-endian, like every platform Maya runs on):
+#   header   magic "DQW1", version, flags, vertex count, decimal places, mesh/skinCluster/exportMode lengths
+#   strings  mesh, skinCluster, exportMode as UTF-8, padded to 4 bytes
+#   uint32   vertex indices, grouped by weight level and ascending inside a level
+#   weights  uint16 levels (weight * 10^decimals) if they fit, uint32 levels otherwise (version 2)
+#            version 1 files without the levels flag hold float32 weights, they are still readable
+DQW_EXT = ".dqw"
+DQW_MAGIC = b"DQW1"
+DQW_VERSION = 2
+DQW_FLAG_LEVELS = 1
+DQW_FLAG_WIDE_LEVELS = 2
+DQW_MAX_DECIMALS = 9    # weight 1.0 at 10 decimals is past uint32 levels / при 10 знаках вес 1.0 не помещается в uint32
+_DQW_HEADER = struct.Struct("<4sHHIIIII")
+
+
+def use_binary_export():
+    """
+    BINARY_EXPORT, unless DECIMAL_PLACES is more than .dqw levels hold:
+    then the export stays JSON and a warning says so
+    """
+    if BINARY_EXPORT and DECIMAL_PLACES > DQW_MAX_DECIMALS:
+        cmds.warning("Binary export holds up to %d decimal places, %d decimals are exported as JSON"
+                     % (DQW_MAX_DECIMALS, DECIMAL_PLACES))
+        return False
+    return BINARY_EXPORT
+
+
+def parse_weight_level(text, decimal_places):
+    """
+    Exact integer level of a JSON weight string ("0.25" with 4 decimals -> 2500)
+    """
+    negative = text.startswith("-")
+    int_part, _, frac_part = text.lstrip("-").partition(".")
+    level = int(int_part or "0") * 10 ** decimal_places + int(frac_part.ljust(decimal_places, "0")[:decimal_places] or "0")
+    return -level if negative else level
+
+
+def _pad4(size):
+    return (4 - size % 4) % 4
+
+
+def save_dqw(data, path, decimal_places=None):
+    """
+    -----------------------------------------------------------------
+    Saves export data (same dict as the JSON export) to a .dqw file
+    Decimal places are taken from the weight strings if not given
+    Raises ValueError if the levels don't fit uint32 (keep the JSON)
+
+    Сохраняет данные экспорта (тот же словарь, что и для JSON) в .dqw
+    -----------------------------------------------------------------
+    """
+    with staged_write(path, "wb") as f:
+        with profile_span("dqw_write") as span:
+            blocks = data["blendWeights"]
+            if decimal_places is None:
+                decimal_places = max([len(b["weight"].partition(".")[2]) for b in blocks] or [0])
+
+            indices = array("I")
+            levels = []
+            for block in blocks:
+                level = parse_weight_level(block["weight"], decimal_places)
+                verts = block_vertices(data, block)
+                indices.extend(verts)
+                levels.extend([level] * len(verts))
+
+            # levels stay exact integers, a float would lose digits past ~7 decimal places
+            if all(0 <= lv <= 0xFFFF for lv in levels):
+                weights = array("H", levels)
+                version, flags = 1, DQW_FLAG_LEVELS
+            elif all(0 <= lv <= 0xFFFFFFFF for lv in levels):
+                weights = array("I", levels)
+                version, flags = 2, DQW_FLAG_LEVELS | DQW_FLAG_WIDE_LEVELS
+            else:
+                raise ValueError("Weights with %d decimal places don't fit a .dqw file, use the JSON export"
+                                 % decimal_places)
+
+            strings = [data["mesh"].encode("utf-8"), data["skinCluster"].encode("utf-8"), data["exportMode"].encode("utf-8")]
+            header = _DQW_HEADER.pack(DQW_MAGIC, version, flags,
+                                      len(indices), decimal_places, *[len(x) for x in strings])
+            text = b"".join(strings)
+            f.write(header)
+            f.write(text + b"\0" * _pad4(len(header) + len(text)))
+            f.write(_array_bytes(indices))
+            f.write(_array_bytes(weights))
+            span["bytes"] = f.tell()
+
+
+@contextlib.contextmanager
+def open_dqw(path):
+    """
+    ------------------------------------------------------------------------
+    Memory-maps a .dqw file without parsing it
+    Yields a dict with header fields plus "vertices" and "levels"/"weights"
+    memoryviews straight over the file; they are only valid inside the block
+
+    Отображает .dqw файл в память без разбора
+    Массивы вершин и весов доступны только внутри блока with
+    ------------------------------------------------------------------------
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    views = []
+    try:
+        magic, version, flags, count, decimal_places, mesh_len, skin_len, mode_len = _DQW_HEADER.unpack_from(mm, 0)
+        if magic != DQW_MAGIC or version > DQW_VERSION:
+            raise ValueError("Not a supported .dqw file: %s" % path)
+        offset = _DQW_HEADER.size
+        mesh = mm[offset:offset + mesh_len].decode("utf-8")
+        offset += mesh_len
+        skin = mm[offset:offset + skin_len].decode("utf-8")
+        offset += skin_len
+        mode = mm[offset:offset + mode_len].decode("utf-8")
+        offset += mode_len
+        offset += _pad4(offset)
+
+        # Python 2 memoryview can't be cast, the arrays are copied out of the map there
+        raw = memoryview(mm) if hasattr(memoryview, "cast") else None
+        if raw is not None:
+            views.append(raw)
+
+        def section(start, typecode):
+            end = start + array(typecode).itemsize * count
+            if raw is None:
+                return _array_from_bytes(typecode, mm[start:end]), end
+            view = raw[start:end].cast(typecode)
+            views.append(view)
+            return view, end
+
+        vertices, offset = section(offset, "I")
+        if flags & DQW_FLAG_WIDE_LEVELS:
+            weights, offset = section(offset, "I")
+        elif flags & DQW_FLAG_LEVELS:
+            weights, offset = section(offset, "H")
+        else:
+            weights, offset = section(offset, "f")
+
+        yield {
+            "mesh": mesh,
+            "skinCluster": skin,
+            "exportMode": mode,
+            "decimalPlaces": decimal_places,
+            "vertices": vertices,
+            "levels": weights if flags & DQW_FLAG_LEVELS else None,
+            "weights": None if flags & DQW_FLAG_LEVELS else weights,
+        }
+    finally:
+        for view in reversed(views):
+            view.release()
+        try:
+            mm.close()
+        except BufferError:
+            # caller kept a slice, the map is closed once it is garbage collected
+            pass
+
+
+def iter_dqw_blocks(dqw):
+    """
+    Yields (weight string, vertex index list) blocks from an open .dqw, same order as the JSON blendWeights
+    """
+    vertices = dqw["vertices"]
+    values = dqw["levels"] if dqw["levels"] is not None else dqw["weights"]
+    decimal_places = dqw["decimalPlaces"]
+    scale = 10.0 ** decimal_places
+    count = len(vertices)
+    start = 0
+    while start < count:
+        value = values[start]
+        end = start + 1
+        while end < count and values[end] == value:
+            end += 1
+        level = value if dqw["levels"] is not None else int(round(value * scale))
+        yield format_weight_level(level, decimal_places), vertices[start:end].tolist()
+        start = end
+
+
+def convert_dq_weights(src_path, dst_path=None):
+    """
+    ------------------------------------------------------------------
+    Converts a DQ export between JSON and binary .dqw (by extension)
+    Writes next to the source file if no destination is given
+    A delta is written with its chain applied, .dqw has no deltas
+
+    Конвертирует экспорт DQ между JSON и бинарным .dqw (по расширению)
+    ------------------------------------------------------------------
+    """
+    to_binary = not src_path.lower().endswith(DQW_EXT)
+    if not dst_path:
+        dst_path = os.path.splitext(src_path)[0] + (DQW_EXT if to_binary else ".json")
+
+    if to_binary:
+        with open(src_path, "r") as f:
+            data = json.load(f)
+        if data.get("deltaBase"):
+            data = resolved_export_data(src_path)
+        save_dqw(data, dst_path)
+    else:
+        with open_dqw(src_path) as dqw:
+            data = {
+                "mesh": dqw["mesh"],
+                "skinCluster": dqw["skinCluster"],
+                "exportMode": dqw["exportMode"],
+                "blendWeights": [{"weight": w_str, "vertices": verts} for w_str, verts in iter_dqw_blocks(dqw)]
+            }
+        save_json_singleline_vertices(data, dst_path)
+    return dst_path
+
+
+def convert_export_dir(to_binary=True, export_dir=None):
+    """
+    ---------------------------------------------------------------
+    Converts every export in EXPORT_DIR that has no counterpart yet
+    JSON -> .dqw by default, .dqw -> JSON with to_binary=False
+
+    Конвертирует все экспорты в EXPORT_DIR, у которых еще нет пары
+    ---------------------------------------------------------------
+    """
+    src_ext, dst_ext = (".json", DQW_EXT) if to_binary else (DQW_EXT, ".json")
+    converted = []
+    for root, _, files in os.walk(export_dir or EXPORT_DIR):
+        for name in files:
+            if not name.lower().endswith(src_ext):
+                continue
+            src = os.path.join(root, name)
+            dst = os.path.splitext(src)[0] + dst_ext
+            if os.path.exists(dst):
+                continue
+            try:
+                converted.append(convert_dq_weights(src, dst))
+            except (ValueError, KeyError, IOError) as e:
+                print("Failed to convert %s: %s" % (src, e))
+    print("Converted %d files." % len(converted))
+    return converted
+
+
+# --- Read blend weights ---
+def _read_blend_weights_bulk(skin_cluster, indices):
+    """
+    Reads the whole blendWeights multi in two getAttr calls and maps it onto indices.
+    Returns None if Maya returned something that can't be aligned with the indices.
+    """
+    attr = "%s.blendWeights" % skin_cluster
+    existing = cmds.getAttr(attr, multiIndices=True) or []
+    if not existing:
+        # nothing was painted, every element still has its default value
+        return [0.0] * len(indices)
+
+    values = cmds.getAttr(attr)
+    # a numeric multi comes back as one tuple in a list: [(w0, w1, ...)]
+    if isinstance(values, list) and len(values) == 1 and isinstance(values[0], (list, tuple)):
+        values = values[0]
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    if len(values) != len(existing) or (values and isinstance(values[0], (list, tuple))):
+        return None
+
+    dense = [0.0] * (max(existing) + 1)
+    for i, w in zip(existing, values):
+        dense[i] = w
+    size = len(dense)
+    return [float(dense[i]) if i < size else 0.0 for i in indices]
+
+
+def read_blend_weights(skin_cluster, indices):
+    """
+    -------------------------------------------------------------------------
+    Reads DQ blend weights of the given vertex indices from the skinCluster
+    Uses one bulk read, falls back to one getAttr per vertex if it fails
+
+    Читает DQ веса указанных вертексов из скинкластера
+    Читает весь массив за один раз, при ошибке читает каждый вертекс отдельно
+    -------------------------------------------------------------------------
+    """
+    try:
+        weights = _read_blend_weights_bulk(skin_cluster, indices)
+    except (RuntimeError, ValueError, TypeError):
+        weights = None
+
+    if weights is None:
+        weights = [float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, i))) for i in indices]
+    return weights
+
+
+# --- Quantize and group weights ---
+def _exact_weight_level(w, decimal_places):
+    """
+    Level of a weight exactly as "{:.Nf}" rounds it, for values near a rounding boundary
+    """
+    text = "{0:.{1}f}".format(w, decimal_places)
+    level = int(text.lstrip("-").replace(".", ""))
+    return -level if text.startswith("-") else level
+
+
+def _is_ambiguous_level(scaled):
+    """
+    True if w * 10^N is too close to .5 for float rounding to be trusted
+    """
+    frac = scaled - math.floor(scaled)
+    return abs(frac - 0.5) <= abs(scaled) * 2.0 ** -50 + 1e-9
+
+
+def format_weight_level(level, decimal_places):
+    """
+    Turns an integer weight level back into the string written to JSON ("0", "0.5", "1")
+    """
+    digits = str(abs(level)).rjust(decimal_places + 1, "0")
+    int_part = digits[:len(digits) - decimal_places] if decimal_places else digits
+    frac_part = digits[len(digits) - decimal_places:].rstrip("0") if decimal_places else ""
+    text = int_part + "." + frac_part if frac_part else int_part
+    return "-" + text if level < 0 else text
+
+
+def _numpy():
+    global np
+    if np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+    return np
+
+
+def _group_weight_levels_numpy(indices, weights, decimal_places, save_zero_weights):
+    idx = np.asarray(indices, dtype=np.int64)
+    w = np.asarray(weights, dtype=np.float64)
+    if not idx.size:
+        return []
+
+    below = np.abs(w) < 10.0 ** (-decimal_places)
+    if save_zero_weights:
+        w = np.where(below, 0.0, w)
+    else:
+        idx = idx[~below]
+        w = w[~below]
+        if not idx.size:
+            return []
+    w = np.minimum(w, 1.0)
+
+    scaled = w * (10.0 ** decimal_places)
+    levels = np.rint(scaled)
+    frac = scaled - np.floor(scaled)
+    ambiguous = np.abs(frac - 0.5) <= np.abs(scaled) * 2.0 ** -50 + 1e-9
+    for k in np.nonzero(ambiguous)[0]:
+        levels[k] = _exact_weight_level(float(w[k]), decimal_places)
+    levels = levels.astype(np.int64)
+
+    # stable argsort by level keeps vertex indices ascending inside each level
+    if idx.size > 1 and not np.all(idx[1:] > idx[:-1]):
+        order = np.argsort(idx, kind="stable")
+        idx = idx[order]
+        levels = levels[order]
+    order = np.argsort(levels, kind="stable")
+    idx = idx[order]
+    levels = levels[order]
+    starts = np.concatenate(([0], np.flatnonzero(levels[1:] != levels[:-1]) + 1))
+
+    flat = idx.tolist()
+    bounds = starts.tolist() + [len(flat)]
+    return [(lv, flat[bounds[k]:bounds[k + 1]]) for k, lv in enumerate(levels[starts].tolist())]
+
+
+def _group_weight_levels_python(indices, weights, decimal_places, save_zero_weights):
+    threshold = 10.0 ** (-decimal_places)
+    scale = 10.0 ** decimal_places
+    exact = decimal_places > 15
+
+    grouped = {}
+    for idx, w in zip(indices, weights):
+        if abs(w) < threshold:
+            if not save_zero_weights:
+                continue
+            level = 0
+        else:
+            if w > 1.0: w = 1.0
+            scaled = w * scale
+            if exact or _is_ambiguous_level(scaled):
+                level = _exact_weight_level(w, decimal_places)
+            else:
+                level = int(round(scaled))
+        grouped.setdefault(level, []).append(idx)
+
+    return [(level, sorted(verts)) for level, verts in sorted(grouped.items())]
+
+
+def group_weight_levels(indices, weights, decimal_places, save_zero_weights=True):
+    """
+    ---------------------------------------------------------------------------
+    Thresholds, clamps and quantizes weights to 10^-N integer levels
+    Returns (level, sorted vertex indices) pairs sorted by level
+    Vertex indices are expected to be unique
+
+    Обрезает, ограничивает и квантует веса до целых уровней с шагом 10^-N
+    Возвращает пары (уровень, отсортированные индексы вертексов) по возрастанию
+    ---------------------------------------------------------------------------
+    """
+    # float64 can't hold more than ~15 exact decimals, use exact formatting there
+    if _numpy() is not None and decimal_places <= 15:
+        return _group_weight_levels_numpy(indices, weights, decimal_places, save_zero_weights)
+    return _group_weight_levels_python(indices, weights, decimal_places, save_zero_weights)
+
+
+# --- Export cache ---
+# <scene export dir>/.dqcache/<key>.entry holds the file name of the export with that content,
+# <key>.lock is created exclusively while someone writes it (works on SMB shares too)
+EXPORT_CACHE_DIR = ".dqcache"
+EXPORT_CACHE_LOCK_TIMEOUT = 60.0
+EXPORT_CACHE_STALE_LOCK = 300.0
+
+
+def export_cache_key(mesh, skin_cluster, export_mode, indices, weights, ext):
+    """
+    Hash of everything that ends up in an export: names, vertex count/indices, weights and
+    every setting or format version that changes the file
+    """
+    h = hashlib.sha1()
+    settings = [mesh, skin_cluster or "", export_mode, ext.lower(), DECIMAL_PLACES, SAVE_ZERO_WEIGHTS,
+                CHECK_DQ_WEIGHTS, RANGE_ENCODE_VERTICES, DELTA_EXPORT, DELTA_MAX_CHAIN, DELTA_MAX_CHANGED,
+                DQW_VERSION, RANGES_FORMAT_VERSION, DELTA_FORMAT_VERSION, len(indices)]
+    h.update(json.dumps(settings).encode("utf-8"))
+    h.update(_array_bytes(array("i", indices)))
+    h.update(_array_bytes(array("d", weights)))
+    return h.hexdigest()
+
+
+def lookup_export_cache(cache_dir, key):
+    """
+    Path of an existing export with this key or None
+    A delta whose base chain no longer resolves (a base was deleted) is not reused
+    """
+    try:
+        with open(os.path.join(cache_dir, key + ".entry"), "r") as f:
+            name = f.read().strip()
+    except (IOError, OSError):
+        return None
+    path = os.path.join(os.path.dirname(cache_dir), name)
+    return path if name and os.path.isfile(path) and dq_delta_chain_resolves(path) else None
 
-    def one_line_vertices(match):
-        arr = match.group(1)
-        arr = arr.replace("\n", "").replace(" ", "")
-        numbers = arr.strip("[],")
-        nums = [n for n in numbers.split(",") if n]
-        return '"vertices": [%s]' % ", ".join(nums)
 
-    text = re.sub(r'"vertices": \[(.*?)\]', one_line_vertices, text, flags=re.S)
-    with open(path, "w") as f:
-        f.write(text)
+def store_export_cache(cache_dir, key, path):
+    with staged_write(os.path.join(cache_dir, key + ".entry"), "w") as f:
+        f.write(os.path.basename(path))
+
+
+@contextlib.contextmanager
+def export_cache_lock(cache_dir, key):
+    """
+    -------------------------------------------------------------------------------
+    Holds <key>.lock in the cache folder so only one artist/worker writes an export
+    Locks older than EXPORT_CACHE_STALE_LOCK are treated as left by a crashed run
+    Does nothing if key is None
+
+    Блокирует <key>.lock, чтобы один и тот же экспорт писал только один процесс
+    -------------------------------------------------------------------------------
+    """
+    if key is None:
+        yield
+        return
+
+    if not os.path.exists(cache_dir):
+        _make_dirs(cache_dir)
+    lock_path = os.path.join(cache_dir, key + ".lock")
+    deadline = time.time() + EXPORT_CACHE_LOCK_TIMEOUT
+    fd = None
+    while fd is None:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+            try:
+                if time.time() - os.path.getmtime(lock_path) > EXPORT_CACHE_STALE_LOCK:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                raise RuntimeError("Timed out waiting for export lock %s" % lock_path)
+            time.sleep(0.1)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
 
 
 # --- Export DQ blend weights ---
+@profiled("export")
 def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
     """
     ---------------------------------------------------------------
     Exports DQ weights from the selected mesh or selected vertices
+    Returns the written path or the unchanged earlier export
 
     Экспортирует DQ веса из выбранного меша или выбранных вертексов
+    Возвращает путь к файлу или к прошлому экспорту без изменений
     ---------------------------------------------------------------
     """
+    try:
+        path = _export_dq_blend_weights(output_path, verts_only, target_mesh)
+    except Exception:
+        release_export_path(output_path)
+        raise
+    # drop the version reserved by build_export_path if it was not used
+    if not path or os.path.abspath(path) != os.path.abspath(output_path):
+        release_export_path(output_path)
+    return path
+
+
+def _export_dq_blend_weights(output_path, verts_only, target_mesh):
+    job = _read_dq_export(output_path, verts_only, target_mesh)
+    if job is None:
+        return None
+    state, path, _ = _write_dq_export(job)
+    return _report_dq_export(job, state, path)
+
+
+def _read_dq_export(output_path, verts_only, target_mesh):
+    """
+    Maya side of an export: finds the mesh and skinCluster and reads the weights
+    Returns the export job for _write_dq_export or None if the export was canceled
+    """
     global DECIMAL_PLACES, SAVE_ZERO_WEIGHTS, CHECK_DQ_WEIGHTS
 
     mesh_shape = None
@@ -145,7 +1167,7 @@ def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
             sel_verts = get_selected_vertices()
             if not sel_verts:
                 cmds.error("Please select vertices")
-            mesh_transform = sel_verts[0].split(".")[0]
+            mesh_transform = sel_verts[0][0]
             mesh_shape = cmds.listRelatives(mesh_transform, shapes=True, fullPath=True)[0]
         else:
             sel = cmds.ls(selection=True, dag=True, shapes=True)
@@ -154,8 +1176,9 @@ def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
             mesh_shape = sel[0]
             mesh_transform = cmds.listRelatives(mesh_shape, parent=True, fullPath=True)[0]
 
-    history = cmds.listHistory(mesh_shape) or []
-    skin_clusters = cmds.ls(history, type='skinCluster')
+    with profile_span("list_history"):
+        history = cmds.listHistory(mesh_shape) or []
+        skin_clusters = cmds.ls(history, type='skinCluster')
     
     if not skin_clusters:
         if CHECK_DQ_WEIGHTS:
@@ -166,101 +1189,917 @@ def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
     else:
         skin_cluster = skin_clusters[0]
 
-    raw_weights = {}
-    threshold = 10.0 ** (-DECIMAL_PLACES)
+    indices = []
+    weights = []
 
     if skin_cluster:
-        if verts_only and not target_mesh:
-            # Verts from selection
-            for v in sel_verts:
-                idx = int(v.split("[")[-1].split("]")[0])
-                w = float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, idx)))
-                if abs(w) < threshold:
-                    if SAVE_ZERO_WEIGHTS: w = 0.0
-                    else: continue
-                if w > 1.0: w = 1.0
-                weight_str = "{0:.{1}f}".format(w, DECIMAL_PLACES).rstrip("0").rstrip(".")
-                raw_weights[idx] = weight_str
-        else:
-            # Whole mesh (or batch mode)
-            num_verts = cmds.polyEvaluate(mesh_transform, vertex=True)
-            for i in range(num_verts):
-                w = float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, i)))
-                if abs(w) < threshold:
-                    if SAVE_ZERO_WEIGHTS: w = 0.0
-                    else: continue
-                if w > 1.0: w = 1.0
-                weight_str = "{0:.{1}f}".format(w, DECIMAL_PLACES).rstrip("0").rstrip(".")
-                raw_weights[i] = weight_str
-
-        if CHECK_DQ_WEIGHTS and (not raw_weights or all(float(w) == 0.0 for w in raw_weights.values())):
-            cmds.warning("Mesh '%s' has no Dual Quaternion weights. Export canceled." % mesh_transform)
-            return
+        with profile_span("read_weights") as span:
+            if verts_only and not target_mesh:
+                # Verts from selection (first selected mesh)
+                indices = list(sel_verts[0][1])
+            else:
+                # Whole mesh (or batch mode)
+                num_verts = cmds.polyEvaluate(mesh_transform, vertex=True)
+                indices = range(num_verts)
+
+            weights = read_blend_weights(skin_cluster, indices)
+            span["vertices"] = len(indices)
+
+    return {
+        "output_path": output_path,
+        "mesh": mesh_transform,
+        "skin_cluster": skin_cluster,
+        "export_mode": "verts" if verts_only else "mesh",
+        "indices": indices,
+        "weights": weights,
+    }
 
-    grouped = {}
-    for vtx, w_str in raw_weights.items():
-        grouped.setdefault(w_str, []).append(vtx)
 
+def _write_dq_export(job, keep_levels=False):
+    """
+    File side of an export: cache lookup, quantizing and writing, no maya.cmds calls,
+    so it can run in a worker thread
+    Returns (state, path, levels): state is "exported", "cached" or "empty" (no DQ weights),
+    levels are the written (level, vertices) pairs if keep_levels, None otherwise
+    """
+    output_path = job["output_path"]
+    cache_dir = None
+    cache_key = None
+    if USE_EXPORT_CACHE:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), EXPORT_CACHE_DIR)
+        with profile_span("cache_key", vertices=len(job["indices"])):
+            cache_key = export_cache_key(job["mesh"], job["skin_cluster"], job["export_mode"], job["indices"],
+                                         job["weights"], os.path.splitext(output_path)[1])
+
+    cached = cache_key and lookup_export_cache(cache_dir, cache_key)
+    if not cached:
+        with export_cache_lock(cache_dir, cache_key):
+            # someone else may have written the same export while we waited
+            cached = cache_key and lookup_export_cache(cache_dir, cache_key)
+            if not cached:
+                levels = []
+                if job["skin_cluster"]:
+                    with profile_span("group", vertices=len(job["indices"])):
+                        levels = group_weight_levels(job["indices"], job["weights"], DECIMAL_PLACES, SAVE_ZERO_WEIGHTS)
+                    if CHECK_DQ_WEIGHTS and not any(level != 0 for level, _ in levels):
+                        return "empty", None, None
+                _save_dq_export(output_path, job["mesh"], job["skin_cluster"], job["export_mode"], levels)
+                if cache_key:
+                    store_export_cache(cache_dir, cache_key, output_path)
+                return "exported", output_path, levels if keep_levels else None
+    return "cached", cached, None
+
+
+def _report_dq_export(job, state, path):
+    """
+    Prints the result of _write_dq_export on the main thread, returns the export path or None
+    """
+    if state == "empty":
+        cmds.warning("Mesh '%s' has no Dual Quaternion weights. Export canceled." % job["mesh"])
+        return None
+    if state == "cached":
+        print("DQ blend weights for '%s' unchanged, reusing %s" % (job["mesh"], path))
+    else:
+        print("Exported DQ blend weights for '%s' to %s" % (job["mesh"], path))
+    return path
+
+
+def _save_dq_export(output_path, mesh_transform, skin_cluster, export_mode, levels):
+    """
+    Writes the export file from grouped (level, vertices) pairs
+    """
     dq_weights_sorted = [
-        {"weight": w_str, "vertices": sorted(verts)}
-        for w_str, verts in sorted(grouped.items(), key=lambda x: float(x[0]))
+        {"weight": format_weight_level(level, DECIMAL_PLACES), "vertices": verts}
+        for level, verts in levels
     ]
 
     export_data = {
         "mesh": mesh_transform,
         "skinCluster": skin_cluster if skin_cluster else "",
-        "exportMode": "verts" if verts_only else "mesh",
+        "exportMode": export_mode,
         "blendWeights": dq_weights_sorted
     }
 
-    save_json_singleline_vertices(export_data, output_path)
-    print("Exported DQ blend weights for '%s' to %s" % (mesh_transform, output_path))
+    if output_path.lower().endswith(DQW_EXT):
+        save_dqw(export_data, output_path, DECIMAL_PLACES)
+    else:
+        if DELTA_EXPORT and export_mode == "mesh":
+            with profile_span("delta"):
+                export_data = make_delta_export(export_data, output_path)
+        if RANGE_ENCODE_VERTICES:
+            export_data = OrderedDict(export_data)
+            export_data["formatVersion"] = max(export_data.get("formatVersion", 1), RANGES_FORMAT_VERSION)
+            export_data["blendWeights"] = [
+                {"weight": block["weight"], "vertices": encode_vertex_ranges(block["vertices"])}
+                for block in export_data.pop("blendWeights")
+            ]
+        save_json_singleline_vertices(export_data, output_path)
+
+
+# --- Streaming reader ---
+class _JsonStream(object):
+    """
+    Minimal pull reader over a JSON file, only one chunk of text is kept in memory
+    """
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r"\s*")
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+
+    def fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            if self.pos < len(self.buf):
+                char = self.buf[self.pos]
+                if char not in " \t\r\n":
+                    return char
+                self.pos = self._whitespace.match(self.buf, self.pos).end()
+            elif not self.fill():
+                raise ValueError("Unexpected end of JSON")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected %r, got %r" % (char, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def skip(self, char):
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the chunk may continue in the next one
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    @staticmethod
+    def _ints(text, out):
+        text = text.strip().strip(",")
+        if not text.strip():
+            return 0
+        size = len(out)
+        out.extend(map(int, text.split(",")))
+        return len(out) - size
+
+    def int_array(self, out):
+        """
+        Reads [1, 2, [5, 9], ...] straight into out, [start, end] pairs are expanded
+        """
+        self.expect("[")
+        if self.skip("]"):
+            return 0
+        count = 0
+        while True:
+            buf, pos = self.buf, self.pos
+            close = buf.find("]", pos)
+            pair = buf.find("[", pos)
+            if pair != -1 and (close == -1 or pair < close):
+                count += self._ints(buf[pos:pair], out)
+                pair_end = buf.find("]", pair)
+                if pair_end == -1:
+                    self.pos = pair
+                    if not self.fill():
+                        raise ValueError("Unexpected end of JSON")
+                    continue
+                start, end = [int(x) for x in buf[pair + 1:pair_end].split(",")]
+                out.extend(range(start, end + 1))
+                count += end - start + 1
+                self.pos = pair_end + 1
+            elif close != -1:
+                count += self._ints(buf[pos:close], out)
+                self.pos = close + 1
+                return count
+            else:
+                cut = buf.rfind(",", pos)
+                if cut != -1:
+                    count += self._ints(buf[pos:cut], out)
+                    self.pos = cut + 1
+                if not self.fill():
+                    raise ValueError("Unexpected end of JSON")
+
+
+def _read_json_blocks(stream, verts, weights):
+    stream.expect("[")
+    if stream.skip("]"):
+        return
+    while True:
+        stream.expect("{")
+        weight = None
+        count = 0
+        if not stream.skip("}"):
+            while True:
+                key = stream.value()
+                stream.expect(":")
+                if key == "vertices":
+                    count = stream.int_array(verts)
+                else:
+                    value = stream.value()
+                    if key == "weight":
+                        weight = float(value)
+                if stream.skip(","):
+                    continue
+                stream.expect("}")
+                break
+        if count:
+            if weight is None:
+                raise ValueError("blendWeights block without a weight")
+            weights.extend(array("d", [weight]) * count)
+        if stream.skip(","):
+            continue
+        stream.expect("]")
+        break
+
+
+def read_dq_weights(path):
+    """
+    -----------------------------------------------------------------------------------
+    Reads a JSON or .dqw export into compact arrays, block by block
+    Returns (header dict without blendWeights, array('i') vertices, array('d') weights)
+
+    Читает экспорт JSON или .dqw в компактные массивы, блок за блоком
+    -----------------------------------------------------------------------------------
+    """
+    verts = array("i")
+    weights = array("d")
+
+    if path.lower().endswith(DQW_EXT):
+        with open_dqw(path) as dqw:
+            info = {"mesh": dqw["mesh"], "skinCluster": dqw["skinCluster"], "exportMode": dqw["exportMode"]}
+            for w_str, block_verts in iter_dqw_blocks(dqw):
+                verts.extend(block_verts)
+                weights.extend(array("d", [float(w_str)]) * len(block_verts))
+        return info, verts, weights
+
+    info = {}
+    with open(path, "r") as f:
+        stream = _JsonStream(f)
+        stream.expect("{")
+        if not stream.skip("}"):
+            while True:
+                key = stream.value()
+                stream.expect(":")
+                if key == "blendWeights":
+                    _read_json_blocks(stream, verts, weights)
+                else:
+                    info[key] = stream.value()
+                if stream.skip(","):
+                    continue
+                stream.expect("}")
+                break
+    return info, verts, weights
+
+
+def read_dq_header(path):
+    """
+    Reads only the header fields of a JSON or .dqw export (everything before "blendWeights")
+    Plain exports written by Python 2 may have blendWeights first, those are read through
+    """
+    if path.lower().endswith(DQW_EXT):
+        with open_dqw(path) as dqw:
+            return {"mesh": dqw["mesh"], "skinCluster": dqw["skinCluster"], "exportMode": dqw["exportMode"]}
+
+    info = {}
+    with open(path, "r") as f:
+        stream = _JsonStream(f)
+        stream.expect("{")
+        if not stream.skip("}"):
+            while True:
+                key = stream.value()
+                stream.expect(":")
+                if key == "blendWeights":
+                    if all(k in info for k in ("mesh", "skinCluster", "exportMode")):
+                        break
+                    _read_json_blocks(stream, array("i"), array("d"))
+                else:
+                    info[key] = stream.value()
+                if stream.skip(","):
+                    continue
+                stream.expect("}")
+                break
+    return info
+
+
+# --- Delta exports ---
+# A delta JSON (formatVersion 3) names the previous version in "deltaBase" and stores only
+# the vertices whose weight changed, plus "removedVertices" that are no longer exported
+DELTA_FORMAT_VERSION = 3
+DELTA_MAX_CHAIN = 8     # write a full export once this many deltas are stacked
+DELTA_MAX_CHANGED = 0.5     # write a full export if more than this part of the mesh changed
+# The shape's dqAppliedExports string attribute records the export each color set shows,
+# JSON {color set: [export path, ramp, palette, vertex count]}. It is saved, referenced and
+# undone with the colors, a delta is merged only onto a color set that shows its base
+APPLIED_EXPORTS_ATTR = "dqAppliedExports"
+
+
+def applied_dq_exports(shape):
+    """
+    {color set: record} of the exports applied to a shape, empty if nothing was recorded
+    """
+    if not cmds.objExists(shape) or not cmds.attributeQuery(APPLIED_EXPORTS_ATTR, node=shape, exists=True):
+        return {}
+    try:
+        return json.loads(cmds.getAttr("%s.%s" % (shape, APPLIED_EXPORTS_ATTR)) or "{}")
+    except ValueError:
+        return {}
+
+
+def applied_dq_record(shape, path):
+    """
+    Record of an export applied to shape with the current ramp/palette settings
+    """
+    return [os.path.normcase(os.path.abspath(path)), COLOR_RAMP, bool(PALETTE_COLORSET),
+            cmds.polyEvaluate(shape, vertex=True)]
+
+
+def set_applied_dq_export(shape, color_set_name, record=None):
+    """
+    Stores the record of a color set, None forgets it (the colors came from somewhere else)
+    """
+    records = applied_dq_exports(shape)
+    if record is None and color_set_name not in records:
+        return
+    if record is None:
+        records.pop(color_set_name)
+    else:
+        records[color_set_name] = record
+    try:
+        if not cmds.attributeQuery(APPLIED_EXPORTS_ATTR, node=shape, exists=True):
+            cmds.addAttr(shape, longName=APPLIED_EXPORTS_ATTR, dataType="string")
+        cmds.setAttr("%s.%s" % (shape, APPLIED_EXPORTS_ATTR), json.dumps(records), type="string")
+    except RuntimeError as e:
+        # locked node: without a record the next delta is applied in full
+        cmds.warning("Can't record the applied export on '%s': %s" % (shape, e))
+
+
+def find_previous_export(output_path):
+    """
+    Latest non-empty _vNN export older than output_path for the same scene and mesh, or None
+    """
+    folder, name = os.path.split(os.path.abspath(output_path))
+    m = re.match(r"^(.*)_v(\d+)(?:\.json|%s)$" % re.escape(DQW_EXT), name, re.I)
+    if not m:
+        return None
+    current = int(m.group(2))
+    pattern = re.compile(r"^%s_v(\d+)(?:\.json|%s)$" % (re.escape(m.group(1)), re.escape(DQW_EXT)), re.I)
+
+    best = None
+    for other in os.listdir(folder):
+        match = pattern.match(other)
+        if not match or int(match.group(1)) >= current:
+            continue
+        path = os.path.join(folder, other)
+        if os.path.getsize(path) and (best is None or int(match.group(1)) > best[0]):
+            best = (int(match.group(1)), path)
+    return best[1] if best else None
+
+
+def dq_delta_chain_resolves(path):
+    """
+    True if an export is a full export or every deltaBase down to one still reads
+    """
+    for _ in range(DELTA_MAX_CHAIN * 4 + 1):
+        try:
+            base_name = read_dq_header(path).get("deltaBase")
+        except (IOError, OSError, ValueError, KeyError):
+            return False
+        if not base_name:
+            return True
+        path = os.path.join(os.path.dirname(path), base_name)
+    return False
+
+
+def resolve_dq_weights(path, _depth=0):
+    """
+    ----------------------------------------------------------------------------
+    Reads an export like read_dq_weights and flattens its delta chain
+    The result matches the full export it stands for (weight, then vertex order)
+    info["deltaChain"] is the number of files that were read
+
+    Читает экспорт и разворачивает цепочку дельт в полный набор весов
+    ----------------------------------------------------------------------------
+    """
+    info, verts, weights = read_dq_weights(path)
+    base_name = info.pop("deltaBase", None)
+    removed = decode_vertex_ranges(info.pop("removedVertices", []))
+    if not base_name:
+        info["deltaChain"] = 1
+        return info, verts, weights
+    if _depth >= DELTA_MAX_CHAIN * 4:
+        raise ValueError("Delta chain too long or cyclic at %s" % path)
+
+    base_info, base_verts, base_weights = resolve_dq_weights(os.path.join(os.path.dirname(path), base_name), _depth + 1)
+    size = max(max(base_verts) if base_verts else -1, max(verts) if verts else -1) + 1
+    missing = float("nan")
+    dense = array("d", [missing]) * size
+    for v, w in zip(base_verts, base_weights):
+        dense[v] = w
+    for v in removed:
+        if v < size:
+            dense[v] = missing
+    for v, w in zip(verts, weights):
+        dense[v] = w
+
+    grouped = {}
+    for v in range(size):
+        w = dense[v]
+        if w == w:
+            grouped.setdefault(w, []).append(v)
+    flat_verts = array("i")
+    flat_weights = array("d")
+    for w in sorted(grouped):
+        flat_verts.extend(grouped[w])
+        flat_weights.extend(array("d", [w]) * len(grouped[w]))
+
+    info["deltaChain"] = base_info["deltaChain"] + 1
+    return info, flat_verts, flat_weights
+
+
+def resolved_export_data(path):
+    """
+    Export dict of a JSON export with its delta chain applied, the same dict a full export would have
+    """
+    info, verts, weights = resolve_dq_weights(path)
+    # fewest decimal places that give back every weight exactly
+    values = set(weights)
+    decimal_places = next((d for d in range(16) if all(round(w, d) == w for w in values)), 15)
+    scale = 10 ** decimal_places
+
+    blocks = []
+    start = 0
+    count = len(verts)
+    while start < count:
+        w = weights[start]
+        end = start + 1
+        while end < count and weights[end] == w:
+            end += 1
+        blocks.append({"weight": format_weight_level(int(round(w * scale)), decimal_places),
+                       "vertices": verts[start:end].tolist()})
+        start = end
+
+    return {
+        "mesh": info["mesh"],
+        "skinCluster": info.get("skinCluster", ""),
+        "exportMode": info.get("exportMode", "mesh"),
+        "blendWeights": blocks
+    }
+
+
+def make_delta_export(export_data, output_path):
+    """
+    ---------------------------------------------------------------------------------
+    Turns full export data into a delta against the previous version of the same file
+    Returns export_data unchanged if there is no usable base or most vertices changed
+
+    Превращает полный экспорт в дельту относительно прошлой версии
+    ---------------------------------------------------------------------------------
+    """
+    base_path = find_previous_export(output_path)
+    if not base_path:
+        return export_data
+    try:
+        base_info, base_verts, base_weights = resolve_dq_weights(base_path)
+    except (ValueError, KeyError, IOError, OSError) as e:
+        print("Can't use %s as delta base: %s" % (base_path, e))
+        return export_data
+    if base_info.get("mesh") != export_data["mesh"] or base_info["deltaChain"] >= DELTA_MAX_CHAIN:
+        return export_data
+
+    blocks = export_data["blendWeights"]
+    total = sum(len(block["vertices"]) for block in blocks)
+    size = max([max(base_verts) + 1 if base_verts else 0] + [block["vertices"][-1] + 1 for block in blocks if block["vertices"]])
+    base = array("d", [float("nan")]) * size
+    for v, w in zip(base_verts, base_weights):
+        base[v] = w
+    exported = bytearray(size)
+
+    changed_blocks = []
+    changed = 0
+    for block in blocks:
+        w = float(block["weight"])
+        verts = [v for v in block["vertices"] if base[v] != w]
+        for v in block["vertices"]:
+            exported[v] = 1
+        if verts:
+            changed_blocks.append({"weight": block["weight"], "vertices": verts})
+            changed += len(verts)
+    removed = [v for v in base_verts if not exported[v]]
+    removed.sort()
+
+    if changed + len(removed) > DELTA_MAX_CHANGED * max(total, 1):
+        return export_data
+
+    # header first: read_dq_header stops at blendWeights, Python 2 dicts have no order
+    return OrderedDict([
+        ("mesh", export_data["mesh"]),
+        ("skinCluster", export_data["skinCluster"]),
+        ("exportMode", export_data["exportMode"]),
+        ("formatVersion", DELTA_FORMAT_VERSION),
+        ("deltaBase", os.path.basename(base_path)),
+        ("removedVertices", removed),
+        ("blendWeights", changed_blocks)
+    ])
+
+
+# --- Packed plugin arguments ---
+def _pack_array(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(_array_bytes(packed)).decode("ascii")
+
+
+def pack_dq_arrays(verts, weights):
+    """
+    -------------------------------------------------------------
+    Packs vertex ids and weights for -packedVerts / -packedWeights:
+    base64 of little-endian uint32 and float32, one string each
+
+    Упаковывает индексы и веса в base64 строки (uint32 / float32)
+    -------------------------------------------------------------
+    """
+    return _pack_array("I", verts), _pack_array("f", weights)
+
+
+def pack_dq_levels(weights):
+    """
+    Splits weights into unique levels and a level index per vertex for -packedLevels / -packedLevelIds
+    Ids are uint16 when there are at most 65536 levels, uint32 otherwise
+    """
+    levels = sorted(set(weights))
+    lookup = dict((level, i) for i, level in enumerate(levels))
+    ids = [lookup[w] for w in weights]
+    return _pack_array("f", levels), _pack_array("H" if len(levels) <= 0x10000 else "I", ids)
+
+
+def dq_array_args(mesh_name, verts, weights, color_set_name='dqColorSet', merge=True):
+    """
+    applyDQVertexColors flags of one mesh for in-memory vertex ids and weights (packed mode)
+    With PALETTE_COLORSET the weights go as levels + ids and the colorset shares one color per level
+    """
+    if PALETTE_COLORSET:
+        packed_levels, packed_ids = pack_dq_levels(weights)
+        args = ['-mesh', mesh_name, '-packedVerts', _pack_array("I", verts), '-packedLevels', packed_levels,
+                '-packedLevelIds', packed_ids, '-set', color_set_name, '-M', merge]
+    else:
+        packed_verts, packed_weights = pack_dq_arrays(verts, weights)
+        args = ['-mesh', mesh_name, '-packedVerts', packed_verts, '-packedWeights', packed_weights,
+                '-set', color_set_name, '-M', merge]
+    if COLOR_RAMP != "gray":
+        args.extend(['-ramp', COLOR_RAMP])
+    return args
+
+
+def apply_dq_arrays(mesh_name, verts, weights, color_set_name='dqColorSet', merge=True, progress=True):
+    """
+    Applies in-memory vertex ids and weights through the plugin's packed mode
+    """
+    args = dq_array_args(mesh_name, verts, weights, color_set_name, merge)
+    if not progress:
+        args.extend(['-noProgress', True])
+    cmds.applyDQVertexColors(*args)
 
 
 # --- Apply DQ weights to vertex color ---
-def apply_dq_weights_with_plugin(json_path, color_set_name='dqColorSet'):
+def _dq_apply_shape(mesh_name):
+    """
+    Shape the colors are applied to, it also holds the applied export records
     """
-    --------------------------------------------------------
-    Apply DQ weights from JSON to selected mesh via plugin
+    if cmds.objExists(mesh_name) and cmds.objectType(mesh_name, isType='transform'):
+        shapes = cmds.listRelatives(mesh_name, shapes=True) or []
+        if shapes:
+            return shapes[0]
+    return mesh_name
 
-    Применяет DQ веса из JSON к выбранному мешу через плагин
-    --------------------------------------------------------
+
+def _check_dq_target_mesh(mesh_name):
+    """
+    Raises ValueError unless mesh_name names exactly one node in the scene
+    """
+    matches = cmds.ls(mesh_name) or []
+    if len(matches) != 1:
+        raise ValueError("%s %s" % (mesh_name, "is ambiguous" if matches else "not found"))
+
+
+def _dq_apply_target(json_path, color_set_name):
+    """
+    Works out how an export is applied: (mesh shape, merge, verts, weights)
+    verts/weights are None when the plugin reads the file itself
+    A delta on top of the base already shown in the color set is applied as-is (merge)
+    """
+    # the plugin reads the weights itself, only the header is needed here
+    info = read_dq_header(json_path)
+    _check_dq_target_mesh(info['mesh'])
+    mesh_name = _dq_apply_shape(info['mesh'])
+
+    merge = MERGE_COLORSET
+    verts = weights = None
+    if info.get('deltaBase'):
+        base_path = os.path.join(os.path.dirname(json_path), info['deltaBase'])
+        color_sets = []
+        record = None
+        if cmds.objExists(mesh_name):
+            color_sets = cmds.polyColorSet(mesh_name, query=True, allColorSets=True) or []
+            record = applied_dq_exports(mesh_name).get(color_set_name)
+        if (color_set_name in color_sets and record == applied_dq_record(mesh_name, base_path)
+                and (merge or not info.get('removedVertices'))):
+            # the color set already shows the base, only the changed vertices need writing
+            merge = True
+        else:
+            _, verts, weights = resolve_dq_weights(json_path)
+    return mesh_name, merge, verts, weights
+
+
+def _dq_target_args(json_path, mesh_name, merge, verts, weights, color_set_name):
+    """
+    applyDQVertexColors flags of one export, the -mesh flag first
+    """
+    if verts is not None:
+        return dq_array_args(mesh_name, verts, weights, color_set_name, merge)
+    args = ['-mesh', mesh_name, '-file', json_path, '-set', color_set_name, '-M', merge,
+            '-palette', PALETTE_COLORSET]
+    if COLOR_RAMP != "gray":
+        args.extend(['-ramp', COLOR_RAMP])
+    return args
+
+
+@profiled("apply")
+def apply_dq_weights_with_plugin(json_path, color_set_name='dqColorSet', progress=True):
+    """
+    -------------------------------------------------------------------
+    Apply DQ weights from JSON (or .dqw) to selected mesh via plugin
+    progress=False skips the progress bar (batch runs)
+
+    Применяет DQ веса из JSON (или .dqw) к выбранному мешу через плагин
+    -------------------------------------------------------------------
     """
     start_time = time.time()
-    if not cmds.pluginInfo('applyDQVertexColors', query=True, loaded=True):
-        cmds.loadPlugin('applyDQVertexColors')
+    ensure_dq_plugin()
 
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    with profile_span("apply_target"):
+        mesh_name, merge, verts, weights = _dq_apply_target(json_path, color_set_name)
 
-    mesh_name = data['mesh']
+    # one undo step for the colors and their record
+    cmds.undoInfo(openChunk=True, chunkName="applyDQVertexColors")
+    try:
+        _call_dq_apply(json_path, mesh_name, merge, verts, weights, color_set_name, progress)
+        set_applied_dq_export(mesh_name, color_set_name, applied_dq_record(mesh_name, json_path))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    end_time = time.time()
+    print("Time to apply DQ vertex colors: {:.3f} seconds".format(end_time - start_time))
+
+
+def _call_dq_apply(json_path, mesh_name, merge, verts, weights, color_set_name, progress):
+    """
+    Runs applyDQVertexColors for one export worked out by _dq_apply_target
+    """
+    if dq_plugin_version() >= PLUGIN_CURRENT_VERSION:
+        with profile_span("build_args"):
+            args = _dq_target_args(json_path, mesh_name, merge, verts, weights, color_set_name)
+            if not progress:
+                args.extend(['-noProgress', True])
+        with profile_span("plugin", vertices=len(verts) if verts is not None else None):
+            cmds.applyDQVertexColors(*args)
+    else:
+        # a 1.0 build skips flags it doesn't know, the weights go as -verts/-colors arguments
+        cmds.warning("applyDQVertexColors has no -file flag, rebuild the plugin for faster apply")
+        with profile_span("legacy_args"):
+            if verts is None:
+                _, verts, weights = read_dq_weights(json_path)
+            args = ['-mesh', mesh_name, '-set', color_set_name, '-M', merge]
+            for v in verts:
+                args.extend(['-verts', v])
+            for w in weights:
+                args.extend(['-colors', w, w, w])
+        with profile_span("plugin", vertices=len(verts)):
+            cmds.applyDQVertexColors(*args)
+
+
+@profiled("apply_batch")
+def apply_dq_batch_with_plugin(json_paths, color_set_name='dqColorSet', progress=True, packed=None):
+    """
+    --------------------------------------------------------------------
+    Applies several exports in one applyDQVertexColors call: one progress
+    window and one undo step for all meshes (plugin 1.1+)
+    Older plugins get one call per export
+    packed: {path: (mesh shape, flags)} of exports whose weights are still
+    in memory, those files are not read back
+    A mesh that fails (missing, ambiguous name, bad export) is reported
+    and skipped, the others are applied. Returns the applied paths
+
+    Применяет несколько экспортов одним вызовом плагина: одно окно
+    прогресса и один шаг отмены на все меши. Меш с ошибкой пропускается,
+    возвращает примененные пути
+    --------------------------------------------------------------------
+    """
+    start_time = time.time()
+    ensure_dq_plugin()
+
+    # before 1.1 a second -mesh silently replaced the first one
+    if (len(json_paths) < 2 and not packed) or dq_plugin_version() < PLUGIN_CURRENT_VERSION:
+        applied_paths = []
+        for path in json_paths:
+            try:
+                apply_dq_weights_with_plugin(path, color_set_name, progress)
+                applied_paths.append(path)
+            except Exception as e:
+                print("Error applying %s: %s" % (path, e))
+        return applied_paths
 
+    args = [] if progress else ['-noProgress', True]
+    applied = []
+    for path in json_paths:
+        try:
+            if packed and path in packed:
+                mesh_name, target_args = packed[path]
+                _check_dq_target_mesh(mesh_name)
+            else:
+                with profile_span("apply_target"):
+                    mesh_name, merge, verts, weights = _dq_apply_target(path, color_set_name)
+                with profile_span("build_args"):
+                    target_args = _dq_target_args(path, mesh_name, merge, verts, weights, color_set_name)
+        except Exception as e:
+            print("Error applying %s: %s" % (path, e))
+            continue
+        args.extend(target_args)
+        applied.append((mesh_name, path))
+    if not applied:
+        return []
+
+    cmds.undoInfo(openChunk=True, chunkName="applyDQVertexColors")
+    try:
+        with profile_span("plugin"):
+            # positions of the -mesh flags the plugin wrote, it skips meshes it can't write
+            written = cmds.applyDQVertexColors(*args) or []
+        applied = [applied[i] for i in written]
+        for mesh_name, path in applied:
+            set_applied_dq_export(mesh_name, color_set_name, applied_dq_record(mesh_name, path))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    print("Time to apply DQ vertex colors on {} of {} meshes: {:.3f} seconds".format(
+        len(applied), len(json_paths), time.time() - start_time))
+    return [path for _, path in applied]
+
+
+# --- Read back applied colors ---
+def _unpack_array(typecode, text):
+    values = _array_from_bytes(typecode, base64.b64decode(text))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def query_dq_colors(mesh_name, indices=None, color_set_name='dqColorSet', channel='weight'):
+    """
+    -----------------------------------------------------------------------
+    Reads the color set back in one plugin call (applyDQVertexColors -query)
+    Returns array('f'): one weight per vertex, or r, g, b, a per vertex
+    for channel='rgba'; -1 means the vertex has no color in the set
+    indices: vertex ids to read, whole mesh if None
+    None if the loaded plugin is older than 1.1 (no -query)
+
+    Читает колорсет одним вызовом плагина, -1 = у вертекса нет цвета
+    -----------------------------------------------------------------------
+    """
+    if not check_dq_plugin("-query flag"):
+        return None
+    args = ['-mesh', mesh_name, '-set', color_set_name, '-channel', channel]
+    if COLOR_RAMP != "gray":
+        args.extend(['-ramp', COLOR_RAMP])
+    if indices is not None:
+        args.extend(['-packedVerts', _pack_array("I", indices)])
+    return _unpack_array("f", cmds.applyDQVertexColors(*args, query=True))
+
+
+def verify_dq_colors(json_path, color_set_name='dqColorSet'):
+    """
+    -----------------------------------------------------------------
+    Checks that the color set shows the weights of an export
+    (delta chains are resolved). Returns the number of vertices whose
+    color doesn't match, -1 for a vertex without color counts too;
+    None if the plugin can't read the colors back
+
+    Проверяет, что колорсет совпадает с весами экспорта
+    -----------------------------------------------------------------
+    """
+    start_time = time.time()
+    info, verts, weights = resolve_dq_weights(json_path)
+    mesh_name = info['mesh']
     if cmds.objExists(mesh_name) and cmds.objectType(mesh_name, isType='transform'):
         shapes = cmds.listRelatives(mesh_name, shapes=True) or []
         if shapes:
             mesh_name = shapes[0]
 
-    verts = []
-    colors = []
-    for block in data['blendWeights']:
-        w = float(block['weight'])
-        for idx in block['vertices']:
-            verts.append(int(idx))
-            colors.extend([w, w, w])
+    colors = query_dq_colors(mesh_name, verts, color_set_name)
+    if colors is None:
+        return None
+    # colors are float32; a ramp is decoded to the nearest of its 4096 colors
+    tolerance = 1e-6 if COLOR_RAMP == "gray" else 1.0 / 4095
+    weights32 = array("f", weights)
+    bad = [v for v, w, c in zip(verts, weights32, colors) if abs(c - w) > tolerance]
+
+    print("Verified %d vertices of %s in %.3f seconds: %d mismatched" % (len(verts), mesh_name, time.time() - start_time, len(bad)))
+    if bad:
+        cmds.warning("%s: %d vertices don't match %s, first: %s" % (color_set_name, len(bad), os.path.basename(json_path), bad[:10]))
+    return len(bad)
+
+# --- Preview without export ---
+@profiled("preview")
+def preview_dq_colors(mesh_name, indices=None, color_set_name='dqColorSet', progress=True):
+    """
+    ----------------------------------------------------------------------
+    Colors the mesh straight from its skinCluster (dqWeightsToColors),
+    same quantization as the export, nothing is written to disk
+    indices: vertex ids to color, whole mesh if None
 
-    args = ['-mesh', mesh_name, '-set', color_set_name, '-M', MERGE_COLORSET]
+    Красит меш напрямую из skinCluster, без записи файла на диск
+    ----------------------------------------------------------------------
+    """
+    start_time = time.time()
+    if not check_dq_plugin("dqWeightsToColors command"):
+        return
 
-    for v in verts:
-        args.extend(['-verts', int(v)])
+    # the command works on 0-15 decimals, the color is float32 anyway
+    args = ['-mesh', mesh_name, '-set', color_set_name, '-M', MERGE_COLORSET,
+            '-decimals', min(DECIMAL_PLACES, 15), '-skipZero', not SAVE_ZERO_WEIGHTS, '-palette', PALETTE_COLORSET]
+    if COLOR_RAMP != "gray":
+        args.extend(['-ramp', COLOR_RAMP])
+    if indices is not None:
+        args.extend(['-packedVerts', _pack_array("I", indices)])
+    if not progress:
+        args.extend(['-noProgress', True])
+    with profile_span("plugin", vertices=len(indices) if indices is not None else None):
+        cmds.dqWeightsToColors(*args)
+    set_applied_dq_export(_dq_apply_shape(mesh_name), color_set_name)
+    print("Time to preview DQ vertex colors: {:.3f} seconds".format(time.time() - start_time))
+
+
+# --- Live DQ colors ---
+def toggle_live_dq_colors(*args):
+    """
+    ----------------------------------------------------------------------
+    Connects a dqWeightColor node to each selected skinned mesh, the node
+    recolors only the painted vertices while you paint DQ weights.
+    Selected meshes that already have the node get it removed.
+
+    Подключает узел dqWeightColor к выбранным мешам со скином, при
+    рисовании DQ весов перекрашиваются только измененные вертексы.
+    Если узел уже подключен, он удаляется.
+    ----------------------------------------------------------------------
+    """
+    sel = cmds.ls(selection=True, dag=True, shapes=True, type='mesh', noIntermediate=True)
+    if not sel:
+        cmds.warning("Select at least one skinned mesh")
+        return
+    if not check_dq_plugin("dqWeightColor node"):
+        return
 
-    for i in range(0, len(colors), 3):
-        args.extend(['-colors', float(colors[i]), float(colors[i+1]), float(colors[i+2])])
+    for shape in sel:
+        nodes = cmds.listConnections(shape + '.message', type='dqWeightColor', destination=True, source=False) or []
+        if nodes:
+            cmds.delete(nodes)
+            print("Live DQ colors off: %s" % shape)
+            continue
+
+        skin_clusters = cmds.ls(cmds.listHistory(shape) or [], type='skinCluster')
+        if not skin_clusters:
+            cmds.warning("No skinCluster found on '%s'." % shape)
+            continue
+
+        node = cmds.createNode('dqWeightColor', name=shape.split('|')[-1] + '_dqWeightColor', skipSelect=True)
+        cmds.setAttr(node + '.colorSet', 'dqColorSet', type='string')
+        cmds.setAttr(node + '.decimals', min(DECIMAL_PLACES, 15))
+        cmds.setAttr(node + '.ramp', COLOR_RAMP, type='string')
+        cmds.connectAttr(shape + '.message', node + '.mesh')
+        cmds.connectAttr(skin_clusters[0] + '.blendWeights', node + '.blendWeights')
+        set_applied_dq_export(shape, 'dqColorSet')
+        print("Live DQ colors on: %s -> %s" % (skin_clusters[0], shape))
 
-    cmds.applyDQVertexColors(*args)
-    end_time = time.time()
-    print("Time to apply DQ vertex colors: {:.3f} seconds".format(end_time - start_time))
 
 # --- Export + Apply ---
+@profiled("export_apply")
 def export_apply_combine_colors(file_field, verts_only=True):
     """
     -----------------------------------
@@ -273,8 +2112,11 @@ def export_apply_combine_colors(file_field, verts_only=True):
         if not sel_verts:
             cmds.warning("Select vertices")
             return
-        mesh = sel_verts[0].split(".")[0]
+        mesh = sel_verts[0][0]
         suffix = "vrt"
+        if PREVIEW_ONLY:
+            preview_dq_colors(mesh, sel_verts[0][1])
+            return
     else:
         sel = cmds.ls(selection=True, dag=True, shapes=True)
         if not sel:
@@ -282,17 +2124,37 @@ def export_apply_combine_colors(file_field, verts_only=True):
             return
         mesh = cmds.listRelatives(sel[0], parent=True)[0]
         suffix = ""
+        if PREVIEW_ONLY:
+            preview_dq_colors(sel[0])
+            return
 
     final_path = build_export_path(mesh, suffix=suffix)
-    cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
+    final_path = export_dq_blend_weights(final_path, verts_only)
 
-    export_dq_blend_weights(final_path, verts_only)
-
-    if os.path.exists(final_path):
+    if final_path and os.path.exists(final_path):
+        cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
         apply_dq_weights_with_plugin(final_path)
 
 
 # --- Export + Apply (Multi) ---
+def _write_and_pack_dq_export(job, mesh_shape, color_set_name='dqColorSet'):
+    """
+    Worker part of the batch: writes the export and packs the written weights for the plugin
+    Returns (state, path, applyDQVertexColors flags), flags are None for a reused export
+    """
+    state, path, levels = _write_dq_export(job, keep_levels=True)
+    if levels is None:
+        return state, path, None
+    with profile_span("build_args", vertices=len(job["indices"])):
+        verts = []
+        weights = []
+        for level, level_verts in levels:
+            verts.extend(level_verts)
+            weights.extend([float(format_weight_level(level, DECIMAL_PLACES))] * len(level_verts))
+        return state, path, dq_array_args(mesh_shape, verts, weights, color_set_name, MERGE_COLORSET)
+
+
+@profiled("export_apply_batch")
 def export_apply_combine_colors_batch(file_field):
     """
     -----------------------------------
@@ -318,24 +2180,88 @@ def export_apply_combine_colors_batch(file_field):
         return
 
     processed_count = 0
-    last_path = ""
+    exported_paths = []
+    packed = {}
 
-    for mesh in mesh_transforms:
-        clean_name = mesh.split('|')[-1]
-        final_path = build_export_path(clean_name, suffix="")
-        
+    # Maya reads stay on the main thread, files of the meshes already read are written
+    # by the pool meanwhile; at most EXPORT_THREADS meshes wait for their files
+    pool = None
+    if EXPORT_THREADS > 1 and not PREVIEW_ONLY:
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(max_workers=EXPORT_THREADS)
+        except ImportError:
+            pass    # Python 2 Maya: one mesh at a time
+    pending = deque()
+
+    def finish(item):
+        mesh, job, mesh_shape, write = item
         try:
-            export_dq_blend_weights(final_path, verts_only=False, target_mesh=mesh)
-            
-            if os.path.exists(final_path):
-                apply_dq_weights_with_plugin(final_path)
-                last_path = final_path
-                processed_count += 1
+            # time the main thread waits for the file, 0 when the writers keep up
+            with profile_span("wait_write"):
+                (state, path, flags), spans = write()
+            merge_profile_spans(spans)
         except Exception as e:
+            release_export_path(job["output_path"])
             print("Error processing %s: %s" % (mesh, e))
+            return
+        path = _report_dq_export(job, state, path)
+        if not path or os.path.abspath(path) != os.path.abspath(job["output_path"]):
+            release_export_path(job["output_path"])
+        if path and os.path.exists(path):
+            exported_paths.append(path)
+            if flags is not None:
+                packed[path] = (mesh_shape, flags)
 
-    if last_path:
-        cmds.textFieldButtonGrp(file_field, edit=True, text=last_path)
+    try:
+        for mesh in mesh_transforms:
+            if PREVIEW_ONLY:
+                try:
+                    preview_dq_colors(mesh, progress=False)
+                    processed_count += 1
+                except Exception as e:
+                    print("Error previewing %s: %s" % (mesh, e))
+                continue
+
+            clean_name = mesh.split('|')[-1]
+            final_path = build_export_path(clean_name, suffix="")
+
+            try:
+                job = _read_dq_export(final_path, False, mesh)
+                if job is None:
+                    release_export_path(final_path)
+                    continue
+                mesh_shape = _dq_apply_shape(mesh)
+            except Exception as e:
+                release_export_path(final_path)
+                print("Error processing %s: %s" % (mesh, e))
+                continue
+
+            # the writer's spans are kept apart and merged by finish() on this thread
+            if pool:
+                write = pool.submit(profile_worker(_write_and_pack_dq_export), job, mesh_shape).result
+            else:
+                write = functools.partial(profile_worker(_write_and_pack_dq_export), job, mesh_shape)
+            pending.append((mesh, job, mesh_shape, write))
+            while len(pending) > (EXPORT_THREADS if pool else 0):
+                finish(pending.popleft())
+        while pending:
+            finish(pending.popleft())
+    finally:
+        if pool:
+            pool.shutdown()
+
+    # all exports in one plugin call: one progress window, one undo step,
+    # fresh exports are applied from memory instead of reading the files back
+    if exported_paths:
+        try:
+            applied_paths = apply_dq_batch_with_plugin(exported_paths, packed=packed)
+        except Exception as e:
+            applied_paths = []
+            print("Error applying %d exports: %s" % (len(exported_paths), e))
+        processed_count += len(applied_paths)
+        if applied_paths:
+            cmds.textFieldButtonGrp(file_field, edit=True, text=applied_paths[-1])
     
     print("Batch Complete. Processed %d meshes." % processed_count)
 
@@ -363,13 +2289,14 @@ def remove_dq_color_set(*args):
                     cmds.polyColorSet(shape, create=True, colorSet="__temp__")
                     cmds.polyColorSet(shape, currentColorSet=True, colorSet="__temp__")
                 cmds.polyColorSet(shape, delete=True, colorSet=cs)
+                set_applied_dq_export(shape, cs)
             except Exception as e:
                 cmds.warning("Failed to remove '%s' from '%s': %s" % (cs, shape, e))
 
 
 # --- UI ---
 def dq_weights_v4_ui():
-    global MERGE_COLORSET, CHECK_DQ_WEIGHTS
+    global MERGE_COLORSET, CHECK_DQ_WEIGHTS, BINARY_EXPORT, RANGE_ENCODE_VERTICES, USE_EXPORT_CACHE, DELTA_EXPORT, PALETTE_COLORSET, PREVIEW_ONLY, COLOR_RAMP, PROFILE_STAGES, PROFILE_CPROFILE
     window_name = "dqWeightToolUI_v4"
     
     if cmds.windowPref(window_name, exists=True):
@@ -384,7 +2311,7 @@ def dq_weights_v4_ui():
 
     def browse_json(*args):
         file_path = cmds.fileDialog2(
-            fileFilter="JSON Files (*.json)", dialogStyle=2, fileMode=1, startingDirectory=EXPORT_DIR
+            fileFilter="DQ Weights (*.json *.dqw);;JSON Files (*.json);;Binary DQ (*.dqw)", dialogStyle=2, fileMode=1, startingDirectory=EXPORT_DIR
         )
         if file_path:
             cmds.textFieldButtonGrp(file_field, edit=True, text=file_path[0])
@@ -395,19 +2322,19 @@ def dq_weights_v4_ui():
             cmds.warning("Select a mesh")
             return
         mesh_transform = cmds.listRelatives(sel[0], parent=True)[0]
-        final_path = build_export_path(mesh_transform)
-        cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
-        export_dq_blend_weights(final_path, False)
+        final_path = export_dq_blend_weights(build_export_path(mesh_transform), False)
+        if final_path:
+            cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
 
     def run_export_verts(*args):
         sel_verts = get_selected_vertices()
         if not sel_verts:
             cmds.warning("Select vertices")
             return
-        mesh = sel_verts[0].split(".")[0]
-        final_path = build_export_path(mesh, suffix="vrt")
-        cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
-        export_dq_blend_weights(final_path, True)
+        mesh = sel_verts[0][0]
+        final_path = export_dq_blend_weights(build_export_path(mesh, suffix="vrt"), True)
+        if final_path:
+            cmds.textFieldButtonGrp(file_field, edit=True, text=final_path)
 
     def run_export_apply_mesh(*args):
         export_apply_combine_colors(file_field, False)
@@ -445,6 +2372,7 @@ def dq_weights_v4_ui():
     def change_decimal_places(value):
         global DECIMAL_PLACES
         DECIMAL_PLACES = int(value)
+        use_binary_export()  # warn now, not at the next export
 
     def toggle_save_zero(value):
         global SAVE_ZERO_WEIGHTS
@@ -458,6 +2386,59 @@ def dq_weights_v4_ui():
         global CHECK_DQ_WEIGHTS
         CHECK_DQ_WEIGHTS = bool(value)
 
+    def toggle_binary_export(value):
+        global BINARY_EXPORT
+        BINARY_EXPORT = bool(value)
+        use_binary_export()  # warn now, not at the next export
+
+    def toggle_range_encode(value):
+        global RANGE_ENCODE_VERTICES
+        RANGE_ENCODE_VERTICES = bool(value)
+
+    def toggle_export_cache(value):
+        global USE_EXPORT_CACHE
+        USE_EXPORT_CACHE = bool(value)
+
+    def toggle_delta_export(value):
+        global DELTA_EXPORT
+        DELTA_EXPORT = bool(value)
+
+    def toggle_palette_colorset(value):
+        global PALETTE_COLORSET
+        PALETTE_COLORSET = bool(value)
+
+    def toggle_preview_only(value):
+        global PREVIEW_ONLY
+        PREVIEW_ONLY = bool(value)
+
+    def change_color_ramp(value):
+        global COLOR_RAMP
+        COLOR_RAMP = value
+
+    def toggle_profile_stages(value):
+        global PROFILE_STAGES
+        PROFILE_STAGES = bool(value)
+
+    def toggle_cprofile(value):
+        global PROFILE_CPROFILE
+        PROFILE_CPROFILE = bool(value)
+
+    def run_verify(*args):
+        path = cmds.textFieldButtonGrp(file_field, query=True, text=True)
+        if os.path.exists(path):
+            verify_dq_colors(path)
+        else:
+            cmds.warning("Invalid path/JSON")
+
+    def run_convert(*args):
+        path = cmds.textFieldButtonGrp(file_field, query=True, text=True)
+        if os.path.exists(path):
+            new_path = convert_dq_weights(path)
+            cmds.textFieldButtonGrp(file_field, edit=True, text=new_path)
+            print("Converted %s -> %s" % (path, new_path))
+        else:
+            cmds.warning("Invalid path/JSON")
+
 
     # --- UI 1: MAIN BUTTONS ---
     cmds.separator(height=5)
@@ -477,6 +2458,7 @@ def dq_weights_v4_ui():
     cmds.separator(height=5)
     cmds.button(label="Toggle Display Color", height=30, command=toggle_vertex_color_display)
     cmds.button(label="Remove Color Set", height=30, command=remove_dq_color_set)
+    cmds.button(label="Live DQ Colors (toggle)", height=30, command=toggle_live_dq_colors)
 
     cmds.separator(height=10, style='none') # Space before collapsible
 
@@ -504,6 +2486,26 @@ def dq_weights_v4_ui():
     cmds.checkBox(label="Merge colorset", value=MERGE_COLORSET, changeCommand=toggle_merge_colorset)
     cmds.checkBox(label="Check DQ before Export", value=CHECK_DQ_WEIGHTS, changeCommand=toggle_check_dq)
     cmds.setParent('..') 
+    cmds.rowLayout(numberOfColumns=2, adjustableColumn=2, columnAttach=[(1, 'left', 0), (2, 'left', 0)])
+    cmds.checkBox(label="Binary export (.dqw)", value=BINARY_EXPORT, changeCommand=toggle_binary_export)
+    cmds.checkBox(label="Range-encode vertices", value=RANGE_ENCODE_VERTICES, changeCommand=toggle_range_encode)
+    cmds.setParent('..')
+    cmds.rowLayout(numberOfColumns=2, adjustableColumn=2, columnAttach=[(1, 'left', 0), (2, 'left', 0)])
+    cmds.checkBox(label="Reuse unchanged exports", value=USE_EXPORT_CACHE, changeCommand=toggle_export_cache)
+    cmds.checkBox(label="Delta exports", value=DELTA_EXPORT, changeCommand=toggle_delta_export)
+    cmds.setParent('..')
+    cmds.rowLayout(numberOfColumns=2, adjustableColumn=2, columnAttach=[(1, 'left', 0), (2, 'left', 0)])
+    cmds.checkBox(label="Palette colorset", value=PALETTE_COLORSET, changeCommand=toggle_palette_colorset)
+    cmds.checkBox(label="Preview only (no export file)", value=PREVIEW_ONLY, changeCommand=toggle_preview_only)
+    cmds.setParent('..')
+    cmds.rowLayout(numberOfColumns=2, adjustableColumn=2, columnAttach=[(1, 'left', 0), (2, 'left', 0)])
+    cmds.checkBox(label="Print stage timings", value=PROFILE_STAGES, changeCommand=toggle_profile_stages)
+    cmds.checkBox(label="cProfile each run", value=PROFILE_CPROFILE, changeCommand=toggle_cprofile)
+    cmds.setParent('..')
+    ramp_menu = cmds.optionMenu(label="Color ramp", changeCommand=change_color_ramp)
+    for ramp in COLOR_RAMPS if COLOR_RAMP in COLOR_RAMPS else COLOR_RAMPS + [COLOR_RAMP]:
+        cmds.menuItem(label=ramp)
+    cmds.optionMenu(ramp_menu, edit=True, value=COLOR_RAMP)
 
     cmds.separator(height=5)
     
@@ -511,6 +2513,8 @@ def dq_weights_v4_ui():
     cmds.button(label="Export DQ from Mesh", height=25, command=run_export_mesh)
     cmds.button(label="Export DQ from Selection", height=25, command=run_export_verts)
     cmds.button(label="Apply Current JSON as Color", height=25, command=run_apply)
+    cmds.button(label="Verify Applied Colors", height=25, command=run_verify)
+    cmds.button(label="Convert JSON <-> DQW", height=25, command=run_convert)
 
     cmds.setParent('..') 
     cmds.setParent('..') 
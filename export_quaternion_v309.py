@@ -23,16 +23,25 @@ convert DQ weights to a grayscale color set for visualization and further use in
 ---------------------------------------------------------------------------------------------------------------
 """
 
-# --- load plugin automatically (UPDATED PATH) ---
+# --- plugin, loaded on the first apply ---
 PLUGIN_PATH = r"D:\Josep\source\repos\applyDQVertexColors\x64\Release\applyDQVertexColors.mll"
 
-if not cmds.pluginInfo(PLUGIN_PATH, query=True, loaded=True):
+
+def load_dq_plugin():
+    """
+    Loads the plugin from PLUGIN_PATH on the first apply, not on import,
+    falls back to Maya's plug-in path
+    """
+    if cmds.pluginInfo('applyDQVertexColors', query=True, loaded=True):
+        return
     try:
         cmds.loadPlugin(PLUGIN_PATH)
         print("Plugin loaded:", PLUGIN_PATH)
     except Exception as e:
         cmds.warning("Failed to load plugin: %s" % e)
-        
+        cmds.loadPlugin('applyDQVertexColors')
+
+
 EXPORT_DIR = r"D:\export_dq_blend_weights"  # export folder
 DECIMAL_PLACES = 4  # number of decimal places
 SAVE_ZERO_WEIGHTS = True    # save zero weights
@@ -90,6 +99,42 @@ def save_json_singleline_vertices(data, path):
         f.write(text)
 
 
+# --- Read blend weights ---
+def _read_blend_weights_bulk(skin_cluster, indices):
+    # whole blendWeights multi in two getAttr calls, None if it can't be aligned with indices
+    attr = "%s.blendWeights" % skin_cluster
+    existing = cmds.getAttr(attr, multiIndices=True) or []
+    if not existing:
+        return [0.0] * len(indices)
+
+    values = cmds.getAttr(attr)
+    # a numeric multi comes back as one tuple in a list: [(w0, w1, ...)]
+    if isinstance(values, list) and len(values) == 1 and isinstance(values[0], (list, tuple)):
+        values = values[0]
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    if len(values) != len(existing) or (values and isinstance(values[0], (list, tuple))):
+        return None
+
+    dense = [0.0] * (max(existing) + 1)
+    for i, w in zip(existing, values):
+        dense[i] = w
+    size = len(dense)
+    return [float(dense[i]) if i < size else 0.0 for i in indices]
+
+
+def read_blend_weights(skin_cluster, indices):
+    try:
+        weights = _read_blend_weights_bulk(skin_cluster, indices)
+    except (RuntimeError, ValueError, TypeError):
+        weights = None
+
+    # fallback: one getAttr per vertex
+    if weights is None:
+        weights = [float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, i))) for i in indices]
+    return weights
+
+
 # --- Export DQ blend weights ---
 def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
     global DECIMAL_PLACES, SAVE_ZERO_WEIGHTS, CHECK_DQ_WEIGHTS
@@ -141,26 +186,20 @@ def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
     if skin_cluster:
         if verts_only and not target_mesh:
             # Verts from selection
-            for v in sel_verts:
-                idx = int(v.split("[")[-1].split("]")[0])
-                w = float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, idx)))
-                if abs(w) < threshold:
-                    if SAVE_ZERO_WEIGHTS: w = 0.0
-                    else: continue
-                if w > 1.0: w = 1.0
-                weight_str = "{0:.{1}f}".format(w, DECIMAL_PLACES).rstrip("0").rstrip(".")
-                raw_weights[idx] = weight_str
+            indices = [int(v.split("[")[-1].split("]")[0]) for v in sel_verts]
         else:
             # Whole mesh (or batch mode)
             num_verts = cmds.polyEvaluate(mesh_transform, vertex=True)
-            for i in range(num_verts):
-                w = float(cmds.getAttr("%s.blendWeights[%d]" % (skin_cluster, i)))
-                if abs(w) < threshold:
-                    if SAVE_ZERO_WEIGHTS: w = 0.0
-                    else: continue
-                if w > 1.0: w = 1.0
-                weight_str = "{0:.{1}f}".format(w, DECIMAL_PLACES).rstrip("0").rstrip(".")
-                raw_weights[i] = weight_str
+            indices = range(num_verts)
+
+        weights = read_blend_weights(skin_cluster, indices)
+        for idx, w in zip(indices, weights):
+            if abs(w) < threshold:
+                if SAVE_ZERO_WEIGHTS: w = 0.0
+                else: continue
+            if w > 1.0: w = 1.0
+            weight_str = "{0:.{1}f}".format(w, DECIMAL_PLACES).rstrip("0").rstrip(".")
+            raw_weights[idx] = weight_str
 
         if CHECK_DQ_WEIGHTS and (not raw_weights or all(float(w) == 0.0 for w in raw_weights.values())):
             cmds.warning("Mesh '%s' has no Dual Quaternion weights. Export canceled." % mesh_transform)
@@ -189,8 +228,7 @@ def export_dq_blend_weights(output_path, verts_only=False, target_mesh=None):
 # --- Apply DQ weights to vertex color ---
 def apply_dq_weights_with_plugin(json_path, color_set_name='dqColorSet'):
     start_time = time.time()
-    if not cmds.pluginInfo('applyDQVertexColors', query=True, loaded=True):
-        cmds.loadPlugin('applyDQVertexColors')
+    load_dq_plugin()
 
     with open(json_path, 'r') as f:
         data = json.load(f)